@@ -0,0 +1,85 @@
+"""Runs the benchmark suite, optionally saving the results or comparing them to a baseline.
+
+    python -m benchmarks --save baseline.json
+    python -m benchmarks --compare baseline.json
+
+Comparing exits with status 1 if anything got slower than the baseline by more than the
+tolerance. So does any run in which a case goes over one of its budgets, like the share of a
+command's time that always-on metrics may take.
+"""
+import argparse
+import json
+import platform
+import sys
+
+from . import suite
+from .common import report
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare(results, baseline, tolerance):
+    """Returns the names of the benchmarks that regressed, printing every comparison."""
+    regressions = []
+
+    for name, seconds in results.items():
+        if name not in baseline:
+            continue
+
+        ratio = seconds / baseline[name]
+        regressed = ratio > 1 + tolerance
+        if regressed:
+            regressions.append(name)
+
+        sys.stdout.write(f"{name:<48} {ratio:>8.2f}x{'  REGRESSION' if regressed else ''}\n")
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("select", nargs="?", help="only run cases whose name contains this")
+    parser.add_argument("--save", metavar="FILE", help="write the results here as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="compare against saved results")
+    parser.add_argument("--tolerance",
+                        type=float,
+                        default=0.25,
+                        help="how much slower counts as a regression (default: 0.25, i.e. 25%%)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, seconds, unit, n in suite.run(args.select):
+        report(name, seconds, unit, n)
+        results[name] = seconds / n
+
+    over = []
+    for name, share, limit in suite.BUDGETS:
+        if share >= limit:
+            over.append(name)
+        sys.stdout.write(f"{name:<48} {share:>12.2%} of {limit:.0%} budget"
+                         f"{'  OVER BUDGET' if share >= limit else ''}\n")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": platform.python_version(), "results": results}, f, indent=2)
+
+    regressions = []
+    if args.compare:
+        sys.stdout.write("\n")
+        regressions = compare(results, load(args.compare), args.tolerance)
+        if regressions:
+            sys.stdout.write(f"\n{len(regressions)} regressed by more than {args.tolerance:.0%}: "
+                             f"{', '.join(regressions)}\n")
+
+    if over:
+        sys.stdout.write(f"\nover budget: {', '.join(over)}\n")
+
+    if regressions or over:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
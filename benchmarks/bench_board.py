@@ -0,0 +1,58 @@
+"""Measures per-game board memory and the cost of a board snapshot.
+
+Run with ``python -m benchmarks.bench_board [games]``.
+"""
+import sys
+import tracemalloc
+
+from codenamesbot.state import BOARD_SIZE, Board, Game, Team
+from codenamesbot.words import WORDS
+
+from .common import best_of, report
+
+
+def start_game(seed=0):
+    game = Game(seed=seed)
+    for name in ("tris", "claire", "bob", "alice"):
+        game.join(name)
+    game.start_game()
+    return game
+
+
+def list_board(game):
+    # the board as twelve lists of strings, the way Game stored it before Board existed
+    words = {team: list(game.words[team]) for team in Team}
+    remaining_words = {team: list(words[team]) for team in Team}
+    guessed_words = {team: [] for team in Team}
+    return words, remaining_words, guessed_words, list(game.all_words), game.assassin
+
+
+def allocated(build, n):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build() for _ in range(n)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    del kept
+    return (after - before) / n
+
+
+def main(n=1000):
+    games = [start_game(seed) for seed in range(n)]
+    boards = iter(games * 2)
+
+    sys.stdout.write(f"{'whole game':<48} {allocated(start_game, n):>12,.0f} bytes/game\n")
+    ids, positions = list(range(BOARD_SIZE)), list(range(BOARD_SIZE))
+    sys.stdout.write(f"{'board (ids + masks + position index)':<48} "
+                     f"{allocated(lambda: Board.deal(WORDS, ids, positions), n):>12,.0f} "
+                     "bytes/board\n")
+    sys.stdout.write(f"{'board (lists of strings, for comparison)':<48} "
+                     f"{allocated(lambda: list_board(next(boards)), n):>12,.0f} bytes/board\n")
+
+    board = games[0].board
+    report("board snapshot", best_of(board.snapshot, number=10000), "snapshot")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
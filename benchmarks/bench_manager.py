@@ -0,0 +1,59 @@
+"""Measures per-channel game routing through a single IRCInterface.
+
+Run with ``python -m benchmarks.bench_manager [channels]``.
+"""
+import sys
+
+from codenamesbot.irc import IRCInterface
+
+from .common import best_of, report
+
+
+class SilentIRCInterface(IRCInterface):
+
+    def __init__(self, nick, channels):
+        super().__init__(nick, channels)
+        self.scheduler.rate = self.scheduler.burst = self.scheduler.tokens = 1e12
+        self.sent = 0
+
+    def privmsg(self, target, message):
+        self.sent += 1
+
+
+def populate(bot, channels):
+    for seed, channel in enumerate(channels):
+        for nick in ("tris", "claire", "bob", "alice"):
+            bot.on_privmsg(nick, channel, "-join")
+        bot.on_privmsg("tris", channel, f"-start {seed}")
+
+
+def main(n=1000):
+    channels = [f"#codenames{i}" for i in range(n)]
+
+    def create():
+        populate(SilentIRCInterface("bot", []), channels)
+
+    seconds = best_of(create, repeat=3)
+    report(f"create + start {n} games", seconds, "game", n)
+
+    bot = SilentIRCInterface("bot", [])
+    populate(bot, channels)
+    assert len(bot.games) == n
+
+    def route():
+        for channel in channels:
+            bot.on_privmsg("claire", channel, "-stats")
+
+    seconds = best_of(route)
+    report(f"route -stats across {n} channels", seconds, "msg", n)
+
+    def teardown():
+        for channel in channels:
+            bot.games.close(channel)
+
+    seconds = best_of(teardown, repeat=1)
+    report(f"tear down {n} games", seconds, "game", n)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,44 @@
+"""Shows that Players lookups stay flat as the lobby grows.
+
+Run with ``python -m benchmarks.bench_players``.
+"""
+from codenamesbot.state import Players
+
+from .common import best_of, report
+
+SIZES = (10, 100, 1000, 10000)
+
+
+def build(n):
+    players = Players()
+    for i in range(n):
+        players.add(f"player{i}")
+
+    return players
+
+
+def main():
+    for n in SIZES:
+        players = build(n)
+        names = [f"PLAYER{i}" for i in range(0, n, max(1, n // 100))]
+        lookups = len(names)
+
+        def lookup(players=players, names=names):
+            for name in names:
+                players.get(name)
+                name in players  # noqa: B015
+
+        report(f"get + contains, {n} players", best_of(lookup, number=20), "lookup", lookups * 2)
+
+        def rename(players=players, names=names):
+            for name in names:
+                player = players[name]
+                player.rename(name + "_")
+                player.rename(name)
+
+        report(f"rename there and back, {n} players", best_of(rename, number=20), "rename",
+               lookups * 2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Measures how fast live games are snapshotted, journaled and recovered.
+
+Run with ``python -m benchmarks.bench_recovery [games]``.
+"""
+import sys
+import tempfile
+import time
+
+from codenamesbot.persistence import GameStore
+from codenamesbot.state import Game, Team
+
+from .common import best_of, report
+
+
+def live_game(seed):
+    game = Game(seed=seed)
+    for name in ("tris", "claire", "bob", "alice", "eve"):
+        game.join(name)
+    game.start_game()
+
+    if seed % 2:
+        spymaster = game.teams[Team.GREEN].spymaster
+        game.hint(spymaster, "pony", 2)
+        game.guess(game.teams[Team.GREEN].guessers[0], game.words[Team.GREEN][0])
+
+    return game
+
+
+def main(n=10000):
+    games = {f"#codenames{i}": live_game(i) for i in range(n)}
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = GameStore(directory)
+        store.open()
+
+        start = time.perf_counter()
+        store.snapshot(games)
+        report(f"snapshot {n} games", time.perf_counter() - start, "game", n)
+
+        start = time.perf_counter()
+        recovered, _ = GameStore(directory).load()
+        report(f"recover {n} games from a snapshot", time.perf_counter() - start, "game", n)
+        assert len(recovered) == n
+
+        record = ("dispatch", "tris", "#codenames1", "guess", ["pony"])
+        report("journal a command (buffered)", best_of(lambda: store.record(*record),
+                                                       number=10000), "command")
+        report("flush + fsync 1000 journal records",
+               best_of(lambda: [store.record(*record) for _ in range(1000)] and store.flush()),
+               "batch")
+
+        start = time.perf_counter()
+        _, records = GameStore(directory).load()
+        report(f"read back {len(records)} journal records",
+               time.perf_counter() - start, "record", len(records))
+
+        store.close()
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,41 @@
+import sys
+import time
+
+
+def best_of(fn, repeat=5, number=1, setup=None):
+    """Returns the best wall-clock time, in seconds, of ``number`` calls to ``fn``.
+
+    If given, ``setup()`` runs untimed before each repeat, and its result is passed to ``fn``.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        for _ in range(number):
+            fn(*args)
+        best = min(best, time.perf_counter() - start)
+
+    return best / number
+
+
+def interleaved(fns, repeat=5, number=1):
+    """Returns the best times of several functions, like ``best_of`` for each of them.
+
+    Each repeat times all of them in turn, in alternating order, so that warm-up and drift in the
+    machine's speed don't favor whichever runs first.
+    """
+    best = [float("inf")] * len(fns)
+    for i in range(repeat):
+        order = range(len(fns)) if i % 2 == 0 else reversed(range(len(fns)))
+        for j in order:
+            start = time.perf_counter()
+            for _ in range(number):
+                fns[j]()
+            best[j] = min(best[j], time.perf_counter() - start)
+
+    return [seconds / number for seconds in best]
+
+
+def report(name, seconds, unit="op", n=1):
+    per = seconds / n
+    sys.stdout.write(f"{name:<48} {per * 1e6:>12.2f} us/{unit}  ({n / seconds:,.0f} {unit}/s)\n")
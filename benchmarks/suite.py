@@ -0,0 +1,431 @@
+"""The benchmarks that ``python -m benchmarks`` runs, saves and compares.
+
+Each case is a generator yielding (name, seconds, unit, n) for every measurement it makes, where
+``seconds`` is the best time to process ``n`` units.
+"""
+import functools
+import itertools
+import time
+import types
+
+from codenamesbot.interface import Interface
+from codenamesbot.simulator import NullInterface, OracleStrategy, play_many
+from codenamesbot.state import Game, GameMode, GamePhase, PlayingTeam, Team
+from codenamesbot.words import WORDS, WordTable
+
+from .bench_players import build
+from .common import best_of, interleaved
+
+CASES = []
+
+# (name, share, limit) for every budget checked while running
+BUDGETS = []
+
+# metrics are always on, so they may add at most this share to a command's handling time
+METRICS_BUDGET = 0.01
+
+
+def case(f):
+    CASES.append(f)
+    return f
+
+
+def budget(name, share, limit):
+    BUDGETS.append((name, share, limit))
+
+
+class QuietInterface(Interface):
+    """Renders everything, but says nothing."""
+
+    def tell(self, message):
+        pass
+
+    def tell_private(self, player, message):
+        pass
+
+
+def lobby(n, mode=GameMode.VERSUS, interface=None):
+    game = Game(interface=interface or QuietInterface(), seed=n)
+    for i in range(n):
+        game.join(f"player{i}")
+
+    game.mode = mode
+    return game
+
+
+def reset_lobby(game):
+    # every fifth player wants a team and every seventh wants to be spymaster, as a busy lobby
+    # would. assign_teams overwrites both, so they're put back before each run
+    teams = itertools.cycle([Team.GREEN, Team.PINK, Team.GRAY] if game.mode ==
+                            GameMode.GRAY else [Team.GREEN, Team.PINK])
+    for i, player in enumerate(game.players):
+        player.team = next(teams) if i % 5 == 0 else None
+        player.spymaster_preference = i % 7 == 0
+
+    game.teams = {team: PlayingTeam(team) for team in Team}
+    return game
+
+
+@case
+def players():
+    for n in (10, 1000, 100000):
+        players = build(n)
+        names = [f"PLAYER{i}" for i in range(0, n, max(1, n // 100))]
+
+        def lookup(players=players, names=names):
+            for name in names:
+                players.get(name)
+
+        yield f"players.get[{n}]", best_of(lookup, number=20), "lookup", len(names)
+
+
+@case
+def assign_teams():
+    for mode in GameMode:
+        for n in (4, 10, 100, 1000, 10000):
+            game = lobby(n, mode)
+            seconds = best_of(Game.assign_teams, setup=functools.partial(reset_lobby, game))
+            yield f"assign_teams[{mode.name.lower()},{n}]", seconds, "lobby", 1
+
+
+@case
+def assign_words():
+    game = lobby(4)
+    for n in (None, 10000, 100000, 1000000):
+        game.table = WORDS if n is None else WordTable(f"word{i}" for i in range(n))
+        yield f"assign_words[{len(game.table)} words]", best_of(game.assign_words,
+                                                                number=1000), "board", 1
+
+
+@case
+def hint_and_guess():
+    games = 200
+    strategy = OracleStrategy()
+
+    def play(games):
+        for game in games:
+            while game.winner is None:
+                team = game.teams[game.active_team]
+                game.hint(team.spymaster, *strategy.hint(game, team.spymaster))
+                guesser = team.guessers[0]
+                while game.winner is None and game.active_team == team.team:
+                    game.guess(guesser, strategy.guess(game, guesser, 0))
+
+    def setup():
+        started = []
+        for seed in range(games):
+            game = lobby(4, interface=NullInterface())
+            game.start_game(seed)
+            started.append(game)
+
+        return started
+
+    # an oracle game is always eight hints and sixteen guesses
+    yield "hint + guess", best_of(play, setup=setup), "action", games * 24
+
+
+@case
+def full_games():
+    seeds = range(200)
+    yield "simulated game (random players)", best_of(lambda: play_many(seeds), repeat=3), "game", \
+        len(seeds)
+
+
+@case
+def views():
+    game = lobby(4)
+    game.start_game(0)
+    interface = game.interface
+
+    green = game.teams[Team.GREEN]
+    game.hint(green.spymaster, "pony", 2)
+    game.guess(green.guessers[0], game.words[Team.GREEN][0])
+
+    guessers = tuple(game.teams[Team.GRAY].players + green.guessers)
+    board = game.board.snapshot()
+
+    def rerendered(view):
+        # a new revision every time, so nothing comes from the cache
+        def render():
+            game.touch()
+            view()
+
+        return render
+
+    yield "spymaster_view", best_of(rerendered(interface.spymaster_view), number=1000), "view", 1
+    yield "spymaster_view, same revision", best_of(interface.spymaster_view,
+                                                   number=1000), "view", 1
+    yield "full_words_view", best_of(rerendered(interface.full_words_view), number=1000), \
+        "view", 1
+    yield "notify_guessing", best_of(
+        rerendered(lambda: interface.notify_guessing(Team.GREEN, "pony", 2, guessers, board)),
+        number=1000), "view", 1
+    yield "notify_guessing, same revision", best_of(
+        lambda: interface.notify_guessing(Team.GREEN, "pony", 2, guessers, board),
+        number=1000), "view", 1
+
+
+@case
+def suggest():
+    try:
+        import numpy as np
+
+        from codenamesbot.embeddings import Embeddings
+    except ImportError:
+        # the clue assistant needs numpy
+        return
+
+    # every vocabulary word has to be a plain word to be a clue; spell the numbers with letters
+    words = [word for word in WORDS if word.isalpha()]
+    words += ["".join(chr(ord("a") + int(d)) for d in str(i)) for i in range(100000 - len(words))]
+    embeddings = Embeddings(words, np.random.default_rng(0).standard_normal((len(words), 300)))
+
+    board = list(WORDS)[:25]
+    yield "suggest[100k words, 300d]", best_of(
+        lambda: embeddings.suggest(board[:9], board[9:17], board[17:24], board[24:]),
+        repeat=10), "suggestion", 1
+
+
+@case
+def bots():
+    try:
+        import numpy as np
+
+        from codenamesbot.embeddings import Embeddings
+    except ImportError:
+        return
+
+    from codenamesbot.bots import GuesserPool
+
+    words = ["pony"] + list(WORDS)
+    embeddings = Embeddings(words, np.random.default_rng(0).standard_normal((len(words), 300)))
+    pool = GuesserPool(lambda: embeddings)
+
+    def hinted(games):
+        started = []
+        for seed in range(games):
+            game = lobby(4, interface=NullInterface())
+            game.start_game(seed)
+            pool.join(game, Team.GREEN)
+            pool.watch(game)
+            game.hint(game.teams[Team.GREEN].spymaster, "pony", 2)
+            started.append(game)
+
+        return started
+
+    def one_at_a_time(games):
+        requests = pool.requests
+        for request in requests:
+            pool.requests = [request]
+            pool.tick()
+
+    yield "bot guesses, 1000 games in one tick", best_of(lambda games: pool.tick(),
+                                                         setup=lambda: hinted(1000)), "bot", 1000
+    yield "bot guesses, 1000 games one by one", best_of(one_at_a_time,
+                                                        setup=lambda: hinted(1000)), "bot", 1000
+
+
+@case
+def timers():
+    import asyncio
+
+    from codenamesbot.timers import TimingWheel
+
+    n = 100000
+    delays = [60 + i % 240 for i in range(n)]
+
+    class Clock:
+        now = 0.0
+
+        def __call__(self):
+            return self.now
+
+    def schedule_and_cancel(wheel):
+        pending = [wheel.schedule(delay, int) for delay in delays]
+        for timer in pending:
+            wheel.cancel(timer)
+
+    def expire(wheel):
+        for delay in delays:
+            wheel.schedule(delay, int)
+
+        wheel.clock.now = max(delays)
+        wheel.advance()
+
+    yield f"timing wheel schedule + cancel[{n}]", best_of(schedule_and_cancel,
+                                                          setup=TimingWheel), "timer", n
+    yield f"timing wheel expire[{n}]", best_of(expire,
+                                               setup=lambda: TimingWheel(clock=Clock())), \
+        "timer", n
+
+    # for comparison, one event loop handle per timer
+    loop = asyncio.new_event_loop()
+
+    def call_later():
+        pending = [loop.call_later(delay, int) for delay in delays]
+        for handle in pending:
+            handle.cancel()
+
+    yield f"loop.call_later + cancel[{n}]", best_of(call_later), "timer", n
+    loop.close()
+
+
+@case
+def startup():
+    from codenamesbot.cli import import_times
+
+    def cumulative(module):
+        # each import in a fresh interpreter, so nothing is already loaded
+        return next(total for name, _, total in import_times([module]) if name == module)
+
+    for module in ("codenamesbot.state", "codenamesbot.simulator", "codenamesbot.irc"):
+        yield f"import {module}", min(cumulative(module) for _ in range(3)), "import", 1
+
+    from .bench_manager import SilentIRCInterface
+
+    yield "IRCInterface()", best_of(lambda: SilentIRCInterface("bot", []), number=100), "bot", 1
+
+
+@case
+def dispatch():
+    from .bench_manager import SilentIRCInterface, populate
+
+    bot = SilentIRCInterface("bot", [])
+    populate(bot, ["#codenames"])
+    interface = bot.games["#codenames"]
+
+    def handle():
+        with bot.output.collect():
+            interface.handle_command("claire", "stats", [])
+
+    yield "handle_command -stats", best_of(handle, number=1000), "command", 1
+    yield "on_privmsg -stats", best_of(lambda: bot.on_privmsg("claire", "#codenames", "-stats"),
+                                       number=1000), "message", 1
+    yield "on_privmsg chatter", best_of(lambda: bot.on_privmsg("claire", "#codenames", "hello"),
+                                        number=1000), "message", 1
+
+    # a busy channel: mostly talk, some commands, some things that only look like commands
+    traffic = [
+        "hello", "-stats", "did anyone see the clue?", "-pony", "-notacommand with args",
+        "--- lol ---", "  -STATS", "-", "brb"
+    ] * 100
+
+    def mixed():
+        for message in traffic:
+            bot.on_privmsg("claire", "#codenames", message)
+
+    yield "on_privmsg mixed traffic", best_of(mixed, number=10), "message", len(traffic)
+
+    yield "open channel", best_of(lambda: bot.games.open(f"#new{len(bot.games)}"),
+                                  number=1000), "channel", 1
+
+
+@case
+def metrics():
+    from codenamesbot.irc import IRCInterface
+
+    from .bench_manager import SilentIRCInterface
+
+    class Unmetered(SilentIRCInterface):
+
+        def record_command(self, name, seconds):
+            pass
+
+        def record_event(self, event):
+            pass
+
+    # a real IRCInterface, so sent lines are counted too, with nowhere to send them
+    metered = IRCInterface("bot", [])
+    metered.scheduler.rate = metered.scheduler.burst = metered.scheduler.tokens = 1e12
+    metered.bot = types.SimpleNamespace(privmsg=lambda target, message: None)
+    unmetered = Unmetered("bot", [])
+
+    def play(bot):
+        # a whole game over IRC, every turn a hint and one right guess
+        for nick in ("tris", "claire", "bob", "alice"):
+            bot.on_privmsg(nick, "#codenames", "-join")
+        bot.on_privmsg("tris", "#codenames", "-start 1")
+
+        game = bot.games["#codenames"].game
+        while game.phase != GamePhase.POST_GAME:
+            team = game.teams[game.active_team]
+            word = game.board.words(game.board.hidden(game.active_team))[0]
+            bot.on_privmsg(team.spymaster.name, "#codenames", "-hint pony 1")
+            bot.on_privmsg(team.guessers[0].name, "#codenames", f"-guess {word}")
+
+        bot.on_privmsg("tris", "#codenames", "-stats")
+        bot.close("#codenames")
+
+    # both warmed up first, so neither is timed while caches and the allocator settle
+    for bot in (metered, unmetered):
+        for _ in range(20):
+            play(bot)
+
+    commands = sum(histogram.count for histogram in metered.command_seconds.children.values())
+    commands //= 20
+
+    # the A/B difference between the games is within the noise, so the overhead is checked from
+    # what metering adds to each command on its own: timing it and recording the time, as
+    # dispatch does. it's timed alongside the games, so both see the machine in the same state
+    def record(n=1000):
+        for _ in range(n):
+            started = time.perf_counter()
+            metered.record_command("stats", time.perf_counter() - started)
+
+    timings = interleaved(
+        [functools.partial(play, metered),
+         functools.partial(play, unmetered), record],
+        repeat=9,
+        number=20)
+    for name, seconds in zip(("metered", "unmetered"), timings):
+        yield f"game over IRC, {name}", seconds, "game", 1
+
+    recording = timings[2] / 1000
+    yield "record_command", recording, "command", 1
+
+    handling = timings[1] / commands
+    budget("metrics overhead per command", recording / handling, METRICS_BUDGET)
+
+
+@case
+def spectators(n=10000):
+    import json
+
+    from codenamesbot.spectators import SpectatorInterface, frame
+
+    class Socket:
+        """Takes every write and keeps none, like the socket of a spectator who keeps up."""
+
+        transport = types.SimpleNamespace(get_write_buffer_size=lambda: 0)
+
+        def write(self, data):
+            pass
+
+    game = lobby(4)
+    game.start_game(0)
+    watching = SpectatorInterface("#codenames")
+    watching.set_game(game)
+    for _ in range(n):
+        watching.add(Socket())
+
+    hint = {"type": "hint", "team": "green", "word": "pony", "number": 2}
+
+    def serialized_for_each():
+        for socket in watching.sockets:
+            socket.write(frame(json.dumps(hint, separators=(",", ":")).encode()))
+
+    def send_hint():
+        watching.notify_guessing(Team.GREEN, "pony", 2, (), None)
+
+    yield f"hint to {n} spectators", best_of(send_hint, number=10), "spectator", n
+    yield (f"hint to {n} spectators, serialized for each", best_of(serialized_for_each,
+                                                                   number=10), "spectator", n)
+    yield "snapshot for a new spectator", best_of(lambda: watching.add(Socket()),
+                                                  number=1000), "spectator", 1
+
+
+def run(select=None):
+    """Runs every case whose name contains ``select`` and yields its measurements."""
+    for f in CASES:
+        if select is None or select in f.__name__:
+            yield from f()
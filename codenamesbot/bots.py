@@ -0,0 +1,132 @@
+"""Bot guessers, which play alongside people.
+
+A bot joins a game like anyone else, but its player is marked ``bot`` and the game's events are
+watched by a GuesserPool. When a hint is given to a team with a bot guessing for it, the pool
+queues a request; requests from every game are then ranked together in one batch, once per
+event loop tick, and the bot guesses its best words and stops.
+"""
+import collections
+
+from . import events
+from .state import UNLIMITED, GamePhase, InvalidGameState, Team
+
+# after its first guess, a bot only keeps guessing words at least this similar to the hint
+CONFIDENCE = 0.25
+BOT_NAME = "guessbot"
+
+Request = collections.namedtuple("Request", ["game", "player", "hint", "revealed", "act"])
+
+
+def act_directly(game, player, command, word=None):
+    if command == "guess":
+        game.guess(player, word)
+    else:
+        game.stop(player)
+
+
+class GuesserPool:
+    """Plays every bot guesser in every game it watches.
+
+    ``embeddings`` is called for the Embeddings to rank words with the first time it's needed,
+    so nothing is loaded until bots actually play.
+    """
+
+    def __init__(self, embeddings):
+        self.load_embeddings = embeddings
+        self.embeddings = None
+        self.requests = []
+        self.wakeup = None
+
+    def join(self, game, team=None):
+        """Adds a new bot guesser to ``game`` and returns its player."""
+        if game.phase == GamePhase.PRE_GAME:
+            # joining late keeps bots from being picked as spymaster
+            raise InvalidGameState("Bots can only join once the game has started.")
+
+        names = (f"{BOT_NAME}{n}" for n in range(1, len(game.players) + 2))
+        name = next(name for name in names if name not in game.players)
+
+        player = game.join(name, team)
+        player.bot = True
+        return player
+
+    def watch(self, game, act=act_directly):
+        """Has the pool play ``game``'s bots, through ``act(game, player, command, word)``."""
+        return game.events.subscribe(lambda event: self.push(event, game, act))
+
+    def push(self, event, game, act):
+        if not isinstance(event, events.Hinted):
+            return
+
+        # one bot guesses for the whole team
+        bots = [player for player in event.guessers if player.bot]
+        if not bots:
+            return
+
+        self.requests.append(Request(game, bots[0], game.current_hint, game.board.revealed, act))
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def current(self, request):
+        # requests can go stale before they're served: someone else may have guessed already,
+        # or the request came from a hint replayed after a crash that has long been played out
+        game = request.game
+        return (game.phase == GamePhase.GUESSING and game.current_hint == request.hint and
+                game.board.revealed == request.revealed and
+                request.player.team in {game.active_team, Team.GRAY})
+
+    def tick(self):
+        """Serves every queued request in one batch. Returns how many were served."""
+        requests = [request for request in self.requests if self.current(request)]
+        self.requests = []
+        if not requests:
+            return 0
+
+        if self.embeddings is None:
+            self.embeddings = self.load_embeddings()
+
+        boards = [request.game.board.words() for request in requests]
+        scores = self.embeddings.rank([request.hint[0] for request in requests], boards)
+
+        for request, words, row in zip(requests, boards, scores):
+            self.play(request, words, row)
+
+        return len(requests)
+
+    def play(self, request, words, scores):
+        game, player = request.game, request.player
+        team = game.active_team
+
+        hidden = [
+            (scores[i], word) for i, word in enumerate(words) if not game.board.is_revealed(i)
+        ]
+        hidden.sort(key=lambda pair: -pair[0])
+
+        # guess as many words as the hint was for, and never more than the team has left
+        number = request.hint[1]
+        limit = len(hidden) if number == 0 or number is UNLIMITED else number
+        if game.remaining_guesses is not UNLIMITED:
+            limit = min(limit, game.remaining_guesses)
+
+        for guessed, (score, word) in enumerate(hidden[:limit]):
+            if guessed and score < CONFIDENCE:
+                break
+
+            request.act(game, player, "guess", word)
+            if game.phase != GamePhase.GUESSING or game.active_team != team:
+                return
+
+        request.act(game, player, "stop")
+
+    async def run(self):
+        # the simulator plays bots without an event loop, so asyncio is only needed here
+        import asyncio
+        self.wakeup = asyncio.Event()
+
+        while True:
+            self.tick()
+            self.wakeup.clear()
+            await self.wakeup.wait()
+
+            # let every command handled this tick queue its requests, then serve them together
+            await asyncio.sleep(0)
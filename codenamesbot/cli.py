@@ -0,0 +1,127 @@
+"""Runs the bot: ``codenamesbot NICK #channel [#channel ...]``.
+
+``--startup-profile`` reports where startup time goes, module by module, and exits without
+connecting.
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+# what the bot imports before it can connect, and so what a startup profile times
+STARTUP_MODULES = ["codenamesbot.irc", "pyrcb2"]
+
+
+def import_times(modules):
+    """Returns (module, self seconds, cumulative seconds) for everything importing ``modules``
+    pulls in, slowest first, as measured by a fresh interpreter's ``-X importtime``."""
+    code = "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            stderr=subprocess.PIPE,
+                            universal_newlines=True,
+                            check=True)
+
+    times = []
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if not line.startswith("import time:") or not fields[1].strip().isdigit():
+            # the header
+            continue
+
+        own, cumulative, module = int(fields[0].split(":")[1]), int(fields[1]), fields[2].strip()
+        times.append((module, own / 1e6, cumulative / 1e6))
+
+    times.sort(key=lambda row: -row[2])
+    return times
+
+
+def timed(steps, name, f, *args):
+    start = time.perf_counter()
+    result = f(*args)
+    steps.append((name, time.perf_counter() - start))
+    return result
+
+
+def profile_startup(args, top=15):
+    sys.stdout.write("Slowest imports (self, cumulative):\n")
+    for module, own, cumulative in import_times(STARTUP_MODULES)[:top]:
+        sys.stdout.write(f"  {module:<40} {own * 1000:8.1f}ms {cumulative * 1000:8.1f}ms\n")
+
+    steps = []
+    irc = timed(steps, "import codenamesbot.irc", __import__, "codenamesbot.irc").irc
+    bot = timed(steps, "IRCInterface (and recovery)", irc.IRCInterface, args.nick, args.channels,
+                args.state_dir, args.embeddings)
+    timed(steps, "IRC transport (pyrcb2)", bot.connect_events)
+    if args.embeddings is not None:
+        timed(steps, "embeddings, on the first -suggest or -bot", bot.load_embeddings)
+
+    sys.stdout.write("Startup, in this process:\n")
+    for name, seconds in steps:
+        sys.stdout.write(f"  {name:<40} {seconds * 1000:8.1f}ms\n")
+    total = sum(seconds for _, seconds in steps)
+    sys.stdout.write(f"  {'total':<40} {total * 1000:8.1f}ms\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="An IRC bot for playing Codenames.")
+    parser.add_argument("nick")
+    parser.add_argument("channels", nargs="+", metavar="channel")
+    parser.add_argument("--state-dir", help="where games are saved, so they survive a restart")
+    parser.add_argument("--embeddings", help="embedding file for -suggest and -bot")
+    parser.add_argument("--admin",
+                        action="append",
+                        default=[],
+                        dest="admins",
+                        help="nick allowed to use admin commands (can be repeated)")
+    parser.add_argument("--metrics-port",
+                        type=int,
+                        help="serve Prometheus metrics on this localhost port")
+    parser.add_argument("--archive", help="append every game event to this file, as JSON lines")
+    parser.add_argument("--spectator-port",
+                        type=int,
+                        help="let browsers watch games over WebSockets on this localhost port")
+    parser.add_argument("--workers",
+                        type=int,
+                        help="run games in this many worker processes, channels spread over them")
+    parser.add_argument("--profile-dir",
+                        default="profiles",
+                        help="where -profile writes its profiles (default: profiles)")
+    parser.add_argument("--startup-profile",
+                        action="store_true",
+                        help="report import and initialization times, then exit")
+    args = parser.parse_args(argv)
+
+    if args.workers is not None and args.spectator_port is not None:
+        parser.error("--spectator-port doesn't work with --workers yet")
+
+    if args.startup_profile:
+        profile_startup(args)
+        return
+
+    if args.workers is not None:
+        from .shards import run_supervisor
+        run_supervisor(args.nick,
+                       args.channels,
+                       workers=args.workers,
+                       state_dir=args.state_dir,
+                       embeddings=args.embeddings,
+                       admins=args.admins,
+                       metrics_port=args.metrics_port,
+                       profile_dir=args.profile_dir,
+                       archive=args.archive)
+        return
+
+    from .irc import run_bot
+    run_bot(args.nick,
+            args.channels,
+            state_dir=args.state_dir,
+            embeddings=args.embeddings,
+            admins=args.admins,
+            metrics_port=args.metrics_port,
+            profile_dir=args.profile_dir,
+            spectator_port=args.spectator_port,
+            archive=args.archive)
+
+
+if __name__ == "__main__":
+    main()
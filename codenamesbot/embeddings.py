@@ -0,0 +1,223 @@
+"""Word embeddings, for suggesting clues to spymasters.
+
+Embeddings are read from a local file, never fetched: either GloVe/word2vec style text (one word
+per line followed by its vector) or the ``.npz`` this module converts that into, which loads
+much faster. Convert with ``python -m codenamesbot.embeddings glove.txt embeddings.npz``.
+
+This module needs numpy, which the rest of the bot doesn't, so it's only imported once someone
+asks for a suggestion.
+"""
+import sys
+
+import numpy as np
+
+# a clue has to beat every word it must not point at by this much...
+MARGIN = 0.05
+# ...and be at least this similar to every word it does point at
+FLOOR = 0.2
+# civilians only end the turn, so they count for a bit less than the opponent's words. the
+# assassin ends the game, so it counts for more
+CIVILIAN_SLACK = 0.05
+ASSASSIN_MARGIN = 0.1
+
+# how many of the best scoring clues are looked at to fill ``count`` legal suggestions
+POOL = 50
+
+# how many boards' vectors are kept around for ranking guesses
+MAX_BOARDS = 10000
+
+
+def pad(matrix, rows):
+    if len(matrix) == rows:
+        return matrix
+
+    return np.vstack([matrix, np.zeros((rows - len(matrix), matrix.shape[1]), matrix.dtype)])
+
+
+class Embeddings:
+    """Unit-length vectors for a vocabulary, so that a dot product is a cosine similarity."""
+
+    def __init__(self, words, vectors):
+        # clues are given as a single word, so only plain words can be one. those are moved to
+        # the front, so scoring clues only has to read the first ``clues`` rows
+        words = list(words)
+        clueable = [i for i, word in enumerate(words) if word.isalpha()]
+        order = clueable + [i for i, word in enumerate(words) if not word.isalpha()]
+
+        self.words = [words[i] for i in order]
+        self.clues = len(clueable)
+        self.index = {}
+        for i, word in enumerate(self.words):
+            self.index.setdefault(word.casefold(), i)
+
+        vectors = np.asarray(vectors, dtype=np.float32)[order]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        self.vectors = vectors / norms
+
+        # board word lists -> their vectors, see board_matrix
+        self.boards = {}
+
+    @classmethod
+    def load(cls, path):
+        if path.endswith(".npz"):
+            with np.load(path) as data:
+                return cls(data["words"].tolist(), data["vectors"])
+
+        with open(path, encoding="utf-8") as f:
+            return cls.from_text(f)
+
+    @classmethod
+    def from_text(cls, lines):
+        words, vectors = [], []
+        for line in lines:
+            word, *values = line.rstrip().split(" ")
+            if len(values) < 2:
+                # word2vec files start with a "count dimensions" line
+                continue
+
+            words.append(word)
+            vectors.append(np.array(values, dtype=np.float32))
+
+        return cls(words, np.vstack(vectors))
+
+    def save(self, path):
+        np.savez(path, words=np.array(self.words), vectors=self.vectors)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return self.vector(word) is not None
+
+    def vector(self, word):
+        """Returns the vector for ``word``, averaging the parts of words like "Ice Cream"."""
+        row = self.index.get(word.casefold())
+        if row is not None:
+            return self.vectors[row]
+
+        parts = [self.index.get(part) for part in word.casefold().replace("-", " ").split()]
+        parts = [row for row in parts if row is not None]
+        if not parts:
+            return None
+
+        vector = self.vectors[parts].mean(axis=0)
+        return vector / (np.linalg.norm(vector) or 1)
+
+    def matrix(self, words):
+        """Returns (the words that have vectors, their vectors as the rows of a matrix)."""
+        found = [(word, self.vector(word)) for word in words]
+        found = [(word, vector) for word, vector in found if vector is not None]
+
+        if not found:
+            return [], np.zeros((0, self.vectors.shape[1]), dtype=np.float32)
+
+        words, vectors = zip(*found)
+        return list(words), np.vstack(vectors)
+
+    def suggest(self, team, opponent=(), civilians=(), assassin=(), count=5):
+        """Ranks every possible clue in the vocabulary for the ``team`` words.
+
+        Returns up to ``count`` (clue, number, targets) tuples, best first, where ``targets`` are
+        the words the clue points at. The whole vocabulary is scored against the board at once.
+        """
+        targets, own = self.matrix(team)
+        if not targets or not self.clues:
+            return []
+
+        groups = [own] + [self.matrix(words)[1] for words in (opponent, civilians, assassin)]
+        board_words = {
+            word.casefold() for words in (team, opponent, civilians, assassin) for word in words
+        }
+
+        # one (board x clue) matrix of similarities, split back up by owner
+        similarity = np.vstack(groups) @ self.vectors[:self.clues].T
+        splits = np.cumsum([len(group) for group in groups[:-1]])
+        own, opponent, civilians, assassin = np.split(similarity, splits)
+
+        danger = np.full(self.clues, -1.0, dtype=np.float32)
+        if len(opponent):
+            danger = np.maximum(danger, opponent.max(axis=0))
+        if len(civilians):
+            danger = np.maximum(danger, civilians.max(axis=0) - CIVILIAN_SLACK)
+        if len(assassin):
+            danger = np.maximum(danger, assassin.max(axis=0) + ASSASSIN_MARGIN)
+
+        # a clue points at every team word that's clearly safer than the most dangerous word on
+        # the board. its score is how many it points at, then how safe the shakiest of those is
+        covered = own > np.maximum(danger + MARGIN, FLOOR)
+        numbers = covered.sum(axis=0)
+        weakest = np.where(covered, own, np.inf).min(axis=0)
+        scores = np.where(numbers > 0, numbers + weakest - danger, -np.inf)
+        on_board = [self.index[word] for word in board_words if word in self.index]
+        scores[[i for i in on_board if i < self.clues]] = -np.inf
+
+        pool = min(POOL, self.clues)
+        best = np.argpartition(-scores, pool - 1)[:pool]
+        best = best[np.argsort(-scores[best])]
+
+        suggestions = []
+        for candidate in best:
+            if scores[candidate] == -np.inf or len(suggestions) == count:
+                break
+
+            # clues can't be part of a word on the board, or the other way around
+            clue = self.words[candidate]
+            if any(clue.casefold() in word or word in clue.casefold() for word in board_words):
+                continue
+
+            number = int(numbers[candidate])
+            order = np.argsort(-own[:, candidate])[:number]
+            suggestions.append((clue, number, [targets[i] for i in order]))
+
+        return suggestions
+
+    def rank(self, hints, boards):
+        """Scores each board's words against its hint, for many boards at once.
+
+        ``boards`` is a list of word lists, one per hint. Returns a (hints x longest board)
+        array of similarities; words without a vector score 0 and padding scores -inf.
+        """
+        matrices = [self.board_matrix(tuple(words)) for words in boards]
+        width = max(len(matrix) for matrix in matrices)
+        zero = np.zeros(self.vectors.shape[1], dtype=np.float32)
+
+        hint_vectors = np.stack([self.vector(hint) if hint in self else zero for hint in hints])
+        board_vectors = np.stack([pad(matrix, width) for matrix in matrices])
+
+        # one batched matrix-vector product for every board
+        scores = np.matmul(board_vectors, hint_vectors[:, :, None])[:, :, 0]
+        for i, matrix in enumerate(matrices):
+            if len(matrix) < width:
+                scores[i, len(matrix):] = -np.inf
+
+        return scores
+
+    def board_matrix(self, words):
+        # a board keeps its words all game, so its vectors are looked up once
+        matrix = self.boards.get(words)
+        if matrix is None:
+            if len(self.boards) >= MAX_BOARDS:
+                self.boards.clear()
+
+            matrix = np.zeros((len(words), self.vectors.shape[1]), dtype=np.float32)
+            for i, word in enumerate(words):
+                vector = self.vector(word)
+                if vector is not None:
+                    matrix[i] = vector
+
+            self.boards[words] = matrix
+
+        return matrix
+
+
+def main(argv=None):
+    source, path = argv or sys.argv[1:]
+    embeddings = Embeddings.load(source)
+    embeddings.save(path)
+
+    sys.stdout.write(f"Saved {len(embeddings)} word vectors into {path}.\n")
+
+
+if __name__ == "__main__":
+    main()
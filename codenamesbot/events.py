@@ -0,0 +1,126 @@
+import collections
+import enum
+import functools
+
+# players are Player objects, teams are Team members and boards are BoardSnapshots, so that a
+# sink can render an event long after the game has moved on. team is None for pre-game joins.
+PlayerJoined = collections.namedtuple("PlayerJoined", ["player", "team"])
+PlayerLeft = collections.namedtuple("PlayerLeft", ["player"])
+PlayerMoved = collections.namedtuple("PlayerMoved", ["player", "team"])
+
+# teams maps each team to a tuple of its players, spymaster first
+GameStarted = collections.namedtuple("GameStarted", ["seed", "mode", "teams", "board"])
+TurnStarted = collections.namedtuple("TurnStarted", ["team", "spymaster", "board"])
+Hinted = collections.namedtuple("Hinted", ["team", "word", "number", "guessers", "board"])
+
+# owner is None for the assassin. remaining is how many words the owner has left, guesses_left
+# how many guesses the guessing team has left (0 once the turn is over)
+Guessed = collections.namedtuple("Guessed",
+                                 ["actor", "word", "owner", "remaining", "guesses_left"])
+TurnEnded = collections.namedtuple("TurnEnded", ["team"])
+# phase is the phase that ran out of time, before the turn ends
+TimedOut = collections.namedtuple("TimedOut", ["team", "phase"])
+GameWon = collections.namedtuple("GameWon", ["winner", "board"])
+
+
+class EventStream:
+    """Hands a game's events to every subscribed sink, in order.
+
+    Sinks are plain callables taking an event. They're called as soon as an event is emitted, so
+    anything slow should subscribe through a QueuedSink instead and be drained later.
+    """
+
+    def __init__(self):
+        self.sinks = []
+
+    def subscribe(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def unsubscribe(self, sink):
+        self.sinks.remove(sink)
+
+    def emit(self, event):
+        for sink in self.sinks:
+            sink(event)
+
+
+class QueuedSink:
+    """Buffers events for a consumer that runs outside of command handling.
+
+    Emitting only appends to a deque; ``handler(event, tag)`` runs when the sink is drained,
+    either explicitly or from the ``run()`` task. One sink can be subscribed to many games,
+    using ``tagged()`` to tell their events apart.
+    """
+
+    def __init__(self, handler, maxlen=None):
+        self.handler = handler
+        self.queue = collections.deque(maxlen=maxlen)
+        self.wakeup = None
+
+    def push(self, event, tag=None):
+        self.queue.append((event, tag))
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def __call__(self, event):
+        self.push(event)
+
+    def tagged(self, tag):
+        return functools.partial(self.push, tag=tag)
+
+    def drain(self):
+        while self.queue:
+            self.handler(*self.queue.popleft())
+
+    async def run(self):
+        # game state imports this module, and shouldn't have to wait for asyncio to load
+        import asyncio
+        self.wakeup = asyncio.Event()
+
+        while True:
+            self.drain()
+            self.wakeup.clear()
+            await self.wakeup.wait()
+
+
+def plain(value):
+    if isinstance(value, enum.Enum):
+        return value.name.lower()
+    if isinstance(value, dict):
+        return {plain(k): plain(v) for k, v in value.items()}
+    if hasattr(value, "describe"):
+        return value.describe()
+    if isinstance(value, (list, tuple)):
+        return [plain(v) for v in value]
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+
+    return str(value)
+
+
+def describe(event):
+    """Turns an event into plain JSON-compatible data."""
+    record = {"event": type(event).__name__}
+    record.update((field, plain(getattr(event, field))) for field in event._fields)
+    return record
+
+
+def log_event(event, tag=None):
+    import logging
+    logging.info(f"{tag}: {describe(event)}" if tag is not None else str(describe(event)))
+
+
+class Archive:
+    """Keeps the canonical record of games as JSON lines, one event per line."""
+
+    def __init__(self, file):
+        self.file = file
+
+    def __call__(self, event, tag=None):
+        import json
+        record = describe(event)
+        if tag is not None:
+            record["game"] = str(tag)
+
+        self.file.write(json.dumps(record) + "\n")
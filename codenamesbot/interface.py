@@ -1,13 +1,40 @@
 import logging
 
-from .state import UNLIMITED, Team
+from . import events
+from .state import UNLIMITED, Board, GamePhase, Team
 from .utils import plural
 
+# which method renders each event. methods take the event's fields, in order
+EVENT_HANDLERS = {
+    events.PlayerJoined: "player_joins",
+    events.PlayerLeft: "player_leaves",
+    events.PlayerMoved: "player_team_moved",
+    events.GameStarted: "notify_start",
+    events.TurnStarted: "notify_hinting",
+    events.Hinted: "notify_guessing",
+    events.Guessed: "word_guessed",
+    events.TurnEnded: "turn_ended",
+    events.TimedOut: "turn_timed_out",
+    events.GameWon: "notify_winner",
+}
+
+# how many rendered views an interface keeps for its game's current revision
+VIEW_CACHE_SIZE = 256
+
 
 class Interface():
 
+    # views of the game at views_revision, by name (see rendered)
+    views = None
+    views_game = None
+    views_revision = None
+
     def set_game(self, game):
         self.game = game
+        game.events.subscribe(self.handle_event)
+
+    def handle_event(self, event):
+        getattr(self, EVENT_HANDLERS[type(event)])(*event)
 
     def tell(self, message):
         logging.info(message)
@@ -36,78 +63,149 @@ class Interface():
             f"{self.format_player(player)}'s team preference was unavailable, so they have been moved to the "
             f"{self.format_team(new_team)} team.")
 
+    def word_guessed(self, actor, word, owner, remaining, guesses_left):
+        if owner is None:
+            self.assassin_guessed(actor, word)
+        elif owner == Team.GRAY:
+            self.civilian_guessed(actor, word)
+        else:
+            self.team_guessed(actor, owner, word, remaining, guesses_left)
+
     def assassin_guessed(self, actor, word):
         self.tell(f"{self.format_player(actor)} has revealed the assassin, {word}!")
 
     def civilian_guessed(self, actor, word):
         self.tell(f"{self.format_player(actor)} has revealed a civilian ({word}).")
 
-    def team_guessed(self, actor, team, word):
-        remaining = len(self.game.remaining_words[team])
+    def team_guessed(self, actor, team, word, remaining, guesses_left):
         self.tell(
             f"{self.format_player(actor)} has revealed a {self.format_team(team)} agent. {remaining} left."
         )
 
-        if team == self.game.active_team and self.game.remaining_guesses:
-            if self.game.remaining_guesses is not UNLIMITED:
+        if guesses_left:
+            if guesses_left is not UNLIMITED:
                 self.tell(f"The {self.format_team(team)} team has "
-                          f"{plural(self.game.remaining_guesses, 'guess', 'guesses')} left.")
+                          f"{plural(guesses_left, 'guess', 'guesses')} left.")
 
             else:
                 self.tell(f"The {self.format_team(team)} team has unlimited guesses left.")
 
-    def spymaster_view(self):
-        greens = ", ".join(self.game.remaining_words[Team.GREEN])
-        pinks = ", ".join(self.game.remaining_words[Team.PINK])
-        civilians = ", ".join(self.game.remaining_words[Team.GRAY])
+    def turn_ended(self, team):
+        pass
+
+    def turn_timed_out(self, team, phase):
+        if phase == GamePhase.HINTING:
+            self.tell(f"Time's up! The {self.format_team(team)} team's turn is skipped.")
+        else:
+            self.tell(f"Time's up! The {self.format_team(team)} team is done guessing.")
+
+    def remind(self, players, seconds_left):
+        action = "hint" if self.game.phase == GamePhase.HINTING else "guess"
+        names = ", ".join(self.format_player(p) for p in players)
+        self.tell(f"{names}: {plural(seconds_left, 'second', 'seconds')} left to {action}!")
+
+    def rendered(self, name, render, *args):
+        """Returns ``render(*args)``, only rendering it once per revision of the game."""
+        game = self.game
+        if self.views_revision != game.revision or self.views_game is not game:
+            self.views = {}
+            self.views_game, self.views_revision = game, game.revision
+
+        view = self.views.get(name)
+        if view is None:
+            if len(self.views) >= VIEW_CACHE_SIZE:
+                # the oldest goes first
+                del self.views[next(iter(self.views))]
+
+            view = self.views[name] = render(*args)
+
+        return view
 
-        return (f"Assassin: {self.game.assassin} | {self.format_team(Team.GREEN)}: {greens} | "
+    def board_view(self, name, render, snapshot=None):
+        """Returns ``render(board)`` for the board in ``snapshot``, or the game's board if None.
+        Views of the game's current board are cached; those of older boards aren't."""
+        board = self.game.board
+        if snapshot is None or snapshot.ids is board.ids and snapshot.revealed == board.revealed:
+            return self.rendered(name, render, board)
+
+        return render(Board.restore(snapshot))
+
+    def spymaster_view(self, snapshot=None):
+        return self.board_view("spymaster_view", self.render_spymaster_view, snapshot)
+
+    def render_spymaster_view(self, board):
+        assassin = ", ".join(board.words(board.mask(None)))
+        greens = ", ".join(board.words(board.hidden(Team.GREEN)))
+        pinks = ", ".join(board.words(board.hidden(Team.PINK)))
+        civilians = ", ".join(board.words(board.hidden(Team.GRAY)))
+
+        return (f"Assassin: {assassin} | {self.format_team(Team.GREEN)}: {greens} | "
                 f"{self.format_team(Team.PINK)}: {pinks} | Civilians: {civilians}")
 
-    def full_words_view(self):
-        greens = ", ".join(self.game.words[Team.GREEN])
-        pinks = ", ".join(self.game.words[Team.PINK])
-        civilians = ", ".join(self.game.words[Team.GRAY])
+    def full_words_view(self, snapshot=None):
+        return self.board_view("full_words_view", self.render_full_words_view, snapshot)
+
+    def render_full_words_view(self, board):
+        assassin = ", ".join(board.words(board.mask(None)))
+        greens = ", ".join(board.words(board.mask(Team.GREEN)))
+        pinks = ", ".join(board.words(board.mask(Team.PINK)))
+        civilians = ", ".join(board.words(board.mask(Team.GRAY)))
 
-        return (f"Assassin: {self.game.assassin} | {self.format_team(Team.GREEN)}: {greens} | "
+        return (f"Assassin: {assassin} | {self.format_team(Team.GREEN)}: {greens} | "
                 f"{self.format_team(Team.PINK)}: {pinks} | Civilians: {civilians}")
 
-    def notify_start(self):
-        players = ", ".join(self.format_player(p) for p in self.game.players)
+    def notify_start(self, seed, mode, teams, board):
+        players = ", ".join(self.format_player(p) for team in Team for p in teams[team])
         self.tell(f"{players}: Welcome to an exciting game of Codenames.")
-        self.notify_teams()
+        self.notify_teams(teams)
+
+        self.tell_private(teams[Team.PINK][0], self.spymaster_view(board))
 
-        self.tell_private(self.game.teams[Team.PINK].spymaster, self.spymaster_view())
+    def notify_teams(self, teams=None):
+        if teams is None:
+            lines = self.rendered("teams", self.render_teams)
+        else:
+            lines = self.render_teams(teams)
+
+        for line in lines:
+            self.tell(line)
+
+    def render_teams(self, teams=None):
+        if teams is None:
+            teams = {team: tuple(self.game.teams[team]) for team in Team}
 
-    def notify_teams(self):
+        lines = []
         for team in [Team.GREEN, Team.PINK]:
-            team = self.game.teams[team]
-            members = ", ".join([f"{self.format_player(team.spymaster)} (spymaster)"] +
-                                [self.format_player(p) for p in team.guessers])
-            self.tell(f"{self.format_team(team.team)}: {members}")
+            spymaster, *guessers = teams[team]
+            members = ", ".join([f"{self.format_player(spymaster)} (spymaster)"] +
+                                [self.format_player(p) for p in guessers])
+            lines.append(f"{self.format_team(team)}: {members}")
 
-        if self.game.teams[Team.GRAY].guessers:
-            members = ", ".join(self.format_player(p) for p in self.game.teams[Team.GRAY])
-            self.tell(f"{self.format_team(Team.GRAY)}: {members}")
+        if teams[Team.GRAY]:
+            members = ", ".join(self.format_player(p) for p in teams[Team.GRAY])
+            lines.append(f"{self.format_team(Team.GRAY)}: {members}")
 
-    def notify_hinting(self, team, spymaster):
+        return tuple(lines)
+
+    def notify_hinting(self, team, spymaster, board):
         self.tell(
             f"{self.format_player(spymaster)}: You're up! It's {self.format_team(team)}'s turn to hint."
         )
-        self.tell_private(spymaster, self.spymaster_view())
+        self.tell_private(spymaster, self.spymaster_view(board))
 
-    def notify_guessing(self, team, guessers):
+    def notify_guessing(self, team, word, number, guessers, board):
         joined = ", ".join(self.format_player(g) for g in guessers)
-
-        hint = self.game.current_hint
-        number_str = "unlimited" if hint[1] is UNLIMITED else str(hint[1])
+        number_str = "unlimited" if number is UNLIMITED else str(number)
 
         self.tell(f"{joined}: You're up! It's {self.format_team(team)}'s turn to guess. "
-                  f"The clue is {hint[0]} ({number_str}).")
+                  f"The clue is {word} ({number_str}).")
 
-        words_left = ", ".join(self.game.all_words)
+        words_left = self.board_view("words_left", self.render_words_left, board)
         self.tell(f"Here are the remaining words: {words_left}.")
 
-    def notify_winner(self):
-        self.tell(f"The game is over. The {self.format_team(self.game.winner)} team wins!")
-        self.tell(f"Words: {self.full_words_view()}")
+    def render_words_left(self, board):
+        return ", ".join(board.words(board.unrevealed()))
+
+    def notify_winner(self, winner, board):
+        self.tell(f"The game is over. The {self.format_team(winner)} team wins!")
+        self.tell(f"Words: {self.full_words_view(board)}")
@@ -1,10 +1,27 @@
-from pyrcb2 import Event, IRCBot
-
+import collections
+import contextlib
+import functools
+import logging
+import time
+import types
+
+from . import events
+from .bots import GuesserPool
+from .events import Archive, QueuedSink, log_event
 from .interface import Interface
-from .state import UNLIMITED, Game, GameMode, GamePhase, InvalidGameState, Player, Team
-from .utils import plural
-
-import random
+from .manager import GameManager
+from .metrics import Registry, serve
+from .output import OutputBuffer
+from .persistence import GameStore
+from .profiling import CommandProfiler
+from .queues import CommandQueue
+from .scheduler import Priority, SendScheduler
+from .spectators import SpectatorInterface
+from .spectators import serve as serve_spectators
+from .state import BOARD_SIZE, UNLIMITED, Game, GameMode, GamePhase, InvalidGameState, Player, Team
+from .timers import TurnTimers, players_up
+from .utils import irc_lower, plural
+from .words import table_named
 
 PREFIX = "-"
 MISSING = object()
@@ -28,96 +45,663 @@ MODE_MAP = {
     "grey": GameMode.GRAY,
 }
 
+TIMER_MAP = {
+    "c": GamePhase.HINTING,
+    "clue": GamePhase.HINTING,
+    "h": GamePhase.HINTING,
+    "hint": GamePhase.HINTING,
+    "g": GamePhase.GUESSING,
+    "guess": GamePhase.GUESSING,
+}
+TIMER_OFF = {"off", "none", "0"}
+# shorter turns than this aren't worth playing
+MIN_TIME_LIMIT = 10
+
 B = "\x02"
 N = "\x0f"
 GRN = "\x0303"
 PNK = "\x0313"
 
+TEAM_NAMES = {
+    Team.GREEN: f"{B}{GRN}Green{N}",
+    Team.PINK: f"{B}{PNK}Pink{N}",
+    Team.GRAY: f"{B}Gray{N}",
+}
+TEAM_COLORS = {Team.GREEN: GRN, Team.PINK: PNK, Team.GRAY: "", None: ""}
+
+# pyrcb2 events -> the IRCInterface methods handling them
+EVENTS = {"privmsg": "on_privmsg", "nick": "on_nick", "part": "on_part", "kick": "on_kick"}
+
+# events that move a game into a new phase -> that phase, for counting transitions
+PHASE_EVENTS = {
+    events.TurnStarted: "hinting",
+    events.Hinted: "guessing",
+    events.GameWon: "post_game",
+}
+
+# how many commands -profile profiles, unless told otherwise, and at most
+PROFILE_COMMANDS = 20
+MAX_PROFILE_COMMANDS = 10000
 
-def command(names, only_during_game=False, only_for_joined=False):
+# IRCInterface methods that change game state. calls to them are journaled and replayed
+JOURNALED = {"open", "dispatch", "time_out", "rename", "close"}
+
+# what a command needs checked before it runs. needs_player is set for commands taking a Player
+Command = collections.namedtuple("Command",
+                                 ["name", "handler", "during_game", "needs_player", "priority"])
+
+
+def command(names, only_during_game=False, only_for_joined=False, priority=Priority.NORMAL):
 
     def wrapper(f):
-        f._is_command = True
         f._command_names = names
-        f._during_game = only_during_game
-        f._only_for_joined = only_for_joined
+        f._command = Command(f.__name__[len("command_"):], f, only_during_game, only_during_game or
+                             only_for_joined, priority)
         return f
 
     return wrapper
 
 
-class IRCInterface(Interface):
+def register_commands(cls):
+    """Builds ``cls.commands``, mapping every alias to its Command, once for the whole class."""
+    cls.commands = {}
+    for name in dir(cls):
+        thing = getattr(cls, name)
+        record = getattr(thing, "_command", None)
+        if record is not None:
+            cls.commands.update(dict.fromkeys(thing._command_names, record))
 
-    def __init__(self, nick, channel):
-        self.bot = IRCBot(log_communication=True)
-        self.bot.load_events(self)
+    return cls
 
-        self.commands = dict()
-        self.load_commands()
 
-        self.nick = nick
-        self.channel = channel
-        self.game = Game(interface=self)
+class IRCInterface:
+    # whether games run in this process. a Supervisor passes them on to workers, so it has no
+    # use for event sinks, bot guessers or turn timers
+    runs_games = True
 
-    def load_commands(self):
-        for thing in dir(self):
-            thing = getattr(self, thing)
-            if not getattr(thing, "_is_command", False):
-                continue
+    def __init__(self,
+                 nick,
+                 channels,
+                 state_dir=None,
+                 embeddings=None,
+                 admins=(),
+                 metrics_port=None,
+                 profile_dir="profiles",
+                 spectator_port=None,
+                 archive=None):
+        # the connection is only made (and pyrcb2 only imported) by start()
+        self.bot = None
 
-            for name in thing._command_names:
-                self.commands[name] = thing
+        if isinstance(channels, str):
+            channels = [channels]
+
+        self.nick = nick
+        self.channels = channels
+        self.games = GameManager(lambda channel: ChannelInterface(self, channel))
+        self.commands = ChannelInterface.commands
+        self.scheduler = SendScheduler(self.privmsg)
+        self.output = OutputBuffer(self.scheduler.submit)
+
+        # slow consumers of game events, drained by their own tasks rather than per command.
+        # if the log falls this far behind, its oldest events are dropped
+        self.sinks = [QueuedSink(log_event, maxlen=10000)] if self.runs_games else []
+
+        # the canonical record of every game, as JSON lines appended to the file ``archive``.
+        # it's unbounded, since every event has to make it there
+        self.archive = archive
+        if archive is not None and self.runs_games:
+            self.sinks.append(QueuedSink(Archive(open(archive, "a", buffering=1))))
+
+        # the clue assistant's embedding file, only loaded once someone asks for a suggestion
+        self.embeddings_path = embeddings
+        self.embeddings = None
+        self.private_commands = {
+            "suggest": self.command_suggest,
+            "metrics": self.command_metrics,
+            "profile": self.command_profile,
+        }
+
+        # nicks allowed to use admin commands. they should be registered with services, so
+        # nobody else can take them
+        self.admins = {irc_lower(admin) for admin in admins}
+
+        self.metrics = Registry()
+        self.metrics_port = metrics_port
+        self.register_metrics()
+
+        # set while -profile is profiling commands
+        self.profiler = None
+        self.profile_dir = profile_dir
+
+        # games are only sent to spectators if there's somewhere for them to watch
+        self.spectator_port = spectator_port
+
+        # bot guessers in every channel share one pool, so their guesses are ranked in batches
+        self.guessers = GuesserPool(self.load_embeddings) if self.runs_games else None
+
+        # every channel's turn timers share one timing wheel
+        self.timers = TurnTimers() if self.runs_games else None
+
+        # once connected, each game's commands go through its own queue (see submit)
+        self.queued = False
+
+        self.store = None
+        self.replaying = False
+        if state_dir is not None:
+            self.store = GameStore(state_dir)
+            self.recover()
+            self.store.open()
+
+    def recover(self):
+        games, records = self.store.load()
+        for channel, game in games.items():
+            game.attach(self.games.open(channel))
+
+        # everything said during the replay was already said before the crash
+        self.replaying = True
+        try:
+            with self.output.discarding():
+                for kind, *args in records:
+                    if kind in JOURNALED:
+                        getattr(self, kind)(*args)
+        finally:
+            self.replaying = False
+
+    def journal(self, kind, *args):
+        if self.store is not None and not self.replaying:
+            self.store.record(kind, *args)
+
+    def live_games(self):
+        return {interface.channel: interface.game for interface in self.games}
+
+    def connect_events(self):
+        from pyrcb2 import Event, IRCBot
+
+        # pyrcb2 marks handlers with attributes, which bound methods can't take, so each one is
+        # wrapped and the wrappers are loaded together
+        bot = IRCBot(log_communication=True)
+        bot.load_events(
+            types.SimpleNamespace(
+                **{
+                    handler: getattr(Event, event)(functools.partial(getattr(self, handler)))
+                    for event, handler in EVENTS.items()
+                }))
+
+        # outbound pacing is up to the scheduler, so don't let pyrcb2 delay privmsgs again
+        bot.delay_privmsgs = False
+        return bot
 
     def start(self):
+        self.bot = self.connect_events()
         self.bot.call_coroutine(self.start_async())
 
     async def start_async(self):
         await self.bot.connect("chat.freenode.net", 6697, ssl=True)
         await self.bot.register(self.nick)
-        await self.bot.join(self.channel)
+        for coroutine in self.background():
+            self.bot.schedule_coroutine(coroutine)
+        self.queued = True
+        for channel in self.channels:
+            await self.bot.join(channel)
         await self.bot.listen()
 
-    @Event.privmsg
+    def background(self):
+        """Returns the coroutines that run alongside command handling for as long as we do."""
+        coroutines = [self.scheduler.run()]
+        if self.runs_games:
+            coroutines += [self.guessers.run(), self.timers.wheel.run()]
+        coroutines += [sink.run() for sink in self.sinks]
+        if self.store is not None:
+            coroutines.append(self.store.run(self.live_games))
+        if self.metrics_port is not None:
+            coroutines.append(serve(self.metrics, port=self.metrics_port))
+        if self.spectator_port is not None:
+            coroutines.append(serve_spectators(self.spectators_of, port=self.spectator_port))
+
+        return coroutines
+
     def on_privmsg(self, sender, channel, message):
         if channel is None:
-            # ignore PMs
+            self.on_private(str(sender), message)
             return
 
-        message = message.strip()
+        # most of what's said in a channel isn't for us, so turn it away before copying anything
+        message = message.lstrip()
         if not message.startswith(PREFIX):
-            # ignore non-commands
             return
 
-        command_and_args = message[1:].lower().split()
-        command, args = command_and_args[0], command_and_args[1:]
+        command_and_args = message[len(PREFIX):].split(None, 1)
+        if not command_and_args:
+            return
+
+        command = command_and_args[0].lower()
+        if command not in self.commands:
+            return
+
+        args = command_and_args[1].lower().split() if len(command_and_args) > 1 else []
+        self.submit(str(sender), str(channel), command, args)
+
+    def on_private(self, sender, message):
+        command_and_args = message.strip().lower().split()
+        if not command_and_args or not command_and_args[0].startswith(PREFIX):
+            return
+
+        command = self.private_commands.get(command_and_args[0][len(PREFIX):])
+        if command is not None:
+            with self.output.collect():
+                command(sender, command_and_args[1:])
+
+    def on_nick(self, sender, new_nick):
+        self.rename(str(sender), str(new_nick))
+
+    def on_part(self, sender, channel, message):
+        if sender == self.bot.nickname:
+            self.close(str(channel))
+
+    def on_kick(self, sender, channel, target, message):
+        if target == self.bot.nickname:
+            self.close(str(channel))
+
+    def open(self, channel, seed=None):
+        interface = self.games.get(channel)
+        if interface is None:
+            interface = self.games.open(channel)
+            if seed is not None:
+                interface.game.reseed(seed)
+
+            self.journal("open", channel, interface.game.seed)
+
+        return interface
+
+    def submit(self, sender, channel, command, args):
+        """Queues a command behind the ones already waiting in its game.
+
+        Before the event loop is running (in tests, benchmarks and replays) commands are
+        dispatched straight away instead.
+        """
+        self.enqueue(channel, self.dispatch, sender, channel, command, args)
+
+    def enqueue(self, channel, handler, *args):
+        if not self.queued:
+            handler(*args)
+            return
+
+        queue = self.open(channel).queue
+        queue.put(handler, *args)
+        queue.start()
+
+    def dispatch(self, sender, channel, command, args):
+        interface = self.open(channel)
+        if command not in interface.commands:
+            return
+
+        # commands may rewrite their args, so journal them before they run
+        record = (sender, channel, command, list(args))
+
+        profiler = self.profiler
+        if profiler is not None and not profiler.wants(channel):
+            profiler = None
+
+        with self.output.collect():
+            started = time.perf_counter()
+            if profiler is not None:
+                profiler.start()
+
+            try:
+                interface.handle_command(sender, command, args)
+            except InvalidGameState as e:
+                interface.tell(str(e))
+            else:
+                self.journal("dispatch", *record)
+            finally:
+                interface.inbox.drain()
+                if profiler is not None:
+                    profiler.stop()
+                self.record_command(interface.commands[command].name,
+                                    time.perf_counter() - started)
+
+            if profiler is not None and profiler.done:
+                self.finish_profile()
+
+    def time_out(self, channel, turn=None):
+        """Ends the turn in ``channel``, unless it isn't ``turn`` any more."""
+        interface = self.games.get(channel)
+        if interface is None or turn is not None and not self.timers.current(interface.game, turn):
+            return
+
+        with self.output.collect():
+            try:
+                interface.game.time_out()
+            except InvalidGameState:
+                return
+            else:
+                self.journal("time_out", channel)
+            finally:
+                interface.inbox.drain()
+
+    def rename(self, sender, new_nick):
+        self.journal("rename", sender, new_nick)
+
+        for interface in self.games:
+            player = interface.game.players.get(sender)
+            if player is None:
+                continue
+
+            try:
+                player.rename(new_nick)
+            except ValueError:
+                # a stale player already holds the new nick in this game; leave them both be
+                continue
+
+            interface.game.touch()
+
+    def close(self, channel):
+        self.journal("close", channel)
+        interface = self.games.close(channel)
+        if interface is not None:
+            interface.queue.stop()
+            self.timers.cancel(interface.game)
+
+    def spectators_of(self, channel):
+        interface = self.games.get(channel)
+        return interface.spectators if interface is not None else None
+
+    def queue_metrics(self):
+        return {interface.channel: interface.queue.metrics() for interface in self.games}
+
+    def register_metrics(self):
+        metrics = self.metrics
+
+        # from handle_command to the replies being queued: Game.guess, Game.start_game and the
+        # like, and then telling everyone what they changed. one histogram observation per
+        # command is all that's recorded on the way
+        self.command_seconds = metrics.histogram("codenames_command_seconds",
+                                                 "Time to handle a command, by command",
+                                                 ["command"])
+        self.command_observers = {}
+        self.transitions = metrics.counter("codenames_phase_transitions_total",
+                                           "Games entering each phase", ["phase"])
+        self.transition_counters = {
+            event: self.transitions.labels(phase) for event, phase in PHASE_EVENTS.items()
+        }
+        self.lines_sent = metrics.counter("codenames_lines_sent_total", "Lines sent").labels()
+        self.bytes_sent = metrics.counter("codenames_bytes_sent_total",
+                                          "Bytes of message text sent").labels()
+
+        metrics.gauge("codenames_games", "Open games, by phase", self.count_games, ["phase"])
+        metrics.gauge("codenames_players", "Players in open games",
+                      lambda: sum(len(game.players) for game in self.games.games()))
+        metrics.gauge("codenames_send_queue_depth", "Lines waiting to be sent",
+                      lambda: self.scheduler.depth)
+        metrics.gauge("codenames_command_queue_depth", "Commands waiting to be handled",
+                      lambda: sum(interface.queue.depth for interface in self.games))
+
+        # how long lines and commands wait, from the WaitStats of the scheduler and of every
+        # game's queue (see ChannelInterface). closing a game doesn't lose its queue's waits
+        self.send_waits = metrics.histogram("codenames_send_wait_seconds",
+                                            "Time lines waited to be sent, by priority",
+                                            ["priority"])
+        for priority, waits in self.scheduler.waits.items():
+            waits.histogram = self.send_waits.labels(priority.name.lower())
+        self.queue_waits = metrics.histogram("codenames_command_queue_wait_seconds",
+                                             "Time commands waited behind their game's others")
+
+    def count_games(self):
+        games = collections.Counter(game.phase.name.lower() for game in self.games.games())
+        return {(phase.name.lower(),): games[phase.name.lower()] for phase in GamePhase}
+
+    def record_command(self, name, seconds):
+        # each command's bound observe is kept, since this runs on every command
+        observe = self.command_observers.get(name)
+        if observe is None:
+            observe = self.command_observers[name] = self.command_seconds.labels(name).observe
+
+        observe(seconds)
+
+    def record_event(self, event):
+        counter = self.transition_counters.get(type(event))
+        if counter is not None:
+            counter.inc()
+
+    def is_admin(self, sender):
+        return irc_lower(sender) in self.admins
+
+    def command_metrics(self, sender, args):
+        if not self.is_admin(sender):
+            self.output.add(sender, "Sorry, only admins can do that.")
+            return
+
+        games = self.count_games()
+        players = self.metrics["codenames_players"].read()
+        self.output.add(
+            sender, f"{plural(len(self.games), 'game', 'games')} open "
+            f"({games['guessing', ] + games['hinting', ]} running), "
+            f"{plural(players, 'player', 'players')}, "
+            f"{plural(self.lines_sent.value, 'line', 'lines')} sent "
+            f"({self.bytes_sent.value} bytes).")
+
+        # the busiest commands, with rough percentiles from their histograms
+        commands = sorted(self.command_seconds.children.items(), key=lambda item: -item[1].count)
+        latencies = ", ".join(f"{name} {histogram.count}x mean {histogram.mean * 1000:.2f}ms "
+                              f"p99 <{histogram.quantile(0.99) * 1000:g}ms"
+                              for (name,), histogram in commands[:8])
+        self.output.add(sender, f"Commands: {latencies or 'none yet'}.")
+
+        waits = [("commands", self.queue_waits.labels(),
+                  sum(interface.queue.depth for interface in self.games))]
+        waits += [(f"{priority.name.lower()} lines", self.send_waits.labels(priority.name.lower()),
+                   self.scheduler.depths[priority]) for priority in Priority]
+        summary = ", ".join(f"{name} {histogram.mean * 1000:.2f}ms mean, "
+                            f"p99 <{histogram.quantile(0.99) * 1000:g}ms, {depth} waiting"
+                            for name, histogram, depth in waits)
+        self.output.add(sender, f"Waits: {summary}.")
+
+    def command_profile(self, sender, args):
+        if not self.is_admin(sender):
+            self.output.add(sender, "Sorry, only admins can do that.")
+            return
+
+        if args == ["stop"]:
+            if self.profiler is None:
+                self.output.add(sender, "Nothing is being profiled.")
+            else:
+                self.finish_profile()
+            return
+
+        if self.profiler is not None:
+            self.output.add(sender, "Already profiling. Use -profile stop to stop early.")
+            return
+
+        limit, channel = PROFILE_COMMANDS, None
+        for arg in args:
+            if arg.isdigit() and 0 < int(arg) <= MAX_PROFILE_COMMANDS:
+                limit = int(arg)
+            elif arg.startswith("#"):
+                channel = arg
+            elif arg != "all":
+                self.output.add(
+                    sender, "Usage: -profile [number of commands] [#channel or all], or "
+                    f"-profile stop. At most {MAX_PROFILE_COMMANDS} commands.")
+                return
+
+        self.profiler = CommandProfiler(limit, channel, sender)
+        self.output.add(
+            sender, f"Profiling the next {plural(limit, 'command', 'commands')} in "
+            f"{channel or 'every channel'}.")
+
+    def finish_profile(self):
+        profiler, self.profiler = self.profiler, None
 
+        where = (profiler.channel or "all").lstrip("#")
+        name = f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{where}"
         try:
-            self.handle_command(sender, command, args)
+            paths = profiler.save(self.profile_dir, name)
+        except OSError as e:
+            logging.exception("couldn't save a profile")
+            paths = None
+            self.output.add(profiler.admin, f"Couldn't save the profile: {e.strerror}.")
+
+        self.output.add(
+            profiler.admin, f"Profiled {plural(profiler.commands, 'command', 'commands')} in "
+            f"{profiler.channel or 'every channel'}, {profiler.total() * 1000:.2f}ms in all.")
+
+        hottest = ", ".join(f"{function} {own * 1000:.2f}ms ({total * 1000:.2f}ms with "
+                            f"callees, {calls}x)"
+                            for function, own, total, calls in profiler.hottest())
+        self.output.add(profiler.admin, f"Hottest: {hottest or 'nothing ran'}.")
+        if paths is not None:
+            self.output.add(profiler.admin, f"Saved {paths[0]} and {paths[1]}.")
+
+    def load_embeddings(self):
+        if self.embeddings is None:
+            if self.embeddings_path is None:
+                raise InvalidGameState("Clue suggestions aren't set up on this bot.")
+
+            try:
+                from .embeddings import Embeddings
+            except ImportError:
+                raise InvalidGameState("Clue suggestions need numpy, which isn't installed.")
+
+            self.embeddings = Embeddings.load(self.embeddings_path)
+
+        return self.embeddings
+
+    def spymaster_of(self, sender, interfaces):
+        """Yields (interface, player) for each running game in which ``sender`` is a spymaster."""
+        for interface in interfaces:
+            if interface is None or interface.game.phase == GamePhase.PRE_GAME:
+                continue
+
+            player = interface.game.players.get(sender)
+            if player is not None and player in {
+                    interface.game.teams[Team.GREEN].spymaster,
+                    interface.game.teams[Team.PINK].spymaster
+            }:
+                yield interface, player
+
+    def command_suggest(self, sender, args):
+        interfaces = [self.games.get(args[0])] if args else list(self.games)
+        spymasters = list(self.spymaster_of(sender, interfaces))
+
+        try:
+            if not spymasters:
+                raise InvalidGameState("You're not a spymaster in any running game.")
+            elif len(spymasters) > 1:
+                raise InvalidGameState("You're a spymaster in more than one game. "
+                                       "Say which one, like this: -suggest #channel")
+
+            interface, player = spymasters[0]
+            words = interface.game.remaining_words
+            suggestions = self.load_embeddings().suggest(words[player.team], words[~player.team],
+                                                         words[Team.GRAY],
+                                                         [interface.game.assassin])
         except InvalidGameState as e:
-            self.tell(str(e))
+            self.output.add(sender, str(e))
+            return
 
-    @Event.nick
-    def on_nick(self, sender, new_nick):
-        if sender in self.game.players:
-            self.game.players[sender].rename(new_nick)
+        if not suggestions:
+            self.output.add(sender, "No clue comes to mind for your words, sorry.")
+            return
+
+        clues = ", ".join(
+            f"{clue} {number} ({', '.join(targets)})" for clue, number, targets in suggestions)
+        self.output.add(sender, f"Clues for {interface.channel}: {clues}")
+
+    def privmsg(self, target, message):
+        self.lines_sent.inc()
+        self.bytes_sent.inc(len(message.encode()))
+        self.bot.privmsg(target, message)
+
+
+class ChannelInterface(Interface):
+    """The interface for a single channel's game, sharing the connection of an IRCInterface."""
+
+    # every alias -> its Command, filled in by register_commands when the class is defined
+    commands = {}
+
+    def __init__(self, server, channel):
+        self.server = server
+        self.channel = channel
+        self.priority = Priority.NORMAL
+
+        # game events are rendered once the command that caused them has finished
+        self.inbox = QueuedSink(lambda event, tag: self.handle_event(event))
+        self.queue = CommandQueue(channel)
+        self.queue.waits.histogram = server.queue_waits.labels()
+        self.spectators = (SpectatorInterface(channel)
+                           if server.spectator_port is not None else None)
+
+        self.game = Game(interface=self)
+
+    def new_game(self):
+        # seeded from the last game, so a replayed journal gets the same follow-up games. the
+        # channel keeps its word pack and time limits
+        table, time_limits = self.game.table, self.game.time_limits
+        self.server.timers.cancel(self.game)
+
+        self.game = Game(interface=self, seed=self.game.random.getrandbits(32))
+        self.game.table = table
+        self.game.time_limits = time_limits
+
+    def set_game(self, game):
+        self.game = game
+        game.events.subscribe(self.inbox)
+        for sink in self.server.sinks:
+            game.events.subscribe(sink.tagged(self.channel))
+        self.server.guessers.watch(game, self.bot_act)
+        self.server.timers.watch(game, self.turn_expired, self.turn_reminder)
+        game.events.subscribe(self.server.record_event)
+        if self.spectators is not None:
+            self.spectators.set_game(game)
+
+    def bot_act(self, game, player, command, word=None):
+        # bots play through dispatch like everyone else, so their moves are journaled too. they
+        # skip the game's queue: dispatch never awaits, so no command is ever half done here
+        self.server.dispatch(player.name, self.channel, command,
+                             word.lower().split() if word else [])
+
+    def turn_expired(self, game, turn):
+        # running out of time changes the game, so it's queued and journaled like a command
+        if game is self.game:
+            self.server.enqueue(self.channel, self.server.time_out, self.channel, turn)
+
+    def turn_reminder(self, game, seconds_left):
+        players = players_up(game)
+        if game is not self.game or not players:
+            return
+
+        with self.server.output.collect(), self.prioritized(Priority.HIGH):
+            self.remind(players, seconds_left)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        register_commands(cls)
 
     def handle_command(self, actor, command, args):
-        if command not in self.commands:
+        command = self.commands.get(command)
+        if command is None:
             return
 
-        command = self.commands[command]
-        if command._during_game:
-            if self.game.phase == GamePhase.PRE_GAME:
-                self.tell("Sorry, this command only works during a game.")
-                return
+        if command.during_game and self.game.phase == GamePhase.PRE_GAME:
+            self.tell("Sorry, this command only works during a game.")
+            return
 
-        if command._during_game or command._only_for_joined:
+        if command.needs_player:
             actor = self.game.players.get(actor)
             if actor is None:
                 self.tell("Sorry, you need to be in the game to do that.")
                 return
 
-        command(actor, args)
+        with self.prioritized(command.priority):
+            command.handler(self, actor, args)
+
+    @contextlib.contextmanager
+    def prioritized(self, priority):
+        previous, self.priority = self.priority, priority
+        try:
+            yield
+        finally:
+            self.priority = previous
 
     @command({"j", "join", "jonge", "jord"})
     def command_join(self, actor, args):
@@ -145,6 +729,7 @@ class IRCInterface(Interface):
             raise InvalidGameState("Invalid team preference.")
 
         actor.team = team_pref
+        self.game.touch()
         if team_pref is not None:
             self.tell(
                 f"{self.format_player(actor)} wants to be on the {self.format_team(team_pref)} team."
@@ -165,27 +750,94 @@ class IRCInterface(Interface):
             raise InvalidGameState("You can only specify a game mode before the game.")
 
         self.game.mode = mode
+        self.game.touch()
         self.tell(f"{self.format_player(actor)} has set the game mode to {B}{mode}{N}")
 
+    @command({"pack", "wordpack"}, only_for_joined=True)
+    def command_pack(self, actor, args):
+        if not args:
+            from .packs import available
+            packs = ", ".join(sorted({"default", *available()}))
+            self.tell(f"This game uses the {B}{self.game.table.name}{N} word pack. "
+                      f"Available packs: {packs}.")
+            return
+
+        if self.game.phase is not GamePhase.PRE_GAME:
+            raise InvalidGameState("You can only pick a word pack before the game.")
+
+        name = args[0].lower()
+        try:
+            table = table_named(name)
+        except KeyError:
+            raise InvalidGameState(f"There's no word pack called {name}.")
+        except ValueError:
+            raise InvalidGameState(f"The {name} word pack couldn't be read.")
+
+        if len(table) < BOARD_SIZE:
+            raise InvalidGameState(f"The {name} word pack doesn't have enough words for a board.")
+
+        self.game.table = table
+        self.game.touch()
+        self.tell(f"{self.format_player(actor)} has picked the {B}{name}{N} word pack "
+                  f"({plural(len(table), 'word', 'words')}).")
+
+    @command({"timer", "timers"}, only_for_joined=True)
+    def command_timer(self, actor, args):
+        limits = self.game.time_limits
+        if not args:
+            hint, guess = (limits.get(phase) for phase in (GamePhase.HINTING, GamePhase.GUESSING))
+            self.tell(f"Spymasters have {self.format_limit(hint)} to hint and guessers have "
+                      f"{self.format_limit(guess)} to guess.")
+            return
+
+        if self.game.phase is not GamePhase.PRE_GAME:
+            raise InvalidGameState("You can only set timers before the game.")
+
+        phase = TIMER_MAP.get(args[0])
+        if len(args) != 2 or phase is None:
+            raise InvalidGameState("Invalid syntax. Try -timer hint 120, -timer guess 180 or "
+                                   "-timer hint off.")
+
+        if args[1] in TIMER_OFF:
+            limits.pop(phase, None)
+        elif args[1].isdigit() and int(args[1]) >= MIN_TIME_LIMIT:
+            limits[phase] = int(args[1])
+        else:
+            raise InvalidGameState(
+                f"Time limits must be a number of seconds, at least {MIN_TIME_LIMIT}.")
+        self.game.touch()
+
+        action = "hint" if phase == GamePhase.HINTING else "guess"
+        self.tell(f"{self.format_player(actor)} has given everyone "
+                  f"{self.format_limit(limits.get(phase))} to {action}.")
+
     @command({"spymaster"}, only_for_joined=True)
     def command_spymaster_pref(self, actor, args):
         if self.game.phase is not GamePhase.PRE_GAME:
             raise InvalidGameState("You can only specify a spymaster preference before the game.")
 
         actor.toggle_spymaster_preference()
+        self.game.touch()
         pref = "wants" if actor.spymaster_preference else "does not want"
 
         self.tell(f"{self.format_player(actor)} {pref} to be a spymaster.")
 
     @command({"start"})
     def command_start(self, actor, args):
-        self.game.start_game()
+        seed = None
+        if args:
+            if not args[0].isdigit():
+                raise InvalidGameState("Invalid syntax. The seed for -start must be a number.")
+
+            seed = int(args[0])
+
+        self.game.start_game(seed)
 
     @command({"endgame"})
     def command_force_endgame(self, actor, args):
         self.tell(f"{self.format_player(actor)} is forcing the game to end immediately.")
         self.tell(self.full_words_view())
-        self.game = Game(interface=self)
+        self.new_game()
 
     @command({"c", "clue", "h", "hint"}, only_during_game=True)
     def command_hint(self, actor, args):
@@ -214,75 +866,120 @@ class IRCInterface(Interface):
     def command_stop(self, actor, args):
         self.game.stop(actor)
 
-    @command({"stats", "status", "players"})
+    @command({"bot", "addbot"}, only_during_game=True)
+    def command_bot(self, actor, args):
+        team = TEAM_MAP.get(args[0].lower()) if args else None
+
+        # fail now rather than when the bot first has to guess
+        self.server.load_embeddings()
+        self.server.guessers.join(self.game, team)
+
+    @command({"stats", "status", "players"}, priority=Priority.LOW)
     def command_stats(self, actor, args):
+        for line in self.rendered("stats", self.render_stats):
+            self.tell(line)
+
+    def render_stats(self):
         if self.game.phase in {GamePhase.GUESSING, GamePhase.HINTING}:
-            self.notify_teams()
             action = ("guess" if self.game.phase == GamePhase.GUESSING else
                       "hint" if self.game.phase == GamePhase.HINTING else "???")
 
-            self.tell(f"It's {self.game.active_team}'s turn to {action}.")
+            return self.rendered("teams", self.render_teams) + (
+                f"It's {self.game.active_team}'s turn to {action}.",)
 
         elif self.game.phase == GamePhase.PRE_GAME and self.game.players:
             n = len(self.game.players)
             players = ", ".join(self.format_player(p) for p in self.game.players)
 
-            self.tell(f"{plural(n, 'player', 'players')}: {players}. The game hasn't started yet.")
+            return (f"{plural(n, 'player', 'players')}: {players}. The game hasn't started yet.",)
 
         else:
-            self.tell("No players yet.")
+            return ("No players yet.",)
 
     @command({"w", "words"}, only_during_game=True)
     def command_words(self, actor, args):
-        remaining = ", ".join(self.game.all_words)
-
-        greens = ", ".join(self.game.guessed_words[Team.GREEN])
-        pinks = ", ".join(self.game.guessed_words[Team.PINK])
-        civilians = ", ".join(self.game.guessed_words[Team.GRAY])
-
-        self.tell(
-            f"{B}{GRN}Green{N}: {greens} | {B}{PNK}Pink{N}: {pinks} | {B}Civilians{N}: {civilians}"
-        )
-        self.tell(f"Remaining words: {remaining}.")
+        for line in self.rendered("words", self.render_words):
+            self.tell(line)
 
         if actor in {self.game.teams[Team.GREEN].spymaster, self.game.teams[Team.PINK].spymaster}:
             self.tell_private(actor, self.spymaster_view())
 
-    @command({"pony"})
+    def render_words(self):
+        remaining = ", ".join(self.game.all_words)
+
+        guessed = self.game.guessed_words
+        greens = ", ".join(guessed[Team.GREEN])
+        pinks = ", ".join(guessed[Team.PINK])
+        civilians = ", ".join(guessed[Team.GRAY])
+
+        return (f"{B}{GRN}Green{N}: {greens} | {B}{PNK}Pink{N}: {pinks} | "
+                f"{B}Civilians{N}: {civilians}", f"Remaining words: {remaining}.")
+
+    @command({"pony"}, priority=Priority.LOW)
     def command_pony(self, actor, args):
         self.tell(f"{B}{actor}{N} flips a pony into the air...")
 
-        v = random.random()
+        v = self.game.random.random()
         result = "head" if v < 0.3 else "tail" if v < 0.9 else "side"
 
         self.tell(f"The pony lands on its {B}{result}{N}.")
 
-    def notify_winner(self):
-        super().notify_winner()
-        self.game = Game(interface=self)
+    def notify_hinting(self, *args):
+        with self.prioritized(Priority.HIGH):
+            super().notify_hinting(*args)
+
+    def notify_guessing(self, *args):
+        with self.prioritized(Priority.HIGH):
+            super().notify_guessing(*args)
+
+    def notify_winner(self, *args):
+        super().notify_winner(*args)
+        self.new_game()
 
     def format_player(self, player):
+        return self.rendered(("player", player), self.render_player, player)
+
+    def render_player(self, player):
         if not isinstance(player, Player) or self.game.phase == GamePhase.PRE_GAME:
             return f"{B}{player}{N}"
 
-        color = {Team.GREEN: GRN, Team.PINK: PNK, Team.GRAY: "", None: ""}[player.team]
+        return f"{B}{TEAM_COLORS[player.team]}{player}{N}"
+
+    def format_limit(self, seconds):
+        if seconds is None:
+            return "unlimited time"
 
-        return f"{B}{color}{player}{N}"
+        return f"{B}{plural(seconds, 'second', 'seconds')}{N}"
 
     def format_team(self, team):
-        return {
-            Team.GREEN: f"{B}{GRN}Green{N}",
-            Team.PINK: f"{B}{PNK}Pink{N}",
-            Team.GRAY: f"{B}Gray{N}",
-        }[team]
+        return TEAM_NAMES[team]
 
     def tell(self, message):
-        self.bot.privmsg(self.channel, message)
+        self.server.output.add(self.channel, message, self.priority)
 
     def tell_private(self, player, message):
-        self.bot.privmsg(player.name, message)
-
-
-def run_bot(nick, channel):
-    bot = IRCInterface(nick, channel)
+        self.server.output.add(player.name, message, Priority.HIGH)
+
+
+register_commands(ChannelInterface)
+
+
+def run_bot(nick,
+            channels,
+            state_dir=None,
+            embeddings=None,
+            admins=(),
+            metrics_port=None,
+            profile_dir="profiles",
+            spectator_port=None,
+            archive=None):
+    bot = IRCInterface(nick,
+                       channels,
+                       state_dir=state_dir,
+                       embeddings=embeddings,
+                       admins=admins,
+                       metrics_port=metrics_port,
+                       profile_dir=profile_dir,
+                       spectator_port=spectator_port,
+                       archive=archive)
     bot.start()
@@ -0,0 +1,47 @@
+from .utils import irc_lower
+
+
+class GameManager:
+    """Keeps one interface (and therefore one game) per channel.
+
+    Interfaces are built on demand by ``interface_factory(channel)`` and are keyed by the
+    casefolded channel name, so creating or tearing down one channel's game never touches the
+    others.
+    """
+
+    def __init__(self, interface_factory):
+        self.interface_factory = interface_factory
+        self.interfaces = {}
+
+    def get(self, channel):
+        return self.interfaces.get(irc_lower(channel))
+
+    def open(self, channel):
+        key = irc_lower(channel)
+        interface = self.interfaces.get(key)
+        if interface is None:
+            interface = self.interfaces[key] = self.interface_factory(channel)
+
+        return interface
+
+    def close(self, channel):
+        return self.interfaces.pop(irc_lower(channel), None)
+
+    def games(self):
+        return (interface.game for interface in self.interfaces.values())
+
+    def __iter__(self):
+        return iter(self.interfaces.values())
+
+    def __len__(self):
+        return len(self.interfaces)
+
+    def __contains__(self, channel):
+        return irc_lower(channel) in self.interfaces
+
+    def __getitem__(self, channel):
+        interface = self.get(channel)
+        if interface is not None:
+            return interface
+
+        raise KeyError(f"No game is running in {channel}!")
@@ -0,0 +1,216 @@
+"""Always-on counters, gauges and latency histograms, in the Prometheus text format.
+
+Recording is a list append or an integer add, so it's done on every command. Gauges are only
+read when someone looks at them. ``serve`` exposes everything over HTTP for Prometheus to
+scrape; bind it to localhost, since it does no authentication.
+"""
+import math
+from bisect import bisect_right
+
+# upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+           2.5)
+
+# how many observations a histogram holds before counting them into its buckets
+BATCH = 256
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Histogram:
+    """Counts observations into buckets, ``le`` style like Prometheus's.
+
+    Observing only appends; observations are sorted and counted into their buckets a batch at a
+    time, when there are BATCH of them or when the histogram is read.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "pending")
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.pending = []
+
+    def observe(self, value):
+        pending = self.pending
+        pending.append(value)
+        if len(pending) >= BATCH:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+
+        values = sorted(self.pending)
+        self.pending.clear()
+
+        below = 0
+        for i, bound in enumerate(self.buckets):
+            upto = bisect_right(values, bound)
+            self.counts[i] += upto - below
+            below = upto
+        self.counts[-1] += len(values) - below
+        self.sum += sum(values)
+
+    @property
+    def count(self):
+        self.flush()
+        return sum(self.counts)
+
+    @property
+    def mean(self):
+        count = self.count
+        return self.sum / count if count else 0.0
+
+    def quantile(self, q):
+        """Returns the upper bound of the bucket holding the ``q`` quantile (inf if past the
+        last bucket, 0 if nothing was observed)."""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            seen += count
+            if seen >= rank and seen:
+                return bound
+
+        return 0.0
+
+
+class Family:
+    """One named metric, with a child Counter or Histogram for each combination of labels."""
+
+    def __init__(self, name, help, kind, labels, make):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.label_names = tuple(labels)
+        self.make = make
+        self.children = {}
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = self.make()
+
+        return child
+
+    def samples(self):
+        """Yields (suffix, labels, value) for every sample in the exposition."""
+        for values, child in sorted(self.children.items()):
+            labels = list(zip(self.label_names, values))
+            if self.kind == "counter":
+                yield "", labels, child.value
+                continue
+
+            child.flush()
+            cumulative = 0
+            for bound, count in zip(child.buckets + (math.inf,), child.counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                yield "_bucket", labels + [("le", le)], cumulative
+            yield "_sum", labels, child.sum
+            yield "_count", labels, child.count
+
+
+class Gauge:
+    """A value read when the metrics are, from ``read()``: a number, or a dict of label value
+    tuples to numbers."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, labels, read):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.read = read
+
+    def samples(self):
+        values = self.read()
+        if not isinstance(values, dict):
+            values = {(): values}
+
+        for labels, value in sorted(values.items()):
+            yield "", list(zip(self.label_names, labels)), value
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Registry:
+
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.add(Family(name, help, "counter", labels, Counter))
+
+    def histogram(self, name, help, labels=(), buckets=BUCKETS):
+        return self.add(Family(name, help, "histogram", labels, lambda: Histogram(buckets)))
+
+    def gauge(self, name, help, read, labels=()):
+        return self.add(Gauge(name, help, labels, read))
+
+    def __getitem__(self, name):
+        return self.metrics[name]
+
+    def render(self):
+        """Returns every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+
+            for suffix, labels, value in metric.samples():
+                labels = ",".join(f'{name}="{escape(value)}"' for name, value in labels)
+                lines.append(f"{metric.name}{suffix}{{{labels}}} {value}"
+                             if labels else f"{metric.name}{suffix} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+async def start_server(registry, host="127.0.0.1", port=9108):
+    """Starts serving ``registry`` over HTTP at /metrics, and returns the asyncio server."""
+    import asyncio
+
+    async def respond(reader, writer):
+        try:
+            request = await reader.readline()
+            while (await reader.readline()).strip():
+                # skip the headers
+                pass
+
+            parts = request.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, body = "200 OK", registry.render().encode()
+            else:
+                status, body = "404 Not Found", b"Not found\n"
+
+            writer.write(f"HTTP/1.0 {status}\r\n"
+                         "Content-Type: text/plain; version=0.0.4\r\n"
+                         f"Content-Length: {len(body)}\r\n"
+                         "Connection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(respond, host, port)
+
+
+async def serve(registry, host="127.0.0.1", port=9108):
+    """Serves ``registry`` over HTTP at /metrics until cancelled."""
+    server = await start_server(registry, host, port)
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,136 @@
+import contextlib
+
+from .scheduler import Priority
+
+# an IRC line is at most 512 bytes including the trailing CRLF. the server prefixes what we
+# send with our ":nick!user@host " before relaying it, so leave room for that as well.
+MAX_LINE_BYTES = 512
+SOURCE_RESERVE = 100
+
+SEPARATOR = " "
+RESET = "\x0f"
+COLOR = "\x03"
+COLOR_CODE_LENGTH = len("\x0300,00")
+FORMATTING = set("\x02\x03\x0f\x16\x1d\x1f")
+
+
+def line_limit(target):
+    overhead = len(f"PRIVMSG {target} :\r\n".encode())
+    return MAX_LINE_BYTES - SOURCE_RESERVE - overhead
+
+
+def size(text):
+    return len(text.encode())
+
+
+def leaves_formatting_open(message):
+    after_reset = message[message.rfind(RESET) + 1:]
+    return any(c in FORMATTING for c in after_reset)
+
+
+def split_message(message, limit):
+    """Splits one message into lines of at most ``limit`` bytes.
+
+    Splits happen after ", " or at spaces where possible, so lists like the remaining words
+    break between entries rather than in the middle of one.
+    """
+    lines = []
+
+    while size(message) > limit:
+        head = message.encode()[:limit].decode(errors="ignore")
+
+        cut = head.rfind(", ")
+        if cut > 0:
+            cut += 1
+        else:
+            cut = head.rfind(" ")
+
+        if cut <= 0:
+            # a single unbroken run longer than a line: cut it, but not inside a color code
+            cut = len(head)
+            color = head.rfind(COLOR, max(0, cut - COLOR_CODE_LENGTH))
+            if color > 0:
+                cut = color
+
+        lines.append(message[:cut].rstrip())
+        message = message[cut:].lstrip()
+
+    if message:
+        lines.append(message)
+
+    return lines
+
+
+def pack(messages, limit):
+    """Packs messages into as few lines of at most ``limit`` bytes as possible, in order."""
+    lines = []
+    current = None
+
+    for message in messages:
+        for piece in split_message(message, limit):
+            if current is not None:
+                joiner = RESET + SEPARATOR if leaves_formatting_open(current) else SEPARATOR
+                if size(current) + size(joiner) + size(piece) <= limit:
+                    current += joiner + piece
+                    continue
+
+                lines.append(current)
+
+            current = piece
+
+    if current is not None:
+        lines.append(current)
+
+    return lines
+
+
+class OutputBuffer:
+    """Collects outbound messages per target and sends them as packed lines.
+
+    Outside of ``collect()`` messages are sent straight away (still split to fit a line).
+    Inside it, everything is held until the outermost ``collect()`` exits and then packed, one
+    target at a time, in the order the targets were first written to. Each target's lines go
+    out with the most urgent priority of the messages they were packed from.
+    """
+
+    def __init__(self, send):
+        self.send = send
+        self.pending = {}
+        self.priorities = {}
+        self.depth = 0
+        self.discard = False
+
+    def add(self, target, message, priority=Priority.NORMAL):
+        if self.discard:
+            return
+
+        self.pending.setdefault(target, []).append(message)
+        self.priorities[target] = min(priority, self.priorities.get(target, priority))
+        if not self.depth:
+            self.flush()
+
+    @contextlib.contextmanager
+    def collect(self):
+        self.depth += 1
+        try:
+            yield self
+        finally:
+            self.depth -= 1
+            if not self.depth:
+                self.flush()
+
+    @contextlib.contextmanager
+    def discarding(self):
+        previous, self.discard = self.discard, True
+        try:
+            yield self
+        finally:
+            self.discard = previous
+
+    def flush(self):
+        pending, self.pending = self.pending, {}
+        priorities, self.priorities = self.priorities, {}
+
+        for target, messages in pending.items():
+            for line in pack(messages, line_limit(target)):
+                self.send(target, line, priorities[target])
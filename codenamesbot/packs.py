@@ -0,0 +1,164 @@
+"""Word packs: word tables compiled ahead of time and memory-mapped on first use.
+
+A pack is a ``.cnpack`` file in one of PACK_DIRS, named after the pack. Compile one from a text
+file with one word per line using ``python -m codenamesbot.packs words.txt packs/name.cnpack``.
+
+The file is a 12 byte header (magic, version, word count), then ``count + 1`` offsets into the
+word data, then the ids of the words sorted by their casefolded spelling, then the words
+themselves as UTF-8. All integers are little-endian uint32. Since the file is only ever mapped
+read-only, every process using a pack shares the same pages, and words are only decoded when a
+board needs them.
+"""
+import array
+import mmap
+import os
+import struct
+import sys
+
+from .persistence import write_atomically
+from .words import TABLES, WordTable
+
+PACK_DIRS = ["packs"]
+SUFFIX = ".cnpack"
+
+MAGIC = b"CNWP"
+VERSION = 1
+HEADER = struct.Struct("<4sII")
+
+
+def available():
+    """Returns a dict of the name of every pack on disk -> its path."""
+    packs = {}
+    for directory in reversed(PACK_DIRS):
+        if not os.path.isdir(directory):
+            continue
+
+        for filename in os.listdir(directory):
+            if filename.endswith(SUFFIX):
+                packs[filename[:-len(SUFFIX)].lower()] = os.path.join(directory, filename)
+
+    return packs
+
+
+def load(name):
+    """Returns the table for pack ``name``, mapping it in if this is its first use."""
+    if name in TABLES:
+        return TABLES[name]
+
+    path = available().get(name)
+    if path is None:
+        raise KeyError(name)
+
+    return PackTable(path, name)
+
+
+def uint32s(buffer, start, count):
+    view = memoryview(buffer)[start:start + 4 * count].cast("I")
+    if sys.byteorder == "little":
+        return view
+
+    # packs are little-endian; elsewhere they have to be copied to be read
+    swapped = array.array("I", view)
+    swapped.byteswap()
+    return swapped
+
+
+class PackTable(WordTable):
+    """A WordTable whose words stay in a memory-mapped pack file until they're asked for."""
+
+    def __init__(self, path, name):
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self.map) < HEADER.size:
+            raise ValueError(f"{path} is too short to be a word pack")
+
+        magic, version, count = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} word pack")
+
+        self.data = HEADER.size + 4 * (2 * count + 1)
+        if len(self.map) < self.data:
+            raise ValueError(f"{path} is a truncated word pack")
+
+        self.offsets = uint32s(self.map, HEADER.size, count + 1)
+        self.order = uint32s(self.map, HEADER.size + 4 * (count + 1), count)
+
+        self.count = count
+        self.name = name
+        TABLES[name] = self
+
+    def lookup(self, word):
+        # binary search over the ids sorted by casefolded word
+        key = word.casefold()
+        low, high = 0, self.count
+
+        while low < high:
+            middle = (low + high) // 2
+            word_id = self.order[middle]
+            found = self[word_id].casefold()
+
+            if found == key:
+                return word_id
+            elif found < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        return None
+
+    def __getitem__(self, word_id):
+        start, end = self.offsets[word_id], self.offsets[word_id + 1]
+        return self.map[self.data + start:self.data + end].decode()
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return (self[i] for i in range(self.count))
+
+
+def read_words(lines):
+    """Yields the words in ``lines``, skipping blanks, comments and case-insensitive repeats."""
+    seen = set()
+    for line in lines:
+        word = line.strip()
+        if not word or word.startswith("#") or word.casefold() in seen:
+            continue
+
+        seen.add(word.casefold())
+        yield word
+
+
+def compile_pack(words, path):
+    words = list(read_words(words))
+    encoded = [word.encode() for word in words]
+
+    offsets = array.array("I", [0])
+    for word in encoded:
+        offsets.append(offsets[-1] + len(word))
+
+    order = array.array("I", sorted(range(len(words)), key=lambda i: words[i].casefold()))
+
+    if sys.byteorder != "little":
+        offsets.byteswap()
+        order.byteswap()
+
+    write_atomically(
+        path,
+        HEADER.pack(MAGIC, VERSION, len(words)) + offsets.tobytes() + order.tobytes() +
+        b"".join(encoded))
+
+    return len(words)
+
+
+def main(argv=None):
+    source, path = argv or sys.argv[1:]
+    with open(source, encoding="utf-8") as f:
+        count = compile_pack(f, path)
+
+    sys.stdout.write(f"Compiled {count} words into {path}.\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import contextlib
+import gc
+import json
+import os
+import pickle
+
+SNAPSHOT = "snapshot.pickle"
+JOURNAL = "journal.jsonl"
+
+
+def write_atomically(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp, path)
+
+
+@contextlib.contextmanager
+def gc_paused():
+    # loading thousands of games and records creates objects fast enough to set off collection
+    # after collection, none of which can free anything
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class GameStore:
+    """Keeps live games recoverable across a crash.
+
+    Every accepted command is recorded in an append-only journal. Records are only buffered in
+    memory when they're made and are written and fsynced in batches, either from ``run()`` or
+    once ``batch`` of them have piled up, so disk I/O stays out of command handling. Every so
+    often all live games are pickled into a snapshot, which lets the journal start over.
+
+    After a crash, ``load()`` returns the games from the last snapshot and the journal records
+    made since, which replay onto them exactly because every game carries its own seeded RNG.
+    """
+
+    def __init__(self, directory, batch=1000, flush_interval=0.2, snapshot_interval=60.0):
+        self.directory = directory
+        self.batch = batch
+        self.flush_interval = flush_interval
+        self.snapshot_interval = snapshot_interval
+
+        self.snapshot_path = os.path.join(directory, SNAPSHOT)
+        self.journal_path = os.path.join(directory, JOURNAL)
+
+        self.seq = 0
+        self.pending = []
+        self.journal = None
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.journal = open(self.journal_path, "ab")
+
+    def close(self):
+        if self.journal is not None:
+            self.flush()
+            self.journal.close()
+            self.journal = None
+
+    def record(self, *entry):
+        self.seq += 1
+        self.pending.append(json.dumps([self.seq, *entry]) + "\n")
+
+        if len(self.pending) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+
+        pending, self.pending = self.pending, []
+        self.journal.write("".join(pending).encode())
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+
+    def snapshot(self, games):
+        """Saves ``games``, a dict of channel -> Game, and starts a fresh journal."""
+        self.flush()
+        write_atomically(self.snapshot_path,
+                         pickle.dumps((self.seq, games), protocol=pickle.HIGHEST_PROTOCOL))
+
+        # everything journaled so far is in the snapshot now
+        self.journal.close()
+        self.journal = open(self.journal_path, "wb")
+
+    def load(self):
+        """Returns (games, records): the last snapshot, and the journal records made after it."""
+        seq, games = 0, {}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "rb") as f, gc_paused():
+                seq, games = pickle.load(f)
+
+        records = []
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "rb") as f, gc_paused():
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # a record torn by the crash; nothing after it was fsynced either
+                        break
+
+                    if record[0] > seq:
+                        records.append(record[1:])
+                        seq = record[0]
+
+        self.seq = seq
+        return games, records
+
+    async def run(self, games):
+        """Flushes the journal periodically and snapshots ``games()`` every so often."""
+        import asyncio
+        since_snapshot = 0.0
+
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+            since_snapshot += self.flush_interval
+            if since_snapshot >= self.snapshot_interval:
+                self.snapshot(games())
+                since_snapshot = 0.0
@@ -0,0 +1,113 @@
+"""Profiles live commands on request, so a laggy channel can be looked into without a restart.
+
+An admin asks for the next N commands, in one channel or in all of them, with ``-profile``. Each
+one is run under cProfile. Once N have been, the profile is written out both as a pstats file
+(for ``python -m pstats`` or snakeviz) and as collapsed stacks (for flamegraph.pl or
+speedscope), and the hottest functions are sent to the admin.
+"""
+import collections
+import cProfile
+import os
+import pstats
+
+from .utils import irc_lower
+
+# call paths given less time than this are left out of the collapsed stacks
+MIN_SECONDS = 1e-6
+
+
+def label(func):
+    filename, line, name = func
+    if filename == "~":
+        # a builtin
+        return name.replace(";", ",")
+
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ",")
+
+
+def collapsed_stacks(stats):
+    """Yields ("outer;inner;innermost", microseconds) for every call path in ``stats``.
+
+    cProfile only keeps totals for each caller and callee pair, so time is shared out down a path
+    in proportion to those totals, the way flameprof does it. Recursion is cut off where a path
+    would enter a function already on it.
+    """
+    callees = collections.defaultdict(dict)
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, (_, _, _, cumulative) in callers.items():
+            callees[caller][func] = cumulative
+
+    stacks = collections.Counter()
+
+    def walk(func, path, labels, seconds):
+        _, _, own, total, _ = stats.stats[func]
+        share = seconds / total if total else 0.0
+        labels = labels + [label(func)]
+
+        stacks[";".join(labels)] += own * share
+        for callee, cumulative in callees[func].items():
+            if callee not in path and cumulative * share >= MIN_SECONDS:
+                walk(callee, path | {callee}, labels, cumulative * share)
+
+    # whatever time a function wasn't called for by another profiled function, it was called for
+    # by the code that started the profile
+    for func, (_, _, _, total, callers) in stats.stats.items():
+        seconds = total - sum(edge[3] for caller, edge in callers.items() if caller != func)
+        if seconds >= MIN_SECONDS:
+            walk(func, {func}, [], seconds)
+
+    for stack, seconds in stacks.items():
+        microseconds = round(seconds * 1e6)
+        if microseconds:
+            yield stack, microseconds
+
+
+class CommandProfiler:
+    """cProfiles the next ``limit`` commands in ``channel``, or in every channel if it's None."""
+
+    def __init__(self, limit, channel=None, admin=None):
+        self.limit = limit
+        self.channel = channel
+        self.admin = admin
+
+        self.profile = cProfile.Profile()
+        self.commands = 0
+
+        # the bound builtin, so that stopping doesn't show up in the profile as a call of ours
+        self.stop = self.profile.disable
+
+    def wants(self, channel):
+        return self.channel is None or irc_lower(channel) == irc_lower(self.channel)
+
+    def start(self):
+        self.commands += 1
+        self.profile.enable()
+
+    @property
+    def done(self):
+        return self.commands >= self.limit
+
+    def stats(self):
+        return pstats.Stats(self.profile)
+
+    def hottest(self, n=5):
+        """Returns the ``n`` functions that took the most time of their own, as (label, own
+        seconds, cumulative seconds, calls)."""
+        stats = self.stats().stats
+        top = sorted(stats.items(), key=lambda item: -item[1][2])[:n]
+        return [(label(func), own, total, calls) for func, (_, calls, own, total, _) in top]
+
+    def total(self):
+        return sum(own for _, _, own, _, _ in self.stats().stats.values())
+
+    def save(self, directory, name):
+        """Writes ``name``.pstats and ``name``.folded to ``directory``, and returns their paths."""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, name)
+
+        self.profile.dump_stats(base + ".pstats")
+        with open(base + ".folded", "w") as f:
+            for stack, microseconds in collapsed_stacks(self.stats()):
+                f.write(f"{stack} {microseconds}\n")
+
+        return base + ".pstats", base + ".folded"
@@ -0,0 +1,95 @@
+import collections
+import inspect
+import logging
+import time
+
+from .scheduler import WaitStats
+
+# commands taking longer than this to handle are logged
+SLOW_COMMAND = 0.5
+
+
+class CommandQueue:
+    """Runs one game's commands in the order they arrived, one at a time.
+
+    ``put`` only appends; commands are handled by the queue's own ``run()`` task, so a slow
+    command holds up its own game and no other. A handler may return an awaitable, in which case
+    the next command waits for it while other games carry on. How long commands wait in the queue
+    and how long they take to handle are both recorded. ``clock`` is injectable like the
+    SendScheduler's.
+    """
+
+    def __init__(self, name=None, clock=time.monotonic):
+        self.name = name
+        self.clock = clock
+        self.pending = collections.deque()
+
+        self.waits = WaitStats()
+        self.latencies = WaitStats()
+
+        self.wakeup = None
+        self.task = None
+
+    def put(self, handler, *args):
+        self.pending.append((handler, args, self.clock()))
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def start(self):
+        if self.task is None:
+            import asyncio
+            self.task = asyncio.ensure_future(self.run())
+
+    def stop(self):
+        """Stops the task, dropping whatever is still queued."""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+        self.pending.clear()
+
+    async def handle(self, handler, args, enqueued):
+        started = self.clock()
+        self.waits.record(started - enqueued)
+
+        try:
+            result = handler(*args)
+            if inspect.isawaitable(result):
+                await result
+        except Exception:  # noqa: B902
+            # handlers are whole commands, so anything a bug raises can land here. it's logged
+            # rather than let through, since one broken command mustn't stop the game's queue
+            logging.exception(f"{self.name}: command failed")
+
+        latency = self.clock() - started
+        self.latencies.record(latency)
+        if latency > SLOW_COMMAND:
+            logging.warning(f"{self.name}: command took {latency:.3f}s")
+
+    async def run(self):
+        import asyncio
+        self.wakeup = asyncio.Event()
+
+        while True:
+            while self.pending:
+                await self.handle(*self.pending.popleft())
+
+                # give the other games a turn between commands
+                await asyncio.sleep(0)
+
+            self.wakeup.clear()
+            await self.wakeup.wait()
+
+    @property
+    def depth(self):
+        return len(self.pending)
+
+    def metrics(self):
+        return {
+            "depth": self.depth,
+            "handled": self.latencies.count,
+            "mean_wait": self.waits.mean,
+            "max_wait": self.waits.max,
+            "mean_latency": self.latencies.mean,
+            "max_latency": self.latencies.max,
+        }
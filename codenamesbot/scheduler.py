@@ -0,0 +1,141 @@
+import collections
+import enum
+import time
+
+# rfc1459 flood control: every line costs two seconds, and clients may run ten seconds ahead
+DEFAULT_RATE = 0.5
+DEFAULT_BURST = 5
+
+
+class Priority(enum.IntEnum):
+    HIGH = 0  # spymaster views and turn prompts
+    NORMAL = 1
+    LOW = 2  # chatter like -pony and -stats
+
+
+class WaitStats:
+    """Counts waits, and keeps their total and the longest. If it's given a metrics Histogram,
+    every wait is observed there too, for the bot's metrics registry."""
+
+    __slots__ = ("count", "total", "max", "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = None
+
+    def record(self, wait):
+        self.count += 1
+        self.total += wait
+        self.max = max(self.max, wait)
+        if self.histogram is not None:
+            self.histogram.observe(wait)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class SendScheduler:
+    """Sends outbound lines through a token bucket, most important lines first.
+
+    Lines are queued per priority and, within a priority, per target; targets take turns so a
+    busy channel can't starve a quiet one. While tokens are available, ``submit`` sends straight
+    away, so the queues only fill up when we would otherwise be flooding the server. ``clock``
+    is injectable so the scheduler can be driven by a simulated clock in tests.
+    """
+
+    def __init__(self, send, rate=DEFAULT_RATE, burst=DEFAULT_BURST, clock=time.monotonic):
+        self.send = send
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+
+        self.tokens = burst
+        self.updated = clock()
+
+        # one queue per priority, each an ordered map of target -> lines waiting for it
+        self.queues = {priority: collections.OrderedDict() for priority in Priority}
+        self.depths = {priority: 0 for priority in Priority}
+        self.waits = {priority: WaitStats() for priority in Priority}
+
+        self.wakeup = None
+
+    def submit(self, target, line, priority=Priority.NORMAL):
+        self.queues[priority].setdefault(target, collections.deque()).append((line, self.clock()))
+        self.depths[priority] += 1
+
+        self.pump()
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def pop(self):
+        for priority, targets in self.queues.items():
+            if not targets:
+                continue
+
+            target, lines = next(iter(targets.items()))
+            line, enqueued = lines.popleft()
+
+            # round robin: a target with more lines waiting goes to the back of the line
+            del targets[target]
+            if lines:
+                targets[target] = lines
+
+            self.depths[priority] -= 1
+            return priority, target, line, enqueued
+
+    def pump(self):
+        """Sends as many queued lines as the bucket allows.
+
+        Returns how long to wait until the next line can go out, or None if nothing is queued.
+        """
+        self.refill()
+
+        while self.tokens >= 1:
+            item = self.pop()
+            if item is None:
+                return None
+
+            priority, target, line, enqueued = item
+            self.tokens -= 1
+            self.waits[priority].record(self.clock() - enqueued)
+            self.send(target, line)
+
+        if not self.depth:
+            return None
+
+        return (1 - self.tokens) / self.rate
+
+    @property
+    def depth(self):
+        return sum(self.depths.values())
+
+    def metrics(self):
+        return {
+            priority.name.lower(): {
+                "depth": self.depths[priority],
+                "sent": self.waits[priority].count,
+                "mean_wait": self.waits[priority].mean,
+                "max_wait": self.waits[priority].max,
+            } for priority in Priority
+        }
+
+    async def run(self):
+        import asyncio
+        self.wakeup = asyncio.Event()
+
+        while True:
+            delay = self.pump()
+            self.wakeup.clear()
+
+            if delay is None:
+                await self.wakeup.wait()
+            else:
+                await asyncio.sleep(delay)
@@ -0,0 +1,564 @@
+"""Spreads channels over worker processes, so one bot can use more than one core.
+
+The front process owns the IRC connection. Every channel belongs to one worker, picked by
+consistent hashing of its name, and the commands said in it are passed on to that worker. The
+worker runs the channel's games with an ordinary IRCInterface and sends back the lines to say,
+which the front paces out with its SendScheduler like any others.
+
+Changing the number of workers only moves the channels whose worker changed. The worker giving a
+channel up pickles its game and the one taking it over loads it, just like a restart would.
+Commands said in a channel while it moves are held by the front and passed on, in order, once
+it has. With a state directory, every worker keeps its games in a directory of its own, and one
+that dies gets them back when it's restarted. What's sent to it in the meantime is held too.
+"""
+import asyncio
+import bisect
+import collections
+import hashlib
+import logging
+import multiprocessing
+import os
+import pickle
+import re
+import socket
+
+from .irc import PREFIX, IRCInterface
+from .output import OutputBuffer
+from .utils import irc_lower, plural
+
+# points on the hash ring for each worker. more of them share channels out more evenly
+REPLICAS = 64
+
+# how many workers -workers can ask for
+MAX_WORKERS = 64
+
+# how long to wait before restarting a worker that died, so one that can't start doesn't spin
+RESTART_DELAY = 1.0
+
+WORKER_DIR = re.compile(r"worker-(\d+)$")
+
+# what the front can ask of a worker: WorkerInterface methods, called with the message's args
+REQUESTS = {"submit", "on_private", "rename", "close", "release", "adopt", "sync"}
+
+
+def position(key):
+    # hash() is salted per process, and the ring has to come out the same after a restart
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Maps channels to workers by consistent hashing.
+
+    Each worker is hashed onto the ring at ``replicas`` points, and a channel belongs to the
+    worker at the first point after its own. Adding or removing a worker only moves the channels
+    next to that worker's points.
+    """
+
+    def __init__(self, nodes=(), replicas=REPLICAS):
+        self.replicas = replicas
+        self.points = []
+        self.nodes = []
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        for replica in range(self.replicas):
+            point = position(f"{node}:{replica}")
+            i = bisect.bisect(self.points, point)
+            self.points.insert(i, point)
+            self.nodes.insert(i, node)
+
+    def remove(self, node):
+        kept = [(point, other) for point, other in zip(self.points, self.nodes) if other != node]
+        self.points = [point for point, _ in kept]
+        self.nodes = [other for _, other in kept]
+
+    def owner(self, channel):
+        if not self.points:
+            raise LookupError("There are no workers to run games on.")
+
+        i = bisect.bisect(self.points, position(irc_lower(channel)))
+        return self.nodes[i % len(self.nodes)]
+
+    def members(self):
+        return sorted(set(self.nodes))
+
+
+def encode(message):
+    data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    return len(data).to_bytes(4, "big") + data
+
+
+async def receive(reader):
+    n = int.from_bytes(await reader.readexactly(4), "big")
+    return pickle.loads(await reader.readexactly(n))
+
+
+class WorkerInterface(IRCInterface):
+    """Runs the games of the channels a Supervisor gives it, in a worker process.
+
+    Each game's commands go through its own queue, as they do in a bot without workers. Lines to
+    say go back to the front instead of to IRC. They're sent in batches, once per pass of the
+    event loop.
+    """
+
+    def __init__(self, name, nick, **kwargs):
+        super().__init__(nick, [], **kwargs)
+        self.name = name
+        self.writer = None
+        self.lines = []
+        self.output = OutputBuffer(self.send_line)
+
+    async def run(self, sock):
+        reader, self.writer = await asyncio.open_connection(sock=sock)
+        tasks = [asyncio.ensure_future(coroutine) for coroutine in self.background()]
+        self.queued = True
+
+        # the channels recovered from our state directory are ours until the front moves them
+        self.reply("ready", [interface.channel for interface in self.games])
+        try:
+            while True:
+                try:
+                    kind, *args = await receive(reader)
+                except asyncio.IncompleteReadError:
+                    # the front is gone
+                    break
+
+                if kind == "stop":
+                    await self.drain()
+                    break
+                elif kind in REQUESTS:
+                    getattr(self, kind)(*args)
+        finally:
+            for task in tasks:
+                task.cancel()
+            if self.store is not None:
+                self.store.snapshot(self.live_games())
+                self.store.close()
+            self.flush_lines()
+            self.writer.close()
+
+    def send_line(self, target, line, priority):
+        if not self.lines and self.writer is not None:
+            asyncio.get_running_loop().call_soon(self.flush_lines)
+        self.lines.append((target, line, priority))
+
+    def flush_lines(self):
+        if self.lines:
+            lines, self.lines = self.lines, []
+            self.writer.write(encode(("lines", lines)))
+
+    def reply(self, *message):
+        self.flush_lines()
+        self.writer.write(encode(message))
+
+    async def drain(self):
+        """Waits until every game's queue has handled the commands in it."""
+        while any(interface.queue.depth for interface in self.games):
+            await asyncio.sleep(0)
+
+    def release(self, channel):
+        # the commands already queued in the channel are for the game being sent, so they go
+        # first
+        if channel in self.games:
+            self.enqueue(channel, self.hand_over, channel)
+        else:
+            self.hand_over(channel)
+
+    def hand_over(self, channel):
+        """Closes ``channel`` and sends its game to the front, to be adopted by another worker."""
+        interface = self.games.get(channel)
+        game = None
+        if interface is not None:
+            game = pickle.dumps(interface.game, protocol=pickle.HIGHEST_PROTOCOL)
+            self.close(channel)
+
+        self.reply("released", channel, game)
+
+    def adopt(self, channel, game):
+        game = pickle.loads(game)
+
+        # a game started here while the channel moved is replaced, and its turn timers with it
+        interface = self.games.open(channel)
+        self.timers.cancel(interface.game)
+        game.attach(interface)
+
+        if self.store is not None:
+            # the journal only has room for commands, so save the game with all the others
+            self.store.snapshot(self.live_games())
+
+    def sync(self):
+        asyncio.ensure_future(self.synced())
+
+    async def synced(self):
+        await self.drain()
+        self.reply("synced")
+
+    def command_suggest(self, sender, args):
+        # without a channel every worker is asked, and only those running the sender's games
+        # should answer
+        if args or any(self.spymaster_of(sender, self.games)):
+            super().command_suggest(sender, args)
+
+    def command_metrics(self, sender, args):
+        # every worker answers, so say whose numbers these are
+        self.output.add(sender, f"Worker {self.name}:")
+        super().command_metrics(sender, args)
+
+
+def run_worker(sock, name, nick, options):
+    worker = WorkerInterface(name, nick, **options)
+    asyncio.run(worker.run(sock))
+
+
+class Shard:
+    """The front's end of a worker process. Messages to it are sent in batches, once per pass of
+    the event loop, and held while it isn't ready: until it has started, and while it's down and
+    being restarted."""
+
+    def __init__(self, name):
+        self.name = name
+        self.process = None
+        self.writer = None
+        self.pending = []
+        self.task = None
+        self.ready = None
+        self.synced = None
+
+    def send(self, *message):
+        if not self.pending and self.writer is not None:
+            asyncio.get_running_loop().call_soon(self.flush)
+        self.pending.append(encode(message))
+
+    def flush(self):
+        if self.pending and self.writer is not None:
+            pending, self.pending = self.pending, []
+            self.writer.write(b"".join(pending))
+
+
+class Supervisor(IRCInterface):
+    """Owns the IRC connection, and passes each channel's commands to the worker process running
+    its games.
+
+    Only ``-workers`` is answered here. Other private commands go to the worker of the channel
+    they name, or to every worker if they don't name one.
+    """
+
+    runs_games = False
+
+    def __init__(self,
+                 nick,
+                 channels,
+                 workers=None,
+                 state_dir=None,
+                 embeddings=None,
+                 admins=(),
+                 metrics_port=None,
+                 profile_dir="profiles",
+                 archive=None):
+        # games live in the workers, so the front has no state of its own to keep
+        super().__init__(nick,
+                         channels,
+                         embeddings=embeddings,
+                         admins=admins,
+                         metrics_port=metrics_port,
+                         profile_dir=profile_dir,
+                         archive=archive)
+        self.workers = workers or os.cpu_count()
+        self.state_dir = state_dir
+        self.private_commands = {"workers": self.command_workers}
+        self.output = OutputBuffer(self.say)
+
+        self.ring = HashRing()
+        self.shards = {}
+        self.next_name = 0
+
+        # irc_lower(channel) -> (worker, channel) for every channel a worker has a game for
+        self.placed = {}
+        # irc_lower(channel) -> the messages held for it while it moves
+        self.moving = {}
+        # workers taken off the ring, which stop once they've given up all their channels
+        self.leaving = set()
+        self.stopping = False
+
+        self.metrics.gauge("codenames_workers", "Worker processes running games",
+                           lambda: len(self.ring.members()))
+        self.metrics.gauge("codenames_channels_moving", "Channels moving between workers",
+                           lambda: len(self.moving))
+
+    async def start_async(self):
+        await self.start_workers()
+        await super().start_async()
+
+    async def start_workers(self):
+        """Starts the workers, and waits until they've recovered their games.
+
+        Workers left in the state directory by a run with more of them are started too, just to
+        hand their channels over to the others.
+        """
+        names = set(range(self.workers))
+        if self.state_dir is not None and os.path.isdir(self.state_dir):
+            for entry in os.listdir(self.state_dir):
+                match = WORKER_DIR.match(entry)
+                if match:
+                    names.add(int(match.group(1)))
+
+        self.next_name = max(names) + 1
+        for name in sorted(names):
+            self.spawn(name)
+            if name < self.workers:
+                self.ring.add(name)
+            else:
+                self.leaving.add(name)
+
+        await asyncio.gather(*(shard.ready for shard in self.shards.values()))
+        self.rebalance()
+
+    async def stop(self):
+        self.stopping = True
+        for shard in self.shards.values():
+            shard.send("stop")
+
+        await asyncio.gather(*(shard.task for shard in self.shards.values()))
+
+    async def sync(self):
+        """Waits until the workers have handled everything sent to them so far, and every
+        channel has finished moving."""
+        loop = asyncio.get_running_loop()
+        while True:
+            for shard in self.shards.values():
+                shard.synced = loop.create_future()
+                shard.send("sync")
+
+            await asyncio.gather(*(shard.synced for shard in self.shards.values()))
+            if not self.moving:
+                return
+
+    def worker_options(self, name):
+        options = {
+            "embeddings": self.embeddings_path,
+            "admins": self.admins,
+            "profile_dir": os.path.join(self.profile_dir, f"worker-{name}"),
+        }
+        if self.state_dir is not None:
+            options["state_dir"] = os.path.join(self.state_dir, f"worker-{name}")
+        if self.archive is not None:
+            # each worker appends to a file of its own
+            options["archive"] = f"{self.archive}.worker-{name}"
+        if self.metrics_port is not None:
+            # the front serves its own metrics, and each worker on one of the ports after it
+            options["metrics_port"] = self.metrics_port + 1 + name
+
+        return options
+
+    def spawn(self, name):
+        shard = self.shards[name] = Shard(name)
+        self.launch(shard)
+        return shard
+
+    def launch(self, shard):
+        """Starts a worker process for ``shard``, which is sent what's held for it once ready."""
+        front, back = socket.socketpair()
+
+        # spawned rather than forked: a fork would carry our event loop over half-running
+        context = multiprocessing.get_context("spawn")
+        shard.process = context.Process(target=run_worker,
+                                        args=(back, shard.name, self.nick,
+                                              self.worker_options(shard.name)),
+                                        name=f"codenames-worker-{shard.name}",
+                                        daemon=True)
+        shard.process.start()
+        back.close()
+
+        shard.ready = asyncio.get_running_loop().create_future()
+        shard.task = asyncio.ensure_future(self.listen(shard, front))
+
+    async def listen(self, shard, sock):
+        reader, writer = await asyncio.open_connection(sock=sock)
+        try:
+            while True:
+                kind, *args = await receive(reader)
+                if kind == "lines":
+                    self.deliver(*args)
+                elif kind == "released":
+                    self.moved(*args)
+                elif kind == "synced":
+                    shard.synced.set_result(None)
+                elif kind == "ready":
+                    for channel in args[0]:
+                        self.placed[irc_lower(channel)] = (shard.name, channel)
+                    shard.writer = writer
+                    shard.flush()
+                    shard.ready.set_result(None)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            # down: whatever is sent to it from now on is held for the next worker
+            shard.writer = None
+            writer.close()
+
+        await asyncio.get_running_loop().run_in_executor(None, shard.process.join)
+        if self.stopping or self.shards.get(shard.name) is not shard:
+            # stopped, or retired once it had given up its channels
+            self.leaving.discard(shard.name)
+            return
+
+        # its channels stay put: a worker with a state directory gets its games back. what it
+        # was asked and never answered is asked again of the next one, so sync() and moving
+        # channels don't wait on it forever
+        logging.error("worker %s exited with code %s, restarting it", shard.name,
+                      shard.process.exitcode)
+        if shard.synced is not None and not shard.synced.done():
+            shard.send("sync")
+        for key in self.moving:
+            name, channel = self.placed[key]
+            if name == shard.name:
+                shard.send("release", channel)
+
+        await asyncio.sleep(RESTART_DELAY)
+        if not self.stopping:
+            self.launch(shard)
+
+    def deliver(self, lines):
+        for target, line, priority in lines:
+            self.scheduler.submit(target, line, priority)
+
+    def say(self, target, line, priority):
+        # our own lines go out the same way as the workers'
+        self.deliver([(target, line, priority)])
+
+    def route(self, channel, *message):
+        key = irc_lower(channel)
+        held = self.moving.get(key)
+        if held is not None:
+            held.append(message)
+            return
+
+        placed = self.placed.get(key)
+        if placed is None:
+            placed = self.placed[key] = (self.ring.owner(key), channel)
+
+        self.shards[placed[0]].send(*message)
+
+    def submit(self, sender, channel, command, args):
+        self.route(channel, "submit", sender, channel, command, args)
+
+    def on_private(self, sender, message):
+        words = message.strip().lower().split()
+        if not words or not words[0].startswith(PREFIX):
+            return
+
+        if words[0][len(PREFIX):] in self.private_commands:
+            super().on_private(sender, message)
+            return
+
+        channels = [word for word in words[1:] if word.startswith("#")]
+        if channels:
+            self.route(channels[0], "on_private", sender, message)
+        else:
+            for shard in self.shards.values():
+                shard.send("on_private", sender, message)
+
+    def rename(self, sender, new_nick):
+        for shard in self.shards.values():
+            shard.send("rename", sender, new_nick)
+
+    def close(self, channel):
+        self.route(channel, "close", channel)
+        if irc_lower(channel) not in self.moving:
+            self.placed.pop(irc_lower(channel), None)
+
+    def resize(self, workers):
+        """Starts or stops workers until there are ``workers``, and moves the channels that
+        belong to another worker now."""
+        members = self.ring.members()
+        for _ in range(workers - len(members)):
+            name = self.next_name
+            self.next_name += 1
+            self.spawn(name)
+            self.ring.add(name)
+
+        # the newest go first
+        for name in members[workers:]:
+            self.ring.remove(name)
+            self.leaving.add(name)
+
+        self.workers = workers
+        self.rebalance()
+
+    def rebalance(self):
+        for key, (name, channel) in list(self.placed.items()):
+            if key not in self.moving and self.ring.owner(key) != name:
+                self.moving[key] = []
+                self.shards[name].send("release", channel)
+
+        for name in list(self.leaving):
+            self.retire(name)
+
+    def moved(self, channel, game):
+        """Gives a released channel's game to its new worker, followed by whatever was said in
+        the channel while it moved."""
+        key = irc_lower(channel)
+        if key not in self.moving:
+            # asked again of a restarted worker, after the one that died had already answered
+            return
+
+        old, _ = self.placed[key]
+        name = self.ring.owner(key)
+        shard = self.shards[name]
+
+        if game is not None:
+            shard.send("adopt", channel, game)
+        self.placed[key] = (name, channel)
+        for message in self.moving.pop(key):
+            shard.send(*message)
+
+        self.retire(old)
+
+    def retire(self, name):
+        # a leaving worker stops once nothing is placed on it, even mid-move
+        if name not in self.leaving or name not in self.shards:
+            return
+
+        if all(placed != name for placed, _ in self.placed.values()):
+            self.shards.pop(name).send("stop")
+
+    def command_workers(self, sender, args):
+        if not self.is_admin(sender):
+            self.output.add(sender, "Sorry, only admins can do that.")
+            return
+
+        if args:
+            if not args[0].isdigit() or not 0 < int(args[0]) <= MAX_WORKERS:
+                self.output.add(sender, f"Usage: -workers [1 to {MAX_WORKERS}]")
+                return
+
+            self.resize(int(args[0]))
+
+        channels = collections.Counter(name for name, _ in self.placed.values())
+        workers = ", ".join(f"{name} ({plural(channels[name], 'channel', 'channels')})"
+                            for name in self.ring.members())
+        self.output.add(
+            sender, f"{plural(len(self.ring.members()), 'worker', 'workers')}: {workers}; "
+            f"{plural(len(self.moving), 'channel', 'channels')} moving.")
+
+
+def run_supervisor(nick,
+                   channels,
+                   workers=None,
+                   state_dir=None,
+                   embeddings=None,
+                   admins=(),
+                   metrics_port=None,
+                   profile_dir="profiles",
+                   archive=None):
+    bot = Supervisor(nick,
+                     channels,
+                     workers=workers,
+                     state_dir=state_dir,
+                     embeddings=embeddings,
+                     admins=admins,
+                     metrics_port=metrics_port,
+                     profile_dir=profile_dir,
+                     archive=archive)
+    bot.start()
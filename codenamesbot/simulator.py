@@ -0,0 +1,315 @@
+"""Plays whole games headlessly, for load testing and for comparing strategies.
+
+Run with ``python -m codenamesbot.simulator -n 100000``, or with ``-s bots --embeddings FILE``
+to have bot guessers play clues suggested from the same embeddings. ``--shards N`` plays the
+games through the bot itself instead, one channel each, spread over N worker processes.
+"""
+import argparse
+import collections
+import functools
+import os
+import sys
+import time
+
+from .bots import GuesserPool
+from .interface import Interface
+from .state import UNLIMITED, Game, GameMode, GamePhase, Team
+from .utils import plural
+
+NAMES = ["tris", "claire", "bob", "alice", "eve", "mallory", "trent", "peggy", "victor", "walter"]
+MAX_TURNS = 200
+
+
+class NullInterface(Interface):
+    """Doesn't listen to the game at all, so nothing is rendered."""
+
+    def set_game(self, game):
+        self.game = game
+
+
+class RandomStrategy:
+    """Hints a random number and guesses unrevealed words at random, sometimes stopping early."""
+
+    stop_chance = 0.2
+
+    def hint(self, game, spymaster):
+        remaining = game.board.remaining(spymaster.team)
+        return "clue", game.random.choice([UNLIMITED] + list(range(remaining + 1)))
+
+    def guess(self, game, guesser, guessed):
+        if guessed and game.random.random() < self.stop_chance:
+            return None
+
+        return game.random.choice(game.all_words)
+
+
+class OracleStrategy(RandomStrategy):
+    """Guessers somehow know the board: they only ever guess their own team's words."""
+
+    def hint(self, game, spymaster):
+        return "clue", 1
+
+    def guess(self, game, guesser, guessed):
+        return game.remaining_words[game.active_team][0]
+
+
+STRATEGIES = {"random": RandomStrategy, "oracle": OracleStrategy}
+
+
+def number_word(number):
+    return "unlimited" if number is UNLIMITED else str(number)
+
+
+def play(seed, players=4, strategy="random", mode=GameMode.VERSUS, said=None):
+    """Plays one game to the end and returns (winner, turns, guesses).
+
+    If ``said`` is a list, the (nick, message) commands that would play the same game through
+    the bot are appended to it.
+    """
+    if said is None:
+        said = []
+
+    strategy = STRATEGIES[strategy]()
+
+    game = Game(interface=NullInterface(), seed=seed)
+    for name in NAMES[:players]:
+        game.join(name)
+        said.append((name, "-join"))
+
+    game.mode = mode
+    game.start_game(seed)
+    said.append((NAMES[0], f"-start {seed}"))
+
+    turns = guesses = 0
+    while game.phase != GamePhase.POST_GAME and turns < MAX_TURNS:
+        team = game.teams[game.active_team]
+        clue, number = strategy.hint(game, team.spymaster)
+        game.hint(team.spymaster, clue, number)
+        said.append((team.spymaster.name, f"-c {clue} {number_word(number)}"))
+        turns += 1
+
+        guessers = game.teams[Team.GRAY].players + team.guessers
+        guessed = 0
+        while game.phase == GamePhase.GUESSING:
+            guesser = guessers[guessed % len(guessers)]
+            word = strategy.guess(game, guesser, guessed)
+            if word is None:
+                game.stop(guesser)
+                said.append((guesser.name, "-stop"))
+                break
+
+            game.guess(guesser, word)
+            said.append((guesser.name, f"-guess {word}"))
+            guessed += 1
+
+        guesses += guessed
+
+    return game.winner, turns, guesses
+
+
+@functools.lru_cache()
+def load_embeddings(path):
+    # once per worker process
+    from .embeddings import Embeddings
+    return Embeddings.load(path)
+
+
+def play_with_bots(seeds, embeddings):
+    """Plays one game per seed with suggested clues and bot guessers, returning their results.
+
+    The games are played in lockstep, so each round's guesses for every game are ranked in one
+    batch. Each team has a spymaster, a guesser who never guesses and a bot.
+    """
+    pool = GuesserPool(lambda: embeddings)
+    games = []
+
+    for seed in seeds:
+        game = Game(interface=NullInterface(), seed=seed)
+        for name, team in zip(NAMES, [Team.GREEN, Team.PINK, None, None]):
+            player = game.join(name, team)
+            player.spymaster_preference = team is not None
+
+        game.start_game()
+        pool.join(game, Team.GREEN)
+        pool.join(game, Team.PINK)
+        pool.watch(game)
+        games.append(game)
+
+    turns = collections.Counter()
+    for _ in range(MAX_TURNS):
+        playing = [game for game in games if game.phase != GamePhase.POST_GAME]
+        if not playing:
+            break
+
+        for game in playing:
+            team = game.active_team
+            words = game.remaining_words
+            avoid = (words[~team], words[Team.GRAY], [game.assassin])
+
+            suggestions = embeddings.suggest(words[team], *avoid, count=1)
+            if suggestions:
+                clue, number, _ = suggestions[0]
+            else:
+                # nothing is worth a clue, so give one that means nothing
+                clue = next(
+                    word for word in ("clue", "hint", "pass") if not game.word_in_game(word))
+                number = 1
+
+            game.hint(game.teams[team].spymaster, clue, number)
+            turns[game] += 1
+
+        pool.tick()
+
+    return [(game.winner, turns[game], bin(game.board.revealed).count("1")) for game in games]
+
+
+def play_many(seeds, players=4, strategy="random", embeddings=None):
+    if strategy == "bots":
+        played = play_with_bots(seeds, load_embeddings(embeddings))
+    else:
+        played = (play(seed, players, strategy) for seed in seeds)
+
+    results = collections.Counter()
+    for winner, turns, guesses in played:
+        results[str(winner).lower()] += 1
+        results["turns"] += turns
+        results["guesses"] += guesses
+
+    return results
+
+
+def simulate(games,
+             workers=None,
+             players=4,
+             strategy="random",
+             seed=0,
+             chunk=1000,
+             embeddings=None):
+    """Plays ``games`` games across a process pool and returns (results, seconds)."""
+    workers = workers or os.cpu_count()
+    chunks = [
+        range(start, min(start + chunk, seed + games))
+        for start in range(seed, seed + games, chunk)
+    ]
+
+    start = time.perf_counter()
+    results = collections.Counter()
+
+    if workers == 1:
+        for seeds in chunks:
+            results.update(play_many(seeds, players, strategy, embeddings))
+    else:
+        # not imported up top, since every worker process imports this module too
+        import concurrent.futures
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            futures = [
+                pool.submit(play_many, seeds, players, strategy, embeddings) for seeds in chunks
+            ]
+            for future in concurrent.futures.as_completed(futures):
+                results.update(future.result())
+
+    return results, time.perf_counter() - start
+
+
+def simulate_sharded(games, shards, players=4, strategy="random", seed=0):
+    """Plays ``games`` games through a Supervisor with ``shards`` worker processes, one channel
+    each, and returns (results, seconds). Results count commands, the lines said and the games
+    the bot saw won."""
+    import asyncio
+
+    # the commands are worked out up front, so only the bot is timed
+    scripts = []
+    for game_seed in range(seed, seed + games):
+        said = []
+        play(game_seed, players, strategy, said=said)
+        scripts.append((f"#game{game_seed}", said))
+
+    return asyncio.run(play_sharded(scripts, shards))
+
+
+async def play_sharded(scripts, shards):
+    # not imported up top, since it brings in the whole bot
+    import asyncio
+
+    from .shards import Supervisor
+
+    results = collections.Counter()
+
+    def count(lines):
+        results["lines"] += len(lines)
+        results["won"] += sum(line.count("team wins!") for _, line, _ in lines)
+
+    front = Supervisor("simulator", [], workers=shards)
+    # nothing is connected, so count the lines rather than pacing them out
+    front.deliver = count
+    await front.start_workers()
+
+    start = time.perf_counter()
+    for turn in range(max(len(said) for _, said in scripts)):
+        # a command from every game at a time, as busy channels would interleave
+        for channel, said in scripts:
+            if turn < len(said):
+                nick, message = said[turn]
+                front.on_privmsg(nick, channel, message)
+                results["commands"] += 1
+
+        await asyncio.sleep(0)
+
+    await front.sync()
+    seconds = time.perf_counter() - start
+    await front.stop()
+
+    return results, seconds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--games", type=int, default=10000)
+    parser.add_argument("-j",
+                        "--workers",
+                        type=int,
+                        default=None,
+                        help="worker processes (default: one per core)")
+    parser.add_argument("-p", "--players", type=int, default=4, choices=range(3, len(NAMES) + 1))
+    parser.add_argument("-s",
+                        "--strategy",
+                        choices=sorted(STRATEGIES) + ["bots"],
+                        default="random")
+    parser.add_argument("--embeddings", help="embedding file for the bots strategy")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--shards",
+                        type=int,
+                        help="play through the bot, with channels spread over this many workers")
+    args = parser.parse_args(argv)
+    if args.strategy == "bots" and args.embeddings is None:
+        parser.error("the bots strategy needs --embeddings")
+
+    if args.shards is not None:
+        if args.strategy == "bots":
+            parser.error("--shards can't play the bots strategy")
+
+        results, seconds = simulate_sharded(args.games, args.shards, args.players, args.strategy,
+                                            args.seed)
+        sys.stdout.write(f"{args.games} games over {plural(args.shards, 'worker', 'workers')} in "
+                         f"{seconds:.2f}s: {results['commands'] / seconds:,.0f} commands/s, "
+                         f"{args.games / seconds:,.0f} games/s\n")
+        sys.stdout.write(f"  {results['won']} games won, {results['lines']} lines said\n")
+        return
+
+    results, seconds = simulate(args.games,
+                                args.workers,
+                                args.players,
+                                args.strategy,
+                                args.seed,
+                                embeddings=args.embeddings)
+
+    sys.stdout.write(
+        f"{args.games} games in {seconds:.2f}s: {args.games / seconds:,.0f} games/s\n")
+    for team in ("green", "pink"):
+        sys.stdout.write(f"  {team} wins: {results[team] / args.games:.1%}\n")
+    sys.stdout.write(f"  turns per game: {results['turns'] / args.games:.1f}\n")
+    sys.stdout.write(f"  guesses per game: {results['guesses'] / args.games:.1f}\n")
+
+
+if __name__ == "__main__":
+    main()
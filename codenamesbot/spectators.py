@@ -0,0 +1,287 @@
+"""Lets people watch games in a browser, over WebSockets, without anyone saying a word on IRC.
+
+A spectator connects to ``ws://host:port/channel`` and gets a snapshot of the game as a JSON
+text message, then a small JSON message for everything that happens after: a join, a hint, a
+revealed card, a turn change. When the channel's next game starts they get a new snapshot.
+
+Spectators only ever see what the channel sees. Cards' owners are sent as the cards are revealed,
+and the whole board only once the game is over.
+
+The server is just enough of RFC 6455 for this: the handshake, unfragmented frames, and
+answering pings and closes. Spectators aren't expected to send anything else.
+"""
+import base64
+import hashlib
+import json
+
+from .interface import Interface
+from .state import UNLIMITED, Board, GamePhase, Team
+
+GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+TEXT = 0x1
+CLOSE = 0x8
+PING = 0x9
+PONG = 0xA
+
+# spectators only send pings and closes, so anything bigger than this is dropped
+MAX_CLIENT_FRAME = 4096
+
+# a spectator this many bytes behind is disconnected rather than buffered for
+MAX_BACKLOG = 1 << 20
+
+
+def accept_key(key):
+    return base64.b64encode(hashlib.sha1((key + GUID).encode()).digest()).decode()
+
+
+def frame(payload, opcode=TEXT, mask=None):
+    """Encodes a single, final frame. Only clients mask theirs."""
+    n = len(payload)
+    if n < 126:
+        length = bytes([n])
+    elif n < 1 << 16:
+        length = bytes([126]) + n.to_bytes(2, "big")
+    else:
+        length = bytes([127]) + n.to_bytes(8, "big")
+
+    if mask is None:
+        return bytes([0x80 | opcode]) + length + payload
+
+    length = bytes([length[0] | 0x80]) + length[1:]
+    return bytes([0x80 | opcode]) + length + mask + unmask(payload, mask)
+
+
+def unmask(payload, mask):
+    return bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+
+async def read_frame(reader, limit=None):
+    """Returns (opcode, payload) of the next frame, or raises ValueError if it's over
+    ``limit`` bytes."""
+    first, second = await reader.readexactly(2)
+    n = second & 0x7F
+    if n == 126:
+        n = int.from_bytes(await reader.readexactly(2), "big")
+    elif n == 127:
+        n = int.from_bytes(await reader.readexactly(8), "big")
+
+    if limit is not None and n > limit:
+        raise ValueError(f"a {n} byte frame is too big")
+
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(n)
+    return first & 0x0F, payload if mask is None else unmask(payload, mask)
+
+
+def name(value):
+    # teams and phases as the lowercase names used everywhere in the messages
+    return value.name.lower() if value is not None else None
+
+
+def owner_name(owner):
+    return "assassin" if owner is None else name(owner)
+
+
+class SpectatorInterface(Interface):
+    """Sends a channel's game to everyone watching it.
+
+    Every message is serialized and framed once, then written to each spectator's socket as is.
+    A spectator who falls more than MAX_BACKLOG bytes behind is disconnected. Nothing is
+    rendered while nobody is watching.
+    """
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.sockets = set()
+
+    def set_game(self, game):
+        super().set_game(game)
+
+        # spectators of the last game carry on watching the channel's next one
+        if self.sockets:
+            self.broadcast_frame(self.snapshot_frame())
+
+    def handle_event(self, event):
+        if self.sockets:
+            super().handle_event(event)
+
+    def tell(self, message):
+        pass
+
+    def tell_private(self, player, message):
+        pass
+
+    def add(self, writer):
+        self.sockets.add(writer)
+        writer.write(self.snapshot_frame())
+
+    def remove(self, writer):
+        self.sockets.discard(writer)
+
+    def broadcast(self, message):
+        self.broadcast_frame(frame(json.dumps(message, separators=(",", ":")).encode()))
+
+    def broadcast_frame(self, data):
+        for writer in list(self.sockets):
+            if writer.transport.get_write_buffer_size() > MAX_BACKLOG:
+                self.remove(writer)
+                writer.close()
+            else:
+                writer.write(data)
+
+    def snapshot_frame(self):
+        return self.rendered(
+            "snapshot", lambda: frame(json.dumps(self.snapshot(), separators=(",", ":")).encode()))
+
+    def snapshot(self):
+        game = self.game
+        board = game.board
+        over = game.phase == GamePhase.POST_GAME
+
+        cards = []
+        for position, word_id in enumerate(board.ids):
+            # owners of hidden cards are the spymasters' secret until the game is over
+            shown = over or board.is_revealed(position)
+            cards.append([
+                board.table[word_id],
+                owner_name(board.owner(position)) if shown else None,
+            ])
+
+        players = {player.name: name(player.team) for player in game.players}
+        spymasters = {
+            name(team): game.teams[team].spymaster.name
+            for team in (Team.GREEN, Team.PINK)
+            if game.teams[team].spymaster is not None
+        }
+
+        word, number = game.current_hint
+        return {
+            "type": "snapshot",
+            "channel": self.channel,
+            "phase": name(game.phase),
+            "team": name(game.active_team),
+            "hint": [word, self.format_number(number)] if word is not None else None,
+            "guesses": self.format_number(game.remaining_guesses),
+            "winner": name(game.winner),
+            "cards": cards,
+            "players": players,
+            "spymasters": spymasters,
+        }
+
+    def format_number(self, number):
+        return "unlimited" if number is UNLIMITED else number
+
+    def player_joins(self, player, team=None):
+        self.broadcast({"type": "join", "player": player.name, "team": name(team)})
+
+    def player_leaves(self, player):
+        self.broadcast({"type": "leave", "player": str(player)})
+
+    def player_team_moved(self, player, new_team):
+        self.broadcast({"type": "moved", "player": player.name, "team": name(new_team)})
+
+    def notify_start(self, seed, mode, teams, board):
+        # a new board, which only a snapshot can describe
+        self.broadcast_frame(self.snapshot_frame())
+
+    def notify_hinting(self, team, spymaster, board):
+        self.broadcast({"type": "turn", "team": name(team), "spymaster": spymaster.name})
+
+    def notify_guessing(self, team, word, number, guessers, board):
+        self.broadcast({
+            "type": "hint",
+            "team": name(team),
+            "word": word,
+            "number": self.format_number(number)
+        })
+
+    def word_guessed(self, actor, word, owner, remaining, guesses_left):
+        self.broadcast({
+            "type": "reveal",
+            "player": actor.name,
+            "word": word,
+            "owner": owner_name(owner),
+            "guesses": self.format_number(guesses_left),
+        })
+
+    def turn_ended(self, team):
+        self.broadcast({"type": "end", "team": name(team)})
+
+    def turn_timed_out(self, team, phase):
+        self.broadcast({"type": "timeout", "team": name(team), "phase": name(phase)})
+
+    def notify_winner(self, winner, board):
+        # the game's over, so the whole board can be shown
+        board = Board.restore(board)
+        owners = [owner_name(board.owner(position)) for position in range(len(board.ids))]
+        self.broadcast({"type": "won", "team": name(winner), "owners": owners})
+
+
+async def handshake(reader, writer):
+    """Reads an upgrade request. Returns its (path, key), or None if it was refused."""
+    request = (await reader.readline()).decode("latin-1").split()
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1")
+        if not line.strip():
+            break
+
+        key, _, value = line.partition(":")
+        headers[key.strip().lower()] = value.strip()
+
+    key = headers.get("sec-websocket-key")
+    if len(request) < 2 or request[0] != "GET" or key is None or \
+            headers.get("upgrade", "").lower() != "websocket":
+        writer.write(b"HTTP/1.1 400 Bad Request\r\nConnection: close\r\n\r\n")
+        return None
+
+    return request[1], key
+
+
+async def start_server(find, host="127.0.0.1", port=8765):
+    """Starts serving spectators, and returns the asyncio server. ``find(channel)`` returns the
+    channel's SpectatorInterface, or None if there's no game there to watch."""
+    import asyncio
+
+    async def watch(reader, writer):
+        spectators = None
+        try:
+            request = await handshake(reader, writer)
+            if request is None:
+                return
+
+            path, key = request
+            channel = "#" + path.lstrip("/").replace("%23", "").lstrip("#")
+            spectators = find(channel)
+            if spectators is None:
+                writer.write(b"HTTP/1.1 404 Not Found\r\nConnection: close\r\n\r\n")
+                return
+
+            writer.write(b"HTTP/1.1 101 Switching Protocols\r\n"
+                         b"Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                         b"Sec-WebSocket-Accept: " + accept_key(key).encode() + b"\r\n\r\n")
+            spectators.add(writer)
+
+            while True:
+                opcode, payload = await read_frame(reader, MAX_CLIENT_FRAME)
+                if opcode == CLOSE:
+                    writer.write(frame(payload[:2], CLOSE))
+                    return
+                elif opcode == PING:
+                    writer.write(frame(payload, PONG))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            if spectators is not None:
+                spectators.remove(writer)
+            writer.close()
+
+    return await asyncio.start_server(watch, host, port)
+
+
+async def serve(find, host="127.0.0.1", port=8765):
+    """Serves spectators until cancelled."""
+    server = await start_server(find, host, port)
+    async with server:
+        await server.serve_forever()
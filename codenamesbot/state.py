@@ -1,21 +1,41 @@
+import array
 import collections
 import enum
 import math
 import random
 
+from . import events
+from .utils import irc_lower
 from .words import WORDS
 
-UNLIMITED = object()
+
+class Unlimited:
+
+    def __str__(self):
+        return "unlimited"
+
+    def __reduce__(self):
+        # pickled by name, so restored and adopted games still compare ``is UNLIMITED``
+        return "UNLIMITED"
+
+
+UNLIMITED = Unlimited()
 
 
 class Player:
+    # players driven by a bot rather than a person (see bots.py)
+    bot = False
 
     def __init__(self, name):
         self.name = name
         self.team = None
         self.spymaster_preference = False
+        self.registry = None
 
     def rename(self, new_name):
+        if self.registry is not None:
+            self.registry.reindex(self, new_name)
+
         self.name = new_name
 
     def toggle_spymaster_preference(self):
@@ -27,26 +47,49 @@ class Player:
 
 
 class Players:
+    """An ordered set of players, indexed by their casefolded name."""
 
     def __init__(self):
-        self.players = []
+        self.index = {}  # irc_lower(name) -> player
+        self.players = {}  # player -> None, kept in join order
 
     def add(self, name):
+        key = irc_lower(name)
+        if key in self.index:
+            raise ValueError(f"{name} is already playing!")
+
         p = Player(name)
-        self.players.append(p)
+        p.registry = self
+
+        self.index[key] = p
+        self.players[p] = None
         return p
 
     def remove(self, name):
-        self.players.remove(self[name])
+        player = self.index.pop(irc_lower(name), None)
+        if player is None:
+            raise KeyError(f"{name} is not playing!")
+
+        del self.players[player]
+        player.registry = None
+
+    def reindex(self, player, new_name):
+        old_key, new_key = irc_lower(player.name), irc_lower(new_name)
+        if old_key == new_key:
+            return
+
+        if new_key in self.index:
+            raise ValueError(f"{new_name} is already playing!")
+
+        del self.index[old_key]
+        self.index[new_key] = player
 
     def get(self, name):
-        for player in self.players:
-            if player.name == name:
-                return player
+        return self.index.get(irc_lower(name))
 
-    def shuffled(self):
-        shuffled_players = self.players[::]
-        random.shuffle(shuffled_players)
+    def shuffled(self, rng=random):
+        shuffled_players = list(self.players)
+        rng.shuffle(shuffled_players)
         return shuffled_players
 
     def __iter__(self):
@@ -56,7 +99,7 @@ class Players:
         return len(self.players)
 
     def __contains__(self, name):
-        return self.get(name) is not None
+        return irc_lower(name) in self.index
 
     def __getitem__(self, name):
         player = self.get(name)
@@ -130,13 +173,142 @@ class PlayingTeam:
         return player in self.players
 
 
+# index of each owner's mask in Board.masks. None owns the assassin
+MASK_SLOTS = {Team.GREEN: 0, Team.PINK: 1, Team.GRAY: 2, None: 3}
+BOARD_LAYOUT = ((Team.GREEN, 9), (Team.PINK, 8), (Team.GRAY, 7), (None, 1))
+BOARD_SIZE = sum(count for _, count in BOARD_LAYOUT)
+
+
+class BoardSnapshot(collections.namedtuple("BoardSnapshot",
+                                           ["table", "ids", "masks", "revealed"])):
+    __slots__ = ()
+
+    def describe(self):
+        return {
+            "words": [self.table[i] for i in self.ids],
+            "masks": list(self.masks),
+            "revealed": self.revealed,
+        }
+
+
+def bits(mask):
+    i = 0
+    while mask:
+        if mask & 1:
+            yield i
+        mask >>= 1
+        i += 1
+
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+
+class Board:
+    """A dealt board, stored as word ids plus bitmasks.
+
+    ``ids`` holds one id into ``table`` per card, in display order. Bit ``i`` of each mask
+    refers to card ``i``: ``masks`` has one mask per owner (see MASK_SLOTS), and ``revealed``
+    marks the cards that have been guessed. Everything but ``revealed`` is fixed once dealt, so
+    a snapshot is a couple of shared references and one integer. ``positions`` maps each word id
+    back to its card, for looking guesses up.
+    """
+
+    __slots__ = ("table", "ids", "masks", "revealed", "positions")
+
+    def __init__(self, table, ids=(), masks=(0, 0, 0, 0), revealed=0):
+        self.table = table
+        self.ids = array.array("I", ids)
+        self.masks = tuple(masks)
+        self.revealed = revealed
+        self.index()
+
+    def index(self):
+        self.positions = {word_id: position for position, word_id in enumerate(self.ids)}
+
+    def __getstate__(self):
+        # positions is rebuilt from ids, rather than saved with every snapshot
+        return self.table, self.ids, self.masks, self.revealed
+
+    def __setstate__(self, state):
+        self.table, self.ids, self.masks, self.revealed = state
+        self.index()
+
+    @classmethod
+    def deal(cls, table, ids, positions):
+        # ids are in display order, positions[i] is the card owned by the i-th slot of the layout
+        masks = [0] * len(MASK_SLOTS)
+        positions = iter(positions)
+
+        for owner, count in BOARD_LAYOUT:
+            for _ in range(count):
+                masks[MASK_SLOTS[owner]] |= 1 << next(positions)
+
+        return cls(table, ids, masks)
+
+    def mask(self, owner):
+        return self.masks[MASK_SLOTS[owner]]
+
+    def owner(self, position):
+        for owner, slot in MASK_SLOTS.items():
+            if self.masks[slot] >> position & 1:
+                return owner
+
+    def find(self, word):
+        """Returns the position of ``word`` on the board, in any case, or None."""
+        return self.positions.get(self.table.lookup(word))
+
+    def is_revealed(self, position):
+        return bool(self.revealed >> position & 1)
+
+    def reveal(self, position):
+        self.revealed |= 1 << position
+
+    def words(self, mask=None):
+        if mask is None:
+            mask = (1 << len(self.ids)) - 1
+
+        return [self.table[self.ids[i]] for i in bits(mask)]
+
+    def hidden(self, owner):
+        return self.mask(owner) & ~self.revealed
+
+    def unrevealed(self):
+        return ((1 << len(self.ids)) - 1) & ~self.revealed
+
+    def remaining(self, owner):
+        return popcount(self.hidden(owner))
+
+    def snapshot(self):
+        return BoardSnapshot(self.table, self.ids, self.masks, self.revealed)
+
+    @classmethod
+    def restore(cls, snapshot):
+        board = cls(snapshot.table)
+        board.table, board.ids, board.masks, board.revealed = snapshot
+        board.index()
+        return board
+
+
+def pack_random(rng):
+    version, internal, gauss_next = rng.getstate()
+    return version, array.array("I", internal).tobytes(), gauss_next
+
+
+def unpack_random(packed):
+    version, internal, gauss_next = packed
+    rng = random.Random()
+    rng.setstate((version, tuple(array.array("I", internal)), gauss_next))
+    return rng
+
+
 class InvalidGameState(Exception):
     pass
 
 
 class Game:
 
-    def __init__(self, interface=None):
+    def __init__(self, interface=None, seed=None):
         # State machine consists of these two variables
         self.phase = GamePhase.PRE_GAME
         self.active_team = None
@@ -144,12 +316,7 @@ class Game:
         # Game active state consists of these
         self.teams = {team: PlayingTeam(team) for team in Team}
 
-        self.words = {team: [] for team in Team}  # gray words are civilians
-        self.remaining_words = {team: [] for team in Team}
-        self.guessed_words = {team: [] for team in Team}
-        self.assassin = None
-
-        self.all_words = []
+        self.board = Board(WORDS)
 
         self.current_hint = (None, 0)
         self.remaining_guesses = 0
@@ -162,14 +329,67 @@ class Game:
         # Game configuration consists of these
         self.players = Players()
         self.mode = GameMode.VERSUS
+        self.table = WORDS
+        # phase -> how many seconds a turn may spend in it (see timers.py). no limit if missing
+        self.time_limits = {}
+
+        # every random choice in the game comes from here, so a recorded seed replays it exactly
+        self.seed = None
+        self._random = random.Random()
+        self._random_state = None
+        self.reseed(seed)
+
+        # state changes are announced as events. interfaces, loggers and archives subscribe
+        self.events = events.EventStream()
+
+        # bumped by every change to the game, so whatever was rendered from one revision can be
+        # reused until the next. draws from the rng don't count
+        self.revision = 0
 
         if interface is None:
             from .interface import Interface
             interface = Interface()
 
+        self.attach(interface)
+
+    def attach(self, interface):
         self.interface = interface
         interface.set_game(self)
 
+    def __getstate__(self):
+        # interfaces and event sinks belong to the running process, not to the game
+        state = self.__dict__.copy()
+        del state["interface"], state["events"]
+
+        # the rng's state is 625 ints; as packed bytes it pickles and loads far faster
+        if state["_random"] is not None:
+            state["_random_state"] = pack_random(state["_random"])
+            state["_random"] = None
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.events = events.EventStream()
+        self.interface = None
+
+    @property
+    def random(self):
+        # restored games only rebuild their rng once they need it
+        if self._random is None:
+            self._random = unpack_random(self._random_state)
+            self._random_state = None
+
+        return self._random
+
+    def touch(self):
+        """Starts a new revision. Changes announced with an event do this already."""
+        self.revision += 1
+
+    def emit(self, event):
+        self.revision += 1
+        self.events.emit(event)
+
     def join(self, player, team=None):
         if self.phase == GamePhase.POST_GAME:
             raise InvalidGameState("Joins are not accepted after the game is over.")
@@ -183,7 +403,7 @@ class Game:
             # try to assign the player to their preferred team, but fail if unbalanced or in gray mode
             if self.mode == GameMode.GRAY:
                 if team is not None and team != Team.GRAY:
-                    self.interface.player_team_moved(player, Team.GRAY)
+                    self.emit(events.PlayerMoved(player, Team.GRAY))
 
                 team = Team.GRAY
 
@@ -192,11 +412,11 @@ class Game:
 
             elif len(self.teams[Team.GREEN]) < len(self.teams[Team.PINK]) and team == Team.PINK:
                 team = Team.GREEN
-                self.interface.player_team_moved(player, Team.GREEN)
+                self.emit(events.PlayerMoved(player, Team.GREEN))
 
             elif len(self.teams[Team.PINK]) < len(self.teams[Team.GREEN]) and team == Team.GREEN:
                 team = Team.PINK
-                self.interface.player_team_moved(player, Team.PINK)
+                self.emit(events.PlayerMoved(player, Team.PINK))
 
             if not team:
                 if len(self.teams[Team.GREEN]) < len(self.teams[Team.PINK]):
@@ -204,13 +424,13 @@ class Game:
                 elif len(self.teams[Team.PINK]) < len(self.teams[Team.GREEN]):
                     team = Team.PINK
                 else:
-                    team = random.choice([Team.GREEN, Team.PINK])
+                    team = self.random.choice([Team.GREEN, Team.PINK])
 
             self.teams[team].add(player)
-            self.interface.player_joins(player, team=team)
+            self.emit(events.PlayerJoined(player, team))
 
         else:
-            self.interface.player_joins(player)
+            self.emit(events.PlayerJoined(player, None))
 
         player.team = team
         return player
@@ -223,22 +443,23 @@ class Game:
             raise InvalidGameState(f"{player} is already not in the game!")
 
         self.players.remove(player)
-        self.interface.player_leaves(player)
+        self.emit(events.PlayerLeft(player))
 
     def assign_teams(self):
-        players = self.players.shuffled()
+        # partition the shuffled players into four groups in one pass. each group keeps the order
+        # the old move-to-front passes produced, so a given seed still deals the same teams
+        spymaster_only, spymaster_and_team, team_only, neither = [], [], [], []
+        for player in self.players.shuffled(self.random):
+            if player.spymaster_preference:
+                group = spymaster_and_team if player.team is not None else spymaster_only
+            else:
+                group = team_only if player.team is not None else neither
 
-        for player in players[::]:
-            # pull players with team preference to the front
-            if player.team is not None:
-                players.remove(player)
-                players.insert(0, player)
+            group.append(player)
 
-        for player in players[::]:
-            # pull players with spymaster preference but no team preference to the front
-            if player.spymaster_preference:
-                players.remove(player)
-                players.insert(0, player)
+        spymaster_only.reverse()
+        team_only.reverse()
+        players = spymaster_only + spymaster_and_team + team_only + neither
 
         # player order is random but with these groups in order:
         # - first, players with spymaster preference, but no team preference
@@ -254,38 +475,36 @@ class Game:
         elif self.mode == GameMode.VERSUS:
             self._assign_teams_versus(players)
 
-        for player in self.players:
-            for team, playing_team in self.teams.items():
-                if player in playing_team:
-                    player.team = team
+        for team, playing_team in self.teams.items():
+            for player in playing_team:
+                player.team = team
 
     def _assign_teams_gray(self, players):
         # find the first green and pink player. sort gray players at the back
         green = None
         pink = None
+        rest = []
+        gray = []
 
-        for player in players[::]:
-            if player.team == Team.GRAY:
-                players.remove(player)
-                players.append(player)
-
-        for player in players[::]:
+        for player in players:
             if player.team == Team.GREEN and green is None:
                 green = player
-                players.remove(player)
-
             elif player.team == Team.PINK and pink is None:
                 pink = player
-                players.remove(player)
+            elif player.team == Team.GRAY:
+                gray.append(player)
+            else:
+                rest.append(player)
 
+        rest = iter(rest + gray)
         if green is None:
-            green = players.pop(0)
+            green = next(rest)
         if pink is None:
-            pink = players.pop(0)
+            pink = next(rest)
 
         self.teams[Team.GREEN].add(green)
         self.teams[Team.PINK].add(pink)
-        self.teams[Team.GRAY].players.extend(players)
+        self.teams[Team.GRAY].players.extend(rest)
 
     def _assign_teams_versus(self, players):
         max_players = math.ceil(len(self.players) / 2)
@@ -314,32 +533,60 @@ class Game:
         # - 7 civilian
         # - 1 assassin
 
-        words = WORDS.copy()
-        random.shuffle(words)
+        # only the board's cards are drawn, so the cost doesn't grow with the table
+        ids = self.random.sample(range(len(self.table)), BOARD_SIZE)
+
+        positions = list(range(BOARD_SIZE))
+        self.random.shuffle(positions)
+
+        self.board = Board.deal(self.table, ids, positions)
+
+    @property
+    def words(self):
+        # gray words are civilians
+        return {team: self.board.words(self.board.mask(team)) for team in Team}
+
+    @property
+    def assassin(self):
+        words = self.board.words(self.board.mask(None))
+        return words[0] if words else None
 
-        self.words[Team.GREEN] = words.consume(9)
-        self.words[Team.PINK] = words.consume(8)
-        self.words[Team.GRAY] = words.consume(7)
-        self.assassin = words.popleft()
+    @property
+    def all_words(self):
+        return self.board.words(self.board.unrevealed())
 
-        self.all_words = (self.words[Team.GREEN] + self.words[Team.PINK] + self.words[Team.GRAY] +
-                          [self.assassin])
+    @property
+    def remaining_words(self):
+        return {team: self.board.words(self.board.hidden(team)) for team in Team}
 
-        random.shuffle(self.all_words)
+    @property
+    def guessed_words(self):
+        return {
+            team: self.board.words(self.board.mask(team) & self.board.revealed) for team in Team
+        }
+
+    def reseed(self, seed=None):
+        if seed is None:
+            seed = random.getrandbits(32)
 
-        for team in Team:
-            self.remaining_words[team] = self.words[team].copy()
+        self.seed = seed
+        self.random.seed(seed)
 
     def notify_phase(self):
         if self.phase == GamePhase.POST_GAME:
-            self.interface.notify_winner()
+            self.emit(events.GameWon(self.winner, self.board.snapshot()))
         elif self.phase == GamePhase.HINTING:
-            self.interface.notify_hinting(self.active_team, self.teams[self.active_team].spymaster)
+            self.emit(
+                events.TurnStarted(self.active_team, self.teams[self.active_team].spymaster,
+                                   self.board.snapshot()))
         elif self.phase == GamePhase.GUESSING:
             guessers = self.teams[Team.GRAY].players + self.teams[self.active_team].guessers
-            self.interface.notify_guessing(self.active_team, guessers)
+            word, number = self.current_hint
+            self.emit(
+                events.Hinted(self.active_team, word, number, tuple(guessers),
+                              self.board.snapshot()))
 
-    def start_game(self):
+    def start_game(self, seed=None):
         if len(self.players) < 3:
             raise InvalidGameState("Not enough players to start the game.")
 
@@ -350,17 +597,28 @@ class Game:
         if len(self.players) < 4 and self.mode == GameMode.VERSUS:
             self.mode = GameMode.GRAY
 
+        if seed is not None:
+            self.reseed(seed)
+
         self.assign_teams()
         self.assign_words()
 
         self.phase = GamePhase.HINTING
         self.active_team = Team.GREEN
 
-        self.interface.notify_start()
+        teams = {team: tuple(self.teams[team]) for team in Team}
+        self.emit(events.GameStarted(self.seed, self.mode, teams, self.board.snapshot()))
         self.notify_phase()
 
+    def active_position(self, word):
+        position = self.board.find(word)
+        if position is None or self.board.is_revealed(position):
+            return None
+
+        return position
+
     def word_in_game(self, word):
-        return any(word.lower() == i.lower() for i in self.all_words)
+        return self.active_position(word) is not None
 
     def hint(self, actor, word, number):
         if self.phase != GamePhase.HINTING:
@@ -369,10 +627,10 @@ class Game:
             raise InvalidGameState(f"{actor} can't hint for the {self.active_team} team.")
         elif self.teams[actor.team].spymaster != actor:
             raise InvalidGameState("Only spymasters are permitted to hint.")
-        elif self.word_in_game(word.lower()):
+        elif self.word_in_game(word):
             raise InvalidGameState("Hints may not be a word currently active in the game.")
         elif number is not UNLIMITED and (number < 0 or
-                                          number > len(self.remaining_words[self.active_team])):
+                                          number > self.board.remaining(self.active_team)):
             raise InvalidGameState("Hints must be for either zero words, unlimited words, or "
                                    "some amount of words remaining for your team.")
 
@@ -393,42 +651,35 @@ class Game:
             raise InvalidGameState(f"{actor} can't guess for the {self.active_team} team.")
         elif self.teams[actor.team].spymaster == actor:
             raise InvalidGameState("Spymasters are not permitted to guess.")
-        elif not self.word_in_game(word):
+
+        position = self.active_position(word)
+        if position is None:
             raise InvalidGameState(f"{word} is not currently active in the game.")
 
-        word = word.title()
-        self.all_words.remove(word)
+        self.board.reveal(position)
+        word = self.board.table[self.board.ids[position]]
+        owner = self.board.owner(position)
 
-        if word == self.assassin:
-            self.interface.assassin_guessed(actor, word)
+        if owner is None:
+            self.emit(events.Guessed(actor, word, None, 0, 0))
 
             self.phase = GamePhase.POST_GAME
             self.winner = ~self.active_team
 
-            self.interface.notify_winner()
-
-        elif word in self.words[Team.GRAY]:
-            self.remaining_words[Team.GRAY].remove(word)
-            self.guessed_words[Team.GRAY].append(word)
-
-            self.interface.civilian_guessed(actor, word)
-            self.end_guessing()
+            self.notify_phase()
+            return
 
-        elif word in self.words[~self.active_team]:
-            self.remaining_words[~self.active_team].remove(word)
-            self.guessed_words[~self.active_team].append(word)
+        remaining = self.board.remaining(owner)
 
-            self.interface.team_guessed(actor, ~self.active_team, word)
+        if owner != self.active_team:
+            self.emit(events.Guessed(actor, word, owner, remaining, 0))
             self.end_guessing()
 
-        elif word in self.words[self.active_team]:
-            self.remaining_words[self.active_team].remove(word)
-            self.guessed_words[self.active_team].append(word)
-
+        else:
             if self.remaining_guesses != UNLIMITED:
                 self.remaining_guesses -= 1
 
-            self.interface.team_guessed(actor, self.active_team, word)
+            self.emit(events.Guessed(actor, word, owner, remaining, self.remaining_guesses))
 
             if not self.check_win() and self.remaining_guesses == 0:
                 self.end_guessing()
@@ -449,15 +700,31 @@ class Game:
             return
 
         assert self.phase == GamePhase.GUESSING
+        self.emit(events.TurnEnded(self.active_team))
 
         self.phase = GamePhase.HINTING
         self.active_team = ~self.active_team
 
         self.notify_phase()
 
+    def time_out(self):
+        """Ends the current turn because its time ran out, skipping it if nobody hinted."""
+        if self.phase not in {GamePhase.HINTING, GamePhase.GUESSING}:
+            raise InvalidGameState("There's no turn to time out.")
+
+        self.emit(events.TimedOut(self.active_team, self.phase))
+        if self.phase == GamePhase.GUESSING:
+            self.end_guessing()
+            return
+
+        self.emit(events.TurnEnded(self.active_team))
+        self.active_team = ~self.active_team
+
+        self.notify_phase()
+
     def check_win(self):
         for team in {Team.GREEN, Team.PINK}:
-            if not self.remaining_words[team]:
+            if not self.board.hidden(team):
                 self.phase = GamePhase.POST_GAME
                 self.winner = team
 
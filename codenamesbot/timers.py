@@ -0,0 +1,201 @@
+"""Turn timers, so that a game can't stall on a spymaster or guessers who've wandered off.
+
+Every game's timers live on one shared TimingWheel. Scheduling and cancelling are a dict insert
+and a dict delete, however many timers are pending, and a single task drives the whole wheel.
+"""
+import itertools
+import math
+import time
+
+from . import events
+from .state import GamePhase, Team
+
+# 64 slots per level and five levels: about a billion ticks, or 34 years of one second ticks
+SLOT_BITS = 6
+SLOTS = 1 << SLOT_BITS
+LEVELS = 5
+
+# the last reminder of a turn comes this many seconds before the end, or halfway through
+# shorter turns
+REMINDER = 30
+
+
+class Timer:
+    __slots__ = ("deadline", "callback", "args", "slot")
+
+    def __init__(self, deadline, callback, args):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.slot = None
+
+    @property
+    def pending(self):
+        return self.slot is not None
+
+
+class TimingWheel:
+    """A hierarchical timing wheel of one-shot timers, counted in ticks of ``tick`` seconds.
+
+    Level 0 has a slot for each of the next SLOTS ticks, level 1 a slot for each of the next
+    SLOTS runs of SLOTS ticks, and so on. A timer is put in the finest level its deadline fits
+    in, and moved down a level each time the wheel reaches the start of its slot, so every timer
+    is touched at most LEVELS times before it fires. Timers fire up to a tick late, never early.
+    ``clock`` is injectable like the SendScheduler's.
+    """
+
+    def __init__(self, tick=1.0, clock=time.monotonic):
+        self.tick = tick
+        self.clock = clock
+        self.start = clock()
+
+        self.current = 0
+        self.count = 0
+        self.levels = [[{} for _ in range(SLOTS)] for _ in range(LEVELS)]
+
+        self.wakeup = None
+
+    def now(self):
+        return int((self.clock() - self.start) / self.tick)
+
+    def schedule(self, delay, callback, *args):
+        """Calls ``callback(*args)`` in ``delay`` seconds and returns the Timer."""
+        if not self.count:
+            # nothing was pending, so nobody has been moving the wheel along
+            self.current = self.now()
+
+        timer = Timer(self.current + max(1, math.ceil(delay / self.tick)), callback, args)
+        self.place(timer)
+        self.count += 1
+
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+        return timer
+
+    def cancel(self, timer):
+        if timer.slot is not None:
+            del timer.slot[timer]
+            timer.slot = None
+            self.count -= 1
+
+    def place(self, timer):
+        delta = timer.deadline - self.current
+        for level in range(LEVELS):
+            if delta < SLOTS**(level + 1):
+                break
+        else:
+            raise ValueError(f"timers can't be more than {SLOTS**LEVELS} ticks away")
+
+        timer.slot = self.levels[level][(timer.deadline >> (SLOT_BITS * level)) & (SLOTS - 1)]
+        timer.slot[timer] = None
+
+    def advance(self):
+        """Fires every timer that's due. Returns how many fired."""
+        target = self.now()
+        if not self.count:
+            self.current = max(self.current, target)
+            return 0
+
+        fired = 0
+        while self.current < target and self.count:
+            self.current += 1
+
+            # move timers down from every coarser level whose slot starts at this tick
+            for level in range(LEVELS - 1, 0, -1):
+                if self.current & ((1 << (SLOT_BITS * level)) - 1):
+                    continue
+
+                slot = self.levels[level][(self.current >> (SLOT_BITS * level)) & (SLOTS - 1)]
+                timers = list(slot)
+                slot.clear()
+                for timer in timers:
+                    self.place(timer)
+
+            slot = self.levels[0][self.current & (SLOTS - 1)]
+            while slot:
+                timer = next(iter(slot))
+                self.cancel(timer)
+                timer.callback(*timer.args)
+                fired += 1
+
+        self.current = max(self.current, target)
+        return fired
+
+    def __len__(self):
+        return self.count
+
+    async def run(self):
+        import asyncio
+        self.wakeup = asyncio.Event()
+
+        while True:
+            self.advance()
+            self.wakeup.clear()
+
+            if self.count:
+                await asyncio.sleep(self.tick)
+            else:
+                await self.wakeup.wait()
+
+
+def players_up(game):
+    """Returns the players the game is waiting on: the spymaster, or the guessers."""
+    team = game.teams[game.active_team]
+    if game.phase == GamePhase.HINTING:
+        return [team.spymaster]
+
+    return [player for player in game.teams[Team.GRAY].players + team.guessers if not player.bot]
+
+
+class TurnTimers:
+    """Times the turns of every game it watches, on one TimingWheel.
+
+    A game's ``time_limits`` say how many seconds each phase may take. When time runs out,
+    ``expire(game, turn)`` is called; reminders call ``remind(game, seconds_left)``. By the time
+    an expiry is handled the turn may have ended anyway, which ``current(game, turn)`` tells.
+    """
+
+    def __init__(self, wheel=None, reminder=REMINDER):
+        self.wheel = TimingWheel() if wheel is None else wheel
+        self.reminder = reminder
+
+        # game -> (its turn's number, its pending timers)
+        self.pending = {}
+        self.turns = itertools.count()
+
+    def watch(self, game, expire, remind):
+        sink = game.events.subscribe(lambda event: self.push(event, game, expire, remind))
+
+        # games restored mid-turn won't announce their turn again
+        self.restart(game, expire, remind)
+        return sink
+
+    def push(self, event, game, expire, remind):
+        if isinstance(event, (events.TurnStarted, events.Hinted)):
+            self.restart(game, expire, remind)
+        elif isinstance(event, (events.TurnEnded, events.GameWon)):
+            self.cancel(game)
+
+    def restart(self, game, expire, remind):
+        self.cancel(game)
+
+        limit = game.time_limits.get(game.phase)
+        if not limit or game.phase not in {GamePhase.HINTING, GamePhase.GUESSING}:
+            return
+
+        turn = next(self.turns)
+        timers = [self.wheel.schedule(limit, expire, game, turn)]
+        reminder = min(self.reminder, limit // 2)
+        if reminder > 0:
+            timers.append(self.wheel.schedule(limit - reminder, remind, game, reminder))
+
+        self.pending[game] = (turn, timers)
+
+    def current(self, game, turn):
+        return game in self.pending and self.pending[game][0] == turn
+
+    def cancel(self, game):
+        _, timers = self.pending.pop(game, (None, ()))
+        for timer in timers:
+            self.wheel.cancel(timer)
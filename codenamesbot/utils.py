@@ -1,4 +1,12 @@
+IRC_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ[]\\~", "abcdefghijklmnopqrstuvwxyz{}|^")
+
+
 def plural(n, s, p):
     if n == 1:
         return f"{n} {s}"
     return f"{n} {p}"
+
+
+def irc_lower(name):
+    # rfc1459 casemapping, so nicks and channels compare the way the server compares them
+    return str(name).translate(IRC_LOWER)
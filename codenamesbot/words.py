@@ -1,13 +1,51 @@
-import collections
+TABLES = {}
 
 
-class ConsumableList(collections.deque):
+def table_named(name):
+    if name not in TABLES:
+        # word packs are only mapped in once something asks for them
+        from .packs import load
+        return load(name)
 
-    def consume(self, n):
-        return [self.popleft() for _ in range(n)]
+    return TABLES[name]
 
 
-WORDS = ConsumableList([
+class WordTable:
+    """An immutable word list, shared by every board dealt from it.
+
+    Boards store ids into the table rather than the words themselves; ``lookup`` maps a word,
+    in any case, back to its id. Named tables are pickled by name, so snapshots of many boards
+    don't each carry a copy of the words.
+    """
+
+    def __init__(self, words, name=None):
+        self.words = tuple(words)
+        self.ids = {word.casefold(): i for i, word in enumerate(self.words)}
+
+        self.name = name
+        if name is not None:
+            TABLES[name] = self
+
+    def __reduce__(self):
+        if self.name is not None:
+            return (table_named, (self.name,))
+
+        return (WordTable, (self.words,))
+
+    def lookup(self, word):
+        return self.ids.get(word.casefold())
+
+    def __getitem__(self, word_id):
+        return self.words[word_id]
+
+    def __len__(self):
+        return len(self.words)
+
+    def __iter__(self):
+        return iter(self.words)
+
+
+WORDS = WordTable([
     'Africa', 'Agent', 'Air', 'Alien', 'Alps', 'Amazon', 'Ambulance', 'America', 'Angel',
     'Antarctica', 'Apple', 'Arm', 'Atlantis', 'Australia', 'Aztec', 'Back', 'Ball', 'Band', 'Bank',
     'Bar', 'Bark', 'Bat', 'Battery', 'Beach', 'Bear', 'Beat', 'Bed', 'Beijing', 'Bell', 'Belt',
@@ -49,4 +87,5 @@ WORDS = ConsumableList([
     'Undertaker', 'Unicorn', 'Vacuum', 'Van', 'Vet', 'Wake', 'Wall', 'War', 'Washer', 'Washington',
     'Watch', 'Water', 'Wave', 'Web', 'Well', 'Whale', 'Whip', 'Wind', 'Witch', 'Worm', 'Yard',
     'York'
-])
+],
+                  name="default")
@@ -4,5 +4,6 @@ setup(
     name="codenamesbot",
     version="0.0.1",
     author="Tris Wilson",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "test"]),
+    entry_points={"console_scripts": ["codenamesbot = codenamesbot.cli:main"]},
 )
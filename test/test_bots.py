@@ -0,0 +1,126 @@
+import pytest
+from codenamesbot.bots import GuesserPool
+from codenamesbot.state import UNLIMITED, Game, GamePhase, InvalidGameState, Team
+
+np = pytest.importorskip("numpy")
+
+from codenamesbot import simulator  # noqa: E402
+from codenamesbot.embeddings import Embeddings  # noqa: E402
+from codenamesbot.words import WORDS  # noqa: E402
+
+
+def started_game(seed=1):
+    game = Game(seed=seed)
+    for name in ("tris", "claire", "bob", "alice"):
+        game.join(name)
+    game.start_game()
+    return game
+
+
+def embeddings_for(game, close):
+    # "pony" points straight at the words in close, a little at the other green words, and
+    # nowhere near anything else
+    words, vectors = ["pony", "zebra"], [[1, 0, 0], [0, 0, 1]]
+    for word in game.all_words:
+        words.append(word)
+        if word in close:
+            vectors.append([1, 0, 0])
+        elif word in game.words[Team.GREEN]:
+            vectors.append([0.2, 1, 0])
+        else:
+            vectors.append([0, 1, 0])
+
+    return Embeddings(words, vectors)
+
+
+def counting(embeddings):
+    calls = []
+    rank = embeddings.rank
+
+    def counted(hints, boards):
+        calls.append(len(hints))
+        return rank(hints, boards)
+
+    embeddings.rank = counted
+    return calls
+
+
+def test_bot_guesses_best_words_then_stops():
+    game = started_game()
+    green = game.words[Team.GREEN]
+    pool = GuesserPool(lambda: embeddings_for(game, green[:2]))
+
+    bot = pool.join(game, Team.GREEN)
+    pool.watch(game)
+    assert bot.bot and bot in game.teams[Team.GREEN].guessers
+
+    game.hint(game.teams[Team.GREEN].spymaster, "pony", 2)
+    assert pool.tick() == 1
+
+    # two guesses for a clue for two words, though the team could have had a third
+    assert set(game.guessed_words[Team.GREEN]) == set(green[:2])
+    assert game.phase == GamePhase.HINTING
+    assert game.active_team == Team.PINK
+
+
+def test_unlimited_hints_stop_when_unsure():
+    game = started_game()
+    green = game.words[Team.GREEN]
+    pool = GuesserPool(lambda: embeddings_for(game, green[:3]))
+    pool.join(game, Team.GREEN)
+    pool.watch(game)
+
+    game.hint(game.teams[Team.GREEN].spymaster, "pony", UNLIMITED)
+    pool.tick()
+
+    assert set(game.guessed_words[Team.GREEN]) == set(green[:3])
+    assert game.active_team == Team.PINK
+
+
+def test_stale_requests_are_dropped():
+    game = started_game()
+    pool = GuesserPool(lambda: embeddings_for(game, []))
+    pool.join(game, Team.GREEN)
+    pool.watch(game)
+
+    green = game.teams[Team.GREEN]
+    game.hint(green.spymaster, "pony", 2)
+    game.guess(green.guessers[0], game.words[Team.GREEN][0])
+
+    # a person guessed before the bot got its turn
+    assert pool.tick() == 0
+
+
+def test_requests_from_many_games_are_ranked_together():
+    games = [started_game(seed) for seed in range(50)]
+    embeddings = Embeddings(["pony"] + list(WORDS), np.random.default_rng(0).random((401, 8)))
+    calls = counting(embeddings)
+
+    pool = GuesserPool(lambda: embeddings)
+    for game in games:
+        pool.join(game, Team.GREEN)
+        pool.watch(game)
+        game.hint(game.teams[Team.GREEN].spymaster, "pony", 1)
+
+    assert pool.tick() == 50
+    assert calls == [50]
+    assert all(game.board.revealed for game in games)
+
+
+def test_bots_only_join_running_games():
+    game = Game()
+    game.join("tris")
+
+    with pytest.raises(InvalidGameState):
+        GuesserPool(None).join(game)
+
+
+def test_simulated_bot_games_finish():
+    vocabulary = list(WORDS) + [f"clue{chr(ord('a') + i)}" for i in range(26)]
+    vocabulary = [word for word in vocabulary if word.isalpha()]
+    embeddings = Embeddings(vocabulary, np.random.default_rng(0).random((len(vocabulary), 16)))
+
+    for winner, turns, guesses in simulator.play_with_bots(range(10), embeddings):
+        assert winner in {Team.GREEN, Team.PINK}
+        assert 0 < turns < simulator.MAX_TURNS
+        assert guesses > 0
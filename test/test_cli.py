@@ -0,0 +1,46 @@
+import subprocess
+import sys
+
+import pytest
+from codenamesbot import cli
+
+
+def imported_by(module):
+    code = f"import sys, {module}; print(' '.join(sys.modules))"
+    return subprocess.run([sys.executable, "-c", code],
+                          stdout=subprocess.PIPE,
+                          universal_newlines=True,
+                          check=True).stdout.split()
+
+
+def test_game_state_imports_no_event_loop():
+    assert "asyncio" not in imported_by("codenamesbot.state")
+
+
+def test_heavy_pieces_load_only_when_used():
+    modules = imported_by("codenamesbot.irc")
+    for heavy in ("pyrcb2", "asyncio", "codenamesbot.packs", "codenamesbot.embeddings", "numpy"):
+        assert heavy not in modules
+
+
+def test_import_times_cover_every_module():
+    times = {module: (own, cumulative) for module, own, cumulative in cli.import_times(["json"])}
+
+    own, cumulative = times["json"]
+    assert 0 < own <= cumulative
+    assert "json.decoder" in times
+
+
+def test_startup_profile(tmp_path, capsys):
+    pytest.importorskip("pyrcb2")
+
+    cli.main(["bot", "#a", "--state-dir", str(tmp_path), "--startup-profile"])
+    out = capsys.readouterr().out
+
+    assert "codenamesbot.irc" in out
+    assert "IRC transport (pyrcb2)" in out
+
+
+def test_spectators_need_a_single_process():
+    with pytest.raises(SystemExit):
+        cli.main(["bot", "#a", "--workers", "2", "--spectator-port", "8765"])
@@ -0,0 +1,74 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from codenamesbot.embeddings import Embeddings  # noqa: E402
+
+# five directions: green words, pink words, civilians, the assassin and something unrelated
+VECTORS = {
+    "Horse": [1, 0, 0, 0, 0],
+    "Zebra": [1, 0.2, 0, 0, 0],
+    "Bank": [0, 1, 0, 0, 0],
+    "Car": [0, 0, 1, 0, 0],
+    "Bomb": [0, 0, 0, 1, 0],
+    "animal": [1, 0.1, 0, 0, 0],
+    "stripes": [0.6, 0.3, 0, 0, 0.7],
+    "money": [0.1, 1, 0, 0, 0],
+    "mammal": [1, 0, 0, 0.9, 0],
+    "horses": [1, 0, 0, 0, 0],
+    "pony,": [1, 0, 0, 0, 0],
+    "ice": [0, 0, 0, 0, 1],
+    "cream": [0, 0, 0.5, 0, 1],
+}
+
+
+def embeddings():
+    return Embeddings(VECTORS, list(VECTORS.values()))
+
+
+def test_suggests_clues_for_own_words_only():
+    suggestions = embeddings().suggest(["Horse", "Zebra"], ["Bank"], ["Car"], ["Bomb"])
+
+    clue, number, targets = suggestions[0]
+    assert (clue, number) == ("animal", 2)
+    assert set(targets) == {"Horse", "Zebra"}
+
+    clues = [clue for clue, _, _ in suggestions]
+    # money points at pink, mammal too close to the assassin, horses contains a board word and
+    # "pony," isn't a word at all
+    assert not {"money", "mammal", "horses", "pony,", "Horse", "Zebra"} & set(clues)
+
+
+def test_suggestions_are_case_insensitive_and_handle_phrases():
+    e = embeddings()
+
+    assert "HORSE" in e
+    assert "Ice Cream" in e
+    assert "Loch Ness" not in e
+    assert e.suggest(["Loch Ness"]) == []
+
+    assert e.suggest(["horse", "ZEBRA"], ["bank"])[0][:2] == ("animal", 2)
+
+
+def test_text_and_npz_files(tmp_path):
+    text = tmp_path / "vectors.txt"
+    text.write_text("3 2\nhorse 1 0\nbank 0 1\nanimal 0.9 0.1\n")
+
+    e = Embeddings.load(str(text))
+    assert len(e) == 3
+    assert e.suggest(["Horse"], ["Bank"])[0][:2] == ("animal", 1)
+
+    e.save(str(tmp_path / "vectors.npz"))
+    loaded = Embeddings.load(str(tmp_path / "vectors.npz"))
+    assert loaded.words == e.words
+    assert np.allclose(loaded.vectors, e.vectors)
+
+
+def test_rank_scores_many_boards_at_once():
+    scores = embeddings().rank(["animal", "money"], [["Bank", "Horse", "Loch Ness"], ["Bank"]])
+
+    assert scores.shape == (2, 3)
+    assert scores[0].argmax() == 1
+    assert scores[0, 2] == 0
+    assert scores[1, 0] == pytest.approx(0.995, abs=0.01)
+    assert scores[1, 1] == -np.inf
@@ -0,0 +1,119 @@
+import asyncio
+import io
+import json
+
+from codenamesbot import events
+from codenamesbot.events import Archive, EventStream, QueuedSink
+from codenamesbot.interface import Interface
+from codenamesbot.state import Game, GamePhase, Team
+
+
+class RecordingInterface(Interface):
+
+    def __init__(self):
+        self.told = []
+
+    def tell(self, message):
+        self.told.append(message)
+
+    def tell_private(self, player, message):
+        self.told.append((player.name, message))
+
+
+def start_game(interface=None):
+    game = Game(interface=interface, seed=1)
+    for name in ("tris", "claire", "bob", "alice"):
+        game.join(name)
+    game.start_game()
+    return game
+
+
+def test_game_emits_events_in_order():
+    game = Game(seed=1)
+    seen = []
+    game.events.subscribe(seen.append)
+
+    for name in ("tris", "claire", "bob", "alice"):
+        game.join(name)
+    game.start_game()
+
+    spymaster = game.teams[Team.GREEN].spymaster
+    guesser = game.teams[Team.GREEN].guessers[0]
+    game.hint(spymaster, "pony", 1)
+    game.guess(guesser, game.words[Team.PINK][0])
+
+    assert [type(e) for e in seen] == [events.PlayerJoined] * 4 + [
+        events.GameStarted, events.TurnStarted, events.Hinted, events.Guessed, events.TurnEnded,
+        events.TurnStarted
+    ]
+
+    guessed = seen[-3]
+    assert guessed.owner == Team.PINK
+    assert guessed.remaining == 7
+    assert guessed.guesses_left == 0
+    assert seen[-1].team == Team.PINK
+
+
+def test_events_carry_state_for_late_rendering():
+    interface = RecordingInterface()
+    game = start_game(interface)
+    queued = QueuedSink(lambda event, tag: interface.handle_event(event))
+    game.events.unsubscribe(interface.handle_event)
+    game.events.subscribe(queued)
+
+    spymaster = game.teams[Team.GREEN].spymaster
+    guesser = game.teams[Team.GREEN].guessers[0]
+    game.hint(spymaster, "pony", 1)
+    game.guess(guesser, game.assassin)
+
+    # the game has moved on to its end before the queued events are rendered
+    assert game.phase == GamePhase.POST_GAME
+    interface.told.clear()
+    queued.drain()
+
+    assert "The clue is pony (1)." in interface.told[0]
+    assert "Here are the remaining words" in interface.told[1]
+    assert game.assassin in interface.told[1]
+    assert "has revealed the assassin" in interface.told[2]
+    assert "Pink team wins" in interface.told[3]
+
+
+def test_queued_sink_tags_and_runs():
+    handled = []
+    sink = QueuedSink(lambda event, tag: handled.append((tag, event)))
+
+    stream = EventStream()
+    stream.subscribe(sink.tagged("#a"))
+    stream.emit(events.TurnEnded(Team.GREEN))
+    assert not handled
+
+    async def main():
+        task = asyncio.ensure_future(sink.run())
+        await asyncio.sleep(0)
+        stream.emit(events.TurnEnded(Team.PINK))
+        await asyncio.sleep(0)
+        task.cancel()
+
+    asyncio.run(main())
+    assert handled == [("#a", events.TurnEnded(Team.GREEN)), ("#a", events.TurnEnded(Team.PINK))]
+
+
+def test_archive_writes_json_lines():
+    file = io.StringIO()
+    archive = Archive(file)
+
+    game = Game(seed=1)
+    game.events.subscribe(lambda event: archive(event, "#a"))
+    for name in ("tris", "claire", "bob"):
+        game.join(name)
+    game.start_game()
+
+    records = [json.loads(line) for line in file.getvalue().splitlines()]
+    assert [r["event"] for r in records] == ["PlayerJoined"] * 3 + ["GameStarted", "TurnStarted"]
+    assert records[0] == {"event": "PlayerJoined", "player": "tris", "team": None, "game": "#a"}
+
+    started = records[3]
+    assert started["seed"] == 1
+    assert started["mode"] == "gray"
+    assert sorted(started["board"]["words"]) == sorted(game.all_words)
+    assert started["board"]["revealed"] == 0
@@ -0,0 +1,404 @@
+import json
+
+import pytest
+from codenamesbot.state import GamePhase, Team
+
+pytest.importorskip("pyrcb2")
+
+from codenamesbot.irc import IRCInterface  # noqa: E402
+
+
+def make_bot(state_dir=None, admins=()):
+    bot = IRCInterface("codenames", [], state_dir=state_dir, admins=admins)
+    bot.sent = []
+    bot.scheduler.send = lambda target, line: bot.sent.append((target, line))
+    bot.scheduler.rate = bot.scheduler.burst = bot.scheduler.tokens = 1e12
+    return bot
+
+
+def say(bot, sender, channel, message):
+    bot.on_privmsg(sender, channel, message)
+
+
+def start(bot, channel, seed=1):
+    for nick in ("tris", "claire", "bob", "alice"):
+        say(bot, nick, channel, "-join")
+    say(bot, "tris", channel, f"-start {seed}")
+    return bot.games[channel].game
+
+
+def play_turn(bot, channel):
+    game = bot.games[channel].game
+    spymaster = game.teams[game.active_team].spymaster
+    guesser = game.teams[game.active_team].guessers[0]
+
+    say(bot, spymaster.name, channel, "-c pony 1")
+    say(bot, guesser.name, channel, f"-g {game.remaining_words[game.active_team][0]}")
+    say(bot, guesser.name, channel, "-pony")
+
+
+def state_of(game):
+    players = [(p.name, p.team) for p in game.players]
+    teams = {team: [p.name for p in game.teams[team]] for team in Team}
+    return (game.seed, game.phase, game.active_team, game.board.snapshot(), game.current_hint,
+            game.remaining_guesses, players, teams, game.random.getstate())
+
+
+def test_channels_get_separate_games():
+    bot = make_bot()
+
+    start(bot, "#a")
+    say(bot, "tris", "#b", "-join")
+
+    assert bot.games["#a"].game.phase == GamePhase.HINTING
+    assert bot.games["#b"].game.phase == GamePhase.PRE_GAME
+    assert ("#b", "\x02tris\x0f has joined the game.") in bot.sent
+
+
+def test_command_output_is_packed():
+    bot = make_bot()
+    start(bot, "#a")
+
+    bot.sent.clear()
+    play_turn(bot, "#a")
+
+    channel_lines = [line for target, line in bot.sent if target == "#a"]
+    assert len(channel_lines) == 3  # one line for each command
+
+
+def test_recovers_from_snapshot_and_journal(tmp_path):
+    bot = make_bot(tmp_path)
+    start(bot, "#a", seed=3)
+    start(bot, "#b", seed=4)
+    play_turn(bot, "#a")
+
+    bot.store.snapshot(bot.live_games())
+
+    play_turn(bot, "#a")
+    play_turn(bot, "#b")
+    say(bot, "alice", "#c", "-join")
+    bot.rename("alice", "alicia")
+    bot.store.flush()
+
+    # the process dies here without a chance to close anything
+    recovered = make_bot(tmp_path)
+
+    for channel in ("#a", "#b", "#c"):
+        assert state_of(recovered.games[channel].game) == state_of(bot.games[channel].game)
+
+    assert "alicia" in recovered.games["#c"].game.players
+    assert not recovered.sent
+
+
+def test_recovered_games_keep_playing(tmp_path):
+    bot = make_bot(tmp_path)
+    start(bot, "#a")
+    bot.store.flush()
+
+    recovered = make_bot(tmp_path)
+    play_turn(bot, "#a")
+    play_turn(recovered, "#a")
+
+    assert state_of(recovered.games["#a"].game) == state_of(bot.games["#a"].game)
+
+
+def test_word_pack_is_picked_before_the_game(tmp_path, monkeypatch):
+    from codenamesbot import packs, words
+
+    tables = dict(words.TABLES)
+    monkeypatch.setattr(words, "TABLES", tables)
+    monkeypatch.setattr(packs, "TABLES", tables)
+    monkeypatch.setattr(packs, "PACK_DIRS", [str(tmp_path)])
+    packs.compile_pack([f"Animal{i}" for i in range(40)], str(tmp_path / "animals.cnpack"))
+    packs.compile_pack(["Tiny"], str(tmp_path / "tiny.cnpack"))
+
+    bot = make_bot()
+    say(bot, "tris", "#a", "-join")
+    say(bot, "tris", "#a", "-pack")
+    assert any("Available packs: animals, default, tiny." in line for _, line in bot.sent)
+
+    say(bot, "tris", "#a", "-pack tiny")
+    say(bot, "tris", "#a", "-pack plants")
+    assert bot.games["#a"].game.table.name == "default"
+
+    say(bot, "tris", "#a", "-pack Animals")
+    game = start(bot, "#a")
+    assert all(word.startswith("Animal") for word in game.all_words)
+
+    say(bot, "tris", "#a", "-pack default")
+    assert game.table.name == "animals"
+
+    say(bot, "tris", "#a", "-endgame")
+    assert bot.games["#a"].game.table is game.table
+
+
+def test_suggest_answers_spymasters_in_private(tmp_path):
+    pytest.importorskip("numpy")
+
+    bot = make_bot()
+    game = start(bot, "#a")
+
+    # green words point one way and everything else the other, with one clue for green
+    path = tmp_path / "vectors.txt"
+    green = game.words[Team.GREEN]
+    lines = [f"{word.lower()} 1 0" for word in green]
+    lines += [f"{word.lower()} 0 1" for word in game.all_words if word not in green]
+    path.write_text("\n".join(lines + ["pony 0.9 0.1"]))
+    bot.embeddings_path = str(path)
+
+    spymaster = game.teams[Team.GREEN].spymaster.name
+    guesser = game.teams[Team.GREEN].guessers[0].name
+
+    bot.sent.clear()
+    say(bot, spymaster, None, "-suggest")
+    say(bot, guesser, None, "-suggest")
+    say(bot, spymaster, None, "-suggest #b")
+
+    assert bot.sent[0][0] == spymaster
+    assert bot.sent[0][1].startswith("Clues for #a: pony 9 (")
+    assert bot.sent[1:] == [(guesser, "You're not a spymaster in any running game."),
+                            (spymaster, "You're not a spymaster in any running game.")]
+
+
+def test_suggest_without_numpy_or_embeddings(monkeypatch):
+    import sys
+
+    bot = make_bot()
+    game = start(bot, "#a")
+    spymaster = game.teams[Team.GREEN].spymaster.name
+
+    say(bot, spymaster, None, "-suggest")
+    assert bot.sent[-1] == (spymaster, "Clue suggestions aren't set up on this bot.")
+
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    monkeypatch.delitem(sys.modules, "codenamesbot.embeddings", raising=False)
+    bot.embeddings_path = "vectors.npz"
+
+    say(bot, spymaster, None, "-suggest")
+    assert bot.sent[-1] == (spymaster, "Clue suggestions need numpy, which isn't installed.")
+
+
+def test_bots_guess_through_dispatch(tmp_path):
+    pytest.importorskip("numpy")
+
+    bot = make_bot(tmp_path / "state")
+    game = start(bot, "#a")
+
+    path = tmp_path / "vectors.txt"
+    target = game.words[Team.GREEN][0]
+    lines = [f"{word.lower()} {'1 0' if word == target else '0 1'}" for word in game.all_words]
+    path.write_text("\n".join(lines + ["pony 1 0"]))
+    bot.embeddings_path = str(path)
+
+    say(bot, "tris", "#a", "-bot green")
+    guessbot = game.players["guessbot1"]
+    assert guessbot.bot and guessbot.team == Team.GREEN
+
+    say(bot, game.teams[Team.GREEN].spymaster.name, "#a", "-c pony 1")
+    assert bot.guessers.tick() == 1
+
+    assert game.guessed_words[Team.GREEN] == [target]
+    assert game.active_team == Team.PINK
+
+    # the bot's moves were journaled like anyone else's
+    bot.store.flush()
+    _, records = bot.store.load()
+    assert ["dispatch", "guessbot1", "#a", "guess", [target.lower()]] in records
+    assert ["dispatch", "guessbot1", "#a", "stop", []] in records
+
+
+def test_queued_commands_run_per_game():
+    import asyncio
+
+    bot = make_bot()
+
+    async def main():
+        bot.queued = True
+        say(bot, "tris", "#a", "-join")
+        say(bot, "claire", "#b", "-join")
+        say(bot, "tris", "#a", "-pony")
+        say(bot, "tris", "#a", "hello")
+
+        # nothing runs until the queues get a turn
+        assert not bot.sent
+        assert bot.games["#a"].queue.depth == 2
+
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+        metrics = bot.queue_metrics()
+        bot.close("#a")
+        bot.close("#b")
+        return metrics
+
+    metrics = asyncio.run(main())
+
+    assert [target for target, _ in bot.sent] == ["#a", "#b", "#a"]
+    assert metrics["#a"]["handled"] == 2 and metrics["#b"]["handled"] == 1
+    assert metrics["#a"]["depth"] == 0
+    assert bot.queue_waits.labels().count == 3
+
+
+def test_turn_timers_skip_idle_turns_and_replay(tmp_path):
+    from codenamesbot.timers import TimingWheel
+
+    class FakeClock:
+        now = 0.0
+
+        def __call__(self):
+            return self.now
+
+    clock = FakeClock()
+    bot = make_bot(tmp_path)
+    bot.timers.wheel = TimingWheel(clock=clock)
+
+    say(bot, "tris", "#a", "-join")
+    say(bot, "tris", "#a", "-timer hint 5")
+    assert bot.sent[-1] == ("#a", "Time limits must be a number of seconds, at least 10.")
+    say(bot, "tris", "#a", "-timer hint 20")
+    say(bot, "tris", "#a", "-timer guess 60")
+    say(bot, "tris", "#a", "-timer guess off")
+    say(bot, "tris", "#a", "-timer")
+    assert bot.sent[-1] == ("#a", "Spymasters have \x0220 seconds\x0f to hint and guessers have "
+                            "unlimited time to guess.")
+
+    game = start(bot, "#a")
+    assert game.time_limits == {GamePhase.HINTING: 20}
+
+    clock.now = 10
+    bot.timers.wheel.advance()
+    spymaster = game.teams[Team.GREEN].spymaster
+    assert bot.sent[-1] == ("#a", f"\x02\x0303{spymaster}\x0f: 10 seconds left to hint!")
+
+    clock.now = 20
+    bot.timers.wheel.advance()
+    assert game.active_team == Team.PINK and game.phase == GamePhase.HINTING
+    assert any("Time's up!" in line for _, line in bot.sent)
+
+    bot.store.flush()
+    recovered = make_bot(tmp_path)
+    assert state_of(recovered.games["#a"].game) == state_of(game)
+
+
+def test_non_commands_are_turned_away_early():
+    bot = make_bot()
+
+    for message in ("hello", "-", "--- lol ---", "-notacommand at all"):
+        say(bot, "tris", "#a", message)
+    assert "#a" not in bot.games
+
+    say(bot, "tris", "#a", "  -JOIN   green ")
+    assert bot.games["#a"].game.players["tris"].team == Team.GREEN
+
+
+def test_commands_are_registered_per_class():
+    from codenamesbot.irc import ChannelInterface, command
+
+    class LoudChannelInterface(ChannelInterface):
+
+        @command({"shout"})
+        def command_shout(self, actor, args):
+            self.tell(" ".join(args).upper())
+
+    assert "shout" in LoudChannelInterface.commands
+    assert "shout" not in ChannelInterface.commands
+    assert LoudChannelInterface.commands["j"] is ChannelInterface.commands["join"]
+
+    bot = make_bot()
+    LoudChannelInterface(bot, "#a").handle_command("tris", "shout", ["hi"])
+    assert bot.sent == [("#a", "HI")]
+
+
+def test_metrics_count_commands_and_phases():
+    bot = make_bot(admins=["Tris"])
+    start(bot, "#a")
+    play_turn(bot, "#a")
+
+    exposition = bot.metrics.render()
+    assert 'codenames_command_seconds_count{command="join"} 4' in exposition
+    assert 'codenames_command_seconds_count{command="guess"} 1' in exposition
+    assert 'codenames_phase_transitions_total{phase="guessing"} 1' in exposition
+    assert 'codenames_games{phase="guessing"} 1' in exposition
+    assert "codenames_players 4" in exposition
+    assert 'codenames_send_wait_seconds_count{priority="high"}' in exposition
+    assert "codenames_command_queue_wait_seconds_count 0" in exposition
+
+    bot.sent.clear()
+    say(bot, "claire", None, "-metrics")
+    assert bot.sent == [("claire", "Sorry, only admins can do that.")]
+
+    bot.sent.clear()
+    say(bot, "tris", None, "-metrics")
+    assert {target for target, _ in bot.sent} == {"tris"}
+    reply = " ".join(line for _, line in bot.sent)
+    assert reply.startswith("1 game open (1 running), 4 players, 0 lines sent (0 bytes). "
+                            "Commands: join 4x mean ")
+    assert "Waits: commands 0.00ms mean, p99 <0ms, 0 waiting, high lines " in reply
+
+
+def test_profile_the_next_commands_in_a_channel(tmp_path):
+    bot = make_bot(admins=["tris"])
+    bot.profile_dir = str(tmp_path)
+    start(bot, "#a")
+    start(bot, "#b")
+
+    say(bot, "claire", None, "-profile 2 #a")
+    assert bot.profiler is None
+
+    bot.sent.clear()
+    say(bot, "tris", None, "-profile 2 #a")
+    assert bot.sent == [("tris", "Profiling the next 2 commands in #a.")]
+
+    play_turn(bot, "#b")
+    play_turn(bot, "#a")
+    assert bot.profiler is None
+
+    folded_path, pstats_path = sorted(tmp_path.iterdir())
+    assert folded_path.suffix == ".folded" and pstats_path.suffix == ".pstats"
+    assert "handle_command (irc.py" in folded_path.read_text()
+
+    report = " ".join(line for target, line in bot.sent if target == "tris")
+    assert "Profiled 2 commands in #a, " in report and "Hottest: " in report
+    assert report.endswith(f"Saved {pstats_path} and {folded_path}.")
+
+
+def test_views_are_rendered_once_per_revision(monkeypatch):
+    bot = make_bot()
+    game = start(bot, "#a")
+    interface = bot.games["#a"]
+    spymaster = game.teams[game.active_team].spymaster.name
+
+    renders = []
+    render_words = interface.render_words
+    monkeypatch.setattr(interface, "render_words", lambda: renders.append(1) or render_words())
+
+    bot.sent.clear()
+    say(bot, spymaster, "#a", "-words")
+    say(bot, spymaster, "#a", "-words")
+    assert len(renders) == 1
+    assert bot.sent[:2] == bot.sent[2:]
+
+    play_turn(bot, "#a")
+    bot.sent.clear()
+    say(bot, spymaster, "#a", "-words")
+    assert len(renders) == 2
+    assert game.board.words(game.board.revealed)[0] in bot.sent[0][1]
+
+    # renames aren't game events, but they change how players are shown
+    bot.rename(spymaster, "trixie")
+    bot.sent.clear()
+    say(bot, "trixie", "#a", "-stats")
+    assert "trixie" in bot.sent[0][1] and spymaster not in bot.sent[0][1]
+
+
+def test_game_events_are_archived(tmp_path):
+    path = tmp_path / "games.jsonl"
+    bot = IRCInterface("codenames", [], archive=str(path))
+    bot.scheduler.send = lambda target, line: None
+    start(bot, "#a")
+    for sink in bot.sinks:
+        sink.drain()
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r["event"] for r in records] == ["PlayerJoined"] * 4 + ["GameStarted", "TurnStarted"]
+    assert {r["game"] for r in records} == {"#a"}
@@ -0,0 +1,60 @@
+import pytest
+from codenamesbot.interface import Interface
+from codenamesbot.manager import GameManager
+from codenamesbot.state import Game, GamePhase
+
+
+class ChannelInterface(Interface):
+
+    def __init__(self, channel):
+        self.channel = channel
+        Game(interface=self)
+
+
+def test_open_creates_one_game_per_channel():
+    games = GameManager(ChannelInterface)
+
+    a = games.open("#a")
+    b = games.open("#b")
+
+    assert a is not b
+    assert a.game is not b.game
+    assert games.open("#a") is a
+    assert len(games) == 2
+
+
+def test_channels_are_case_insensitive():
+    games = GameManager(ChannelInterface)
+
+    a = games.open("#Codenames[1]")
+
+    assert games.get("#codenames{1}") is a
+    assert "#CODENAMES[1]" in games
+
+
+def test_close_leaves_other_games_alone():
+    games = GameManager(ChannelInterface)
+
+    a = games.open("#a")
+    b = games.open("#b")
+    for name in ("tris", "claire", "bob"):
+        a.game.join(name)
+        b.game.join(name)
+
+    b.game.start_game()
+    assert games.close("#a") is a
+
+    assert "#a" not in games
+    assert games["#b"] is b
+    assert b.game.phase == GamePhase.HINTING
+
+    with pytest.raises(KeyError):
+        games["#a"]
+
+
+def test_games_iterates_every_channel():
+    games = GameManager(ChannelInterface)
+
+    interfaces = [games.open(f"#{i}") for i in range(10)]
+    assert list(games) == interfaces
+    assert list(games.games()) == [i.game for i in interfaces]
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from codenamesbot.metrics import BATCH, Histogram, Registry, start_server
+
+
+def test_histogram_counts_into_buckets():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in [0.05, 0.1, 0.5, 2.0] * BATCH:
+        histogram.observe(value)
+
+    assert histogram.counts == [2 * BATCH, BATCH, BATCH]
+    assert histogram.count == 4 * BATCH
+    assert histogram.mean == pytest.approx((0.05 + 0.1 + 0.5 + 2.0) / 4)
+    assert [histogram.quantile(q) for q in (0.25, 0.5, 0.75, 1.0)] == [0.1, 0.1, 1.0, float("inf")]
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    registry.counter("sent_total", "Lines sent", ["target"]).labels('#a"b').inc(3)
+    registry.histogram("seconds", "Latency", buckets=(0.5,)).labels().observe(0.25)
+    registry.gauge("games", "Open games", lambda: 2)
+
+    assert registry.render() == "\n".join([
+        "# HELP sent_total Lines sent",
+        "# TYPE sent_total counter",
+        'sent_total{target="#a\\"b"} 3',
+        "# HELP seconds Latency",
+        "# TYPE seconds histogram",
+        'seconds_bucket{le="0.5"} 1',
+        'seconds_bucket{le="+Inf"} 1',
+        "seconds_sum 0.25",
+        "seconds_count 1",
+        "# HELP games Open games",
+        "# TYPE games gauge",
+        "games 2",
+    ]) + "\n"
+
+
+def test_metrics_are_served_over_http():
+    registry = Registry()
+    registry.gauge("games", "Open games", lambda: 2)
+
+    async def get(port, path):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {path} HTTP/1.0\r\nHost: localhost\r\n\r\n".encode())
+        response = await reader.read()
+        writer.close()
+        return response.decode()
+
+    async def main():
+        server = await start_server(registry, port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await get(port, "/metrics"), await get(port, "/")
+
+    metrics, missing = asyncio.run(main())
+    assert metrics.startswith("HTTP/1.0 200 OK\r\n")
+    assert metrics.endswith("\r\n\r\n# HELP games Open games\n# TYPE games gauge\ngames 2\n")
+    assert missing.startswith("HTTP/1.0 404 Not Found\r\n")
@@ -0,0 +1,89 @@
+from codenamesbot.output import (MAX_LINE_BYTES, OutputBuffer, line_limit, pack, size,
+                                 split_message)
+from codenamesbot.scheduler import Priority
+
+
+def test_pack_joins_short_messages():
+    assert pack(["one.", "two.", "three."], 100) == ["one. two. three."]
+
+
+def test_pack_respects_limit():
+    lines = pack(["a" * 40, "b" * 40, "c" * 40], 90)
+    assert lines == ["a" * 40 + " " + "b" * 40, "c" * 40]
+
+
+def test_pack_counts_bytes_not_characters():
+    lines = pack(["é" * 30, "é" * 30], 100)
+    assert len(lines) == 2
+    assert all(size(line) <= 100 for line in lines)
+
+
+def test_pack_counts_color_codes():
+    green = "\x02\x0303Green\x0f"
+    lines = pack([green * 8, green * 8], 100)
+
+    assert len(lines) == 2
+    assert all(size(line) <= 100 for line in lines)
+
+
+def test_pack_resets_open_formatting():
+    assert pack(["\x02bold", "plain"], 100) == ["\x02bold\x0f plain"]
+    assert pack(["\x02bold\x0f done", "plain"], 100) == ["\x02bold\x0f done plain"]
+
+
+def test_split_between_list_entries():
+    words = [f"Word{i}" for i in range(25)]
+    message = "Here are the remaining words: " + ", ".join(words) + "."
+
+    lines = split_message(message, 60)
+    assert all(size(line) <= 60 for line in lines)
+    assert all(line.endswith((",", ".")) for line in lines)
+    assert " ".join(lines) == message
+
+
+def test_split_unbroken_run_avoids_color_codes():
+    message = ("x" * 8 + "\x0313y") * 10
+    lines = split_message(message, 20)
+
+    assert all(size(line) <= 20 for line in lines)
+    assert "".join(lines) == message
+    assert not any(line.endswith(("\x03", "\x031")) for line in lines)
+
+
+def test_line_limit_leaves_room_for_prefix():
+    limit = line_limit("#codenames")
+    assert limit + size("PRIVMSG #codenames :\r\n") < MAX_LINE_BYTES
+
+
+def test_buffer_sends_immediately_outside_collect():
+    sent = []
+    output = OutputBuffer(lambda target, line, priority: sent.append((target, line)))
+
+    output.add("#a", "hello")
+    assert sent == [("#a", "hello")]
+
+
+def test_buffer_coalesces_per_target():
+    sent = []
+    output = OutputBuffer(lambda target, line, priority: sent.append((target, line)))
+
+    with output.collect():
+        output.add("#a", "one.")
+        output.add("tris", "secret.")
+        with output.collect():
+            output.add("#a", "two.")
+        assert not sent
+
+    assert sent == [("#a", "one. two."), ("tris", "secret.")]
+
+
+def test_buffer_lines_take_most_urgent_priority():
+    sent = []
+    output = OutputBuffer(lambda target, line, priority: sent.append((target, priority)))
+
+    with output.collect():
+        output.add("#a", "chatter", Priority.LOW)
+        output.add("#a", "your turn", Priority.HIGH)
+        output.add("#b", "chatter", Priority.LOW)
+
+    assert sent == [("#a", Priority.HIGH), ("#b", Priority.LOW)]
@@ -0,0 +1,87 @@
+import pickle
+
+import pytest
+from codenamesbot import packs, words
+from codenamesbot.state import Game, Team
+from codenamesbot.words import table_named
+
+PACK = ["Pony", "Zebra", "Äpfel", "apple", "# a comment", "", "PONY"]
+PACK += [f"Word{i}" for i in range(30)]
+
+
+@pytest.fixture
+def pack_dir(tmp_path, monkeypatch):
+    # packs loaded by a test stay out of the real registry
+    tables = dict(words.TABLES)
+    monkeypatch.setattr(words, "TABLES", tables)
+    monkeypatch.setattr(packs, "TABLES", tables)
+    monkeypatch.setattr(packs, "PACK_DIRS", [str(tmp_path)])
+
+    packs.compile_pack(PACK, str(tmp_path / "animals.cnpack"))
+    return tmp_path
+
+
+def test_compile_skips_comments_blanks_and_repeats(pack_dir):
+    table = packs.load("animals")
+
+    assert len(table) == 34
+    assert list(table)[:4] == ["Pony", "Zebra", "Äpfel", "apple"]
+    assert table[2] == "Äpfel"
+
+
+def test_lookup_is_case_insensitive(pack_dir):
+    table = packs.load("animals")
+
+    assert table.lookup("pony") == 0
+    assert table.lookup("ÄPFEL") == 2
+    assert table.lookup("APPLE") == 3
+    assert table.lookup("word29") == 33
+    assert table.lookup("horse") is None
+
+
+def test_packs_load_once_and_pickle_by_name(pack_dir):
+    assert "animals" in packs.available()
+    assert "animals" not in words.TABLES
+
+    table = table_named("animals")
+    assert packs.load("animals") is table
+    assert pickle.loads(pickle.dumps(table)) is table
+    assert len(pickle.dumps(table)) < 100
+
+    with pytest.raises(KeyError):
+        packs.load("vegetables")
+
+
+def test_game_deals_from_its_pack(pack_dir):
+    game = Game(seed=1)
+    game.table = packs.load("animals")
+    for name in ("tris", "claire", "bob", "alice"):
+        game.join(name)
+    game.start_game()
+
+    assert set(game.all_words) <= set(game.table)
+
+    word = game.words[Team.GREEN][0]
+    game.hint(game.teams[Team.GREEN].spymaster, "clue", 1)
+    game.guess(game.teams[Team.GREEN].guessers[0], word.upper())
+    assert word in game.guessed_words[Team.GREEN]
+
+    restored = pickle.loads(pickle.dumps(game))
+    assert restored.table is game.table
+    assert restored.board.snapshot() == game.board.snapshot()
+
+
+def test_rejects_files_that_are_not_packs(pack_dir):
+    (pack_dir / "broken.cnpack").write_bytes(b"not a word pack at all")
+
+    with pytest.raises(ValueError):
+        packs.load("broken")
+
+
+def test_rejects_truncated_packs(pack_dir):
+    (pack_dir / "short.cnpack").write_bytes(packs.MAGIC)
+    (pack_dir / "cut.cnpack").write_bytes(packs.HEADER.pack(packs.MAGIC, packs.VERSION, 1000))
+
+    for name in ("short", "cut"):
+        with pytest.raises(ValueError):
+            packs.load(name)
@@ -0,0 +1,101 @@
+import pickle
+
+from codenamesbot.persistence import GameStore
+from codenamesbot.state import UNLIMITED, Game, GamePhase
+
+
+def started_game(seed):
+    game = Game(seed=seed)
+    for name in ("tris", "claire", "bob"):
+        game.join(name)
+    game.start_game()
+    return game
+
+
+def test_journal_round_trip(tmp_path):
+    store = GameStore(tmp_path)
+    store.open()
+    store.record("dispatch", "tris", "#a", "join", [])
+    store.record("rename", "tris", "nottris")
+    store.close()
+
+    games, records = GameStore(tmp_path).load()
+    assert games == {}
+    assert records == [["dispatch", "tris", "#a", "join", []], ["rename", "tris", "nottris"]]
+
+
+def test_unflushed_records_are_not_written(tmp_path):
+    store = GameStore(tmp_path, batch=3)
+    store.open()
+    store.record("close", "#a")
+    store.record("close", "#b")
+
+    assert GameStore(tmp_path).load()[1] == []
+
+    store.record("close", "#c")
+    assert len(GameStore(tmp_path).load()[1]) == 3
+
+
+def test_torn_record_ends_the_journal(tmp_path):
+    store = GameStore(tmp_path)
+    store.open()
+    store.record("close", "#a")
+    store.flush()
+    store.journal.write(b'[2, "clo')
+    store.journal.flush()
+
+    assert GameStore(tmp_path).load()[1] == [["close", "#a"]]
+
+
+def test_snapshot_restarts_journal(tmp_path):
+    store = GameStore(tmp_path)
+    store.open()
+    store.record("close", "#a")
+
+    game = started_game(7)
+    store.snapshot({"#b": game})
+    store.record("close", "#c")
+    store.flush()
+
+    reloaded = GameStore(tmp_path)
+    games, records = reloaded.load()
+    assert records == [["close", "#c"]]
+    assert reloaded.seq == 2
+
+    restored = games["#b"]
+    assert restored.phase == GamePhase.HINTING
+    assert restored.board.snapshot()[1:] == game.board.snapshot()[1:]
+    assert restored.random.random() == game.random.random()
+
+
+def test_games_pickle_without_their_interface_or_words():
+    game = started_game(1)
+    restored = pickle.loads(pickle.dumps(game))
+
+    assert restored.interface is None
+    assert restored.board.table is game.board.table
+    assert [p.name for p in restored.players] == ["tris", "claire", "bob"]
+    assert restored.players["tris"].registry is restored.players
+
+
+def test_unlimited_hints_survive_a_snapshot(tmp_path):
+    game = Game(seed=3)
+    for name in ("tris", "claire", "bob", "alice"):
+        game.join(name)
+    game.start_game()
+    spymaster = game.teams[game.active_team].spymaster
+    guesser = game.teams[game.active_team].guessers[0]
+    game.hint(spymaster, "pony", UNLIMITED)
+
+    store = GameStore(tmp_path)
+    store.open()
+    store.snapshot({"#a": game})
+    store.close()
+
+    restored = GameStore(tmp_path).load()[0]["#a"]
+    assert restored.remaining_guesses is UNLIMITED
+
+    word = restored.board.words(restored.board.hidden(restored.active_team))[0]
+    restored.guess(restored.players[guesser.name], word)
+    assert restored.remaining_guesses is UNLIMITED
+    assert restored.phase == GamePhase.GUESSING
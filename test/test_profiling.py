@@ -0,0 +1,43 @@
+from codenamesbot.profiling import CommandProfiler, collapsed_stacks
+
+
+def spin(n):
+    # a plain loop, so the time is spin's own rather than split between sum and a generator
+    total = 0
+    for i in range(n):
+        total += i * i
+    return total
+
+
+def inner():
+    return spin(20000)
+
+
+def outer(depth=2):
+    # recursive, so the stacks have a cycle to cut off
+    return outer(depth - 1) if depth else inner() + spin(10000)
+
+
+def test_collapsed_stacks_follow_call_paths():
+    profiler = CommandProfiler(2)
+    assert profiler.wants("#anything")
+
+    for _ in range(2):
+        profiler.start()
+        outer()
+        profiler.stop()
+    assert profiler.done
+
+    stacks = dict(collapsed_stacks(profiler.stats()))
+    paths = [stack.split(";") for stack in stacks]
+    assert all(path[0].startswith("outer (test_profiling.py:") for path in paths if len(path) > 1)
+    assert any(path[1].startswith("inner (") and path[2].startswith("spin (")
+               for path in paths
+               if len(path) > 2)
+    assert not any(path.count(path[0]) > 1 for path in paths)
+
+    # everything profiled ends up on some stack, give or take rounding
+    total = sum(own for _, _, own, _, _ in profiler.stats().stats.values())
+    assert abs(sum(stacks.values()) / 1e6 - total) < 0.1 * total
+
+    assert profiler.hottest(1)[0][0].startswith("spin (test_profiling.py:")
@@ -0,0 +1,89 @@
+import asyncio
+
+from codenamesbot.queues import CommandQueue
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_commands_run_in_order_and_are_timed():
+    clock = FakeClock()
+    queue = CommandQueue("#a", clock=clock)
+    handled = []
+
+    def handle(n):
+        clock.now += 2
+        handled.append(n)
+
+    async def main():
+        for n in range(3):
+            queue.put(handle, n)
+
+        queue.start()
+        while queue.depth:
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        queue.stop()
+
+    asyncio.run(main())
+
+    assert handled == [0, 1, 2]
+    metrics = queue.metrics()
+    assert metrics["handled"] == 3
+    assert metrics["max_latency"] == metrics["mean_latency"] == 2
+    assert metrics["max_wait"] == 4
+
+
+def test_slow_game_does_not_hold_up_others():
+    slow, fast = CommandQueue("#slow"), CommandQueue("#fast")
+    handled = []
+
+    async def main():
+        release = asyncio.Event()
+
+        async def wait_for_release():
+            await release.wait()
+            handled.append("slow")
+
+        slow.put(wait_for_release)
+        slow.put(handled.append, "after slow")
+        fast.put(handled.append, "fast")
+        slow.start()
+        fast.start()
+
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert handled == ["fast"]
+
+        release.set()
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+        slow.stop()
+        fast.stop()
+
+    asyncio.run(main())
+    assert handled == ["fast", "slow", "after slow"]
+
+
+def test_failing_command_does_not_stop_the_queue():
+    queue = CommandQueue("#a")
+    handled = []
+
+    async def main():
+        queue.put(lambda: 1 / 0)
+        queue.put(handled.append, "next")
+        queue.start()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        queue.stop()
+
+    asyncio.run(main())
+    assert handled == ["next"]
+    assert queue.metrics()["handled"] == 2
@@ -0,0 +1,124 @@
+import asyncio
+
+from codenamesbot.scheduler import Priority, SendScheduler
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeTransport:
+
+    def __init__(self):
+        self.sent = []
+
+    def __call__(self, target, line):
+        self.sent.append((target, line))
+
+
+def make_scheduler(rate=1.0, burst=2):
+    clock = FakeClock()
+    transport = FakeTransport()
+    return SendScheduler(transport, rate=rate, burst=burst, clock=clock), clock, transport
+
+
+def test_sends_immediately_within_burst():
+    scheduler, clock, transport = make_scheduler()
+
+    scheduler.submit("#a", "one")
+    scheduler.submit("#a", "two")
+    scheduler.submit("#a", "three")
+
+    assert transport.sent == [("#a", "one"), ("#a", "two")]
+    assert scheduler.depth == 1
+
+
+def test_refills_over_time():
+    scheduler, clock, transport = make_scheduler(rate=0.5, burst=1)
+
+    scheduler.submit("#a", "one")
+    scheduler.submit("#a", "two")
+    assert scheduler.pump() == 2.0
+
+    clock.now = 1.0
+    assert scheduler.pump() == 1.0
+    assert len(transport.sent) == 1
+
+    clock.now = 2.0
+    assert scheduler.pump() is None
+    assert transport.sent[-1] == ("#a", "two")
+
+
+def test_high_priority_jumps_the_queue():
+    scheduler, clock, transport = make_scheduler(burst=1)
+
+    scheduler.submit("#a", "first")
+    scheduler.submit("#a", "pony", Priority.LOW)
+    scheduler.submit("#a", "stats", Priority.LOW)
+    scheduler.submit("tris", "spymaster view", Priority.HIGH)
+
+    for _ in range(3):
+        clock.now += 1
+        scheduler.pump()
+
+    assert [line for _, line in transport.sent] == ["first", "spymaster view", "pony", "stats"]
+
+
+def test_targets_take_turns():
+    scheduler, clock, transport = make_scheduler(burst=1)
+
+    scheduler.submit("#busy", "x")
+    for i in range(3):
+        scheduler.submit("#busy", f"busy{i}")
+    scheduler.submit("#quiet", "quiet")
+
+    for _ in range(4):
+        clock.now += 1
+        scheduler.pump()
+
+    targets = [target for target, _ in transport.sent]
+    assert targets == ["#busy", "#busy", "#quiet", "#busy", "#busy"]
+
+
+def test_metrics_track_depth_and_wait():
+    scheduler, clock, transport = make_scheduler(burst=1)
+
+    scheduler.submit("#a", "now", Priority.HIGH)
+    scheduler.submit("#a", "later", Priority.HIGH)
+
+    metrics = scheduler.metrics()
+    assert metrics["high"]["depth"] == 1
+    assert metrics["high"]["sent"] == 1
+
+    clock.now = 3.0
+    scheduler.pump()
+
+    metrics = scheduler.metrics()
+    assert metrics["high"]["depth"] == 0
+    assert metrics["high"]["max_wait"] == 3.0
+    assert metrics["high"]["mean_wait"] == 1.5
+
+
+def test_run_drains_queue():
+    transport = FakeTransport()
+    scheduler = SendScheduler(transport, rate=1000.0, burst=1)
+
+    async def main():
+        task = asyncio.ensure_future(scheduler.run())
+        await asyncio.sleep(0)
+
+        for i in range(5):
+            scheduler.submit("#a", str(i))
+
+        while scheduler.depth:
+            await asyncio.sleep(0.001)
+
+        task.cancel()
+
+    asyncio.run(main())
+    assert [line for _, line in transport.sent] == ["0", "1", "2", "3", "4"]
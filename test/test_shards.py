@@ -0,0 +1,183 @@
+import asyncio
+import collections
+import pickle
+
+from codenamesbot import simulator
+from codenamesbot.shards import HashRing, Supervisor, WorkerInterface
+
+CHANNELS = [f"#channel{i}" for i in range(1000)]
+
+
+def scripts(games, seed=0):
+    played = []
+    for game_seed in range(seed, seed + games):
+        said = []
+        simulator.play(game_seed, said=said)
+        played.append((f"#game{game_seed}", said))
+
+    return played
+
+
+def make_front(workers, **kwargs):
+    front = Supervisor("bot", [], workers=workers, admins=["admin"], **kwargs)
+    front.said = []
+    front.deliver = front.said.extend
+    return front
+
+
+def say_turns(front, played, turns):
+    for turn in turns:
+        for channel, said in played:
+            if turn < len(said):
+                front.on_privmsg(*said[turn][:1], channel, said[turn][1])
+
+
+def wins(front):
+    return sum(line.count("team wins!") for _, line, _ in front.said)
+
+
+def test_ring_spreads_channels_evenly():
+    ring = HashRing(range(4))
+    owners = collections.Counter(ring.owner(channel) for channel in CHANNELS)
+
+    assert set(owners) == {0, 1, 2, 3}
+    assert min(owners.values()) > len(CHANNELS) / 4 / 2
+    assert ring.owner("#Channel1") == ring.owner("#channel1")
+
+
+def test_ring_changes_only_move_channels_to_or_from_the_changed_worker():
+    ring = HashRing(range(4))
+    before = {channel: ring.owner(channel) for channel in CHANNELS}
+
+    ring.add(4)
+    added = {channel: ring.owner(channel) for channel in CHANNELS}
+    moved = [channel for channel in CHANNELS if added[channel] != before[channel]]
+    assert moved and all(added[channel] == 4 for channel in moved)
+
+    ring.remove(4)
+    assert {channel: ring.owner(channel) for channel in CHANNELS} == before
+
+    ring.remove(0)
+    assert all(
+        ring.owner(channel) == before[channel] for channel in CHANNELS if before[channel] != 0)
+
+
+def test_games_play_to_the_end_across_workers():
+    played = scripts(8)
+
+    async def main():
+        front = make_front(2)
+        await front.start_workers()
+        say_turns(front, played, range(max(len(said) for _, said in played)))
+        await front.sync()
+        await front.stop()
+        return front
+
+    front = asyncio.run(main())
+
+    assert wins(front) == 8
+    assert {name for name, _ in front.placed.values()} == {0, 1}
+
+
+def test_channels_move_mid_game_without_losing_commands():
+    played = scripts(12)
+    turns = max(len(said) for _, said in played)
+
+    async def main():
+        front = make_front(1)
+        await front.start_workers()
+        say_turns(front, played, range(10))
+
+        # commands said while channels move are held, then passed on in order
+        front.on_private("admin", "-workers 3")
+        assert front.moving
+        say_turns(front, played, range(10, 20))
+        await front.sync()
+
+        assert not front.moving
+        assert {name for name, _ in front.placed.values()} == {0, 1, 2}
+
+        front.on_private("admin", "-workers 2")
+        say_turns(front, played, range(20, turns))
+        await front.sync()
+        await front.stop()
+        return front
+
+    front = asyncio.run(main())
+
+    assert wins(front) == 12
+    assert front.ring.members() == [0, 1]
+    assert {name for name, _ in front.placed.values()} <= {0, 1}
+    assert ("admin", "2 workers: 0 (") in [(target, line[:14]) for target, line, _ in front.said]
+
+
+def test_workers_left_over_from_a_bigger_run_hand_their_games_on(tmp_path):
+    played = scripts(6)
+    turns = max(len(said) for _, said in played)
+
+    async def first():
+        front = make_front(3, state_dir=str(tmp_path))
+        await front.start_workers()
+        say_turns(front, played, range(12))
+        await front.sync()
+        await front.stop()
+        return front
+
+    async def second():
+        front = make_front(1, state_dir=str(tmp_path))
+        await front.start_workers()
+        say_turns(front, played, range(12, turns))
+        await front.sync()
+        await front.stop()
+        return front
+
+    before = asyncio.run(first())
+    front = asyncio.run(second())
+
+    assert wins(before) + wins(front) == 6
+    assert wins(front)
+    assert front.ring.members() == [0]
+    assert all(name == 0 for name, _ in front.placed.values())
+
+
+def test_commands_for_a_dead_worker_are_held_until_it_restarts(tmp_path):
+    played = scripts(4)
+    turns = max(len(said) for _, said in played)
+
+    async def main():
+        front = make_front(1, state_dir=str(tmp_path))
+        await front.start_workers()
+        say_turns(front, played, range(10))
+        await front.sync()
+
+        # wait out the journal's flush interval, so the worker has saved all of that
+        await asyncio.sleep(0.5)
+        shard = front.shards[0]
+        shard.process.kill()
+        while shard.writer is not None:
+            await asyncio.sleep(0.01)
+
+        say_turns(front, played, range(10, turns))
+        await asyncio.wait_for(front.sync(), 60)
+        await front.stop()
+        return front
+
+    front = asyncio.run(main())
+
+    assert wins(front) == 4
+
+
+def test_adopted_games_replace_the_old_ones_turn_timers():
+    worker = WorkerInterface(0, "bot")
+    for nick in ("tris", "claire", "bob", "alice"):
+        worker.on_privmsg(nick, "#a", "-join")
+    worker.on_privmsg("tris", "#a", "-timer hint 20")
+    worker.on_privmsg("tris", "#a", "-start 1")
+    stale = worker.games["#a"].game
+    assert stale in worker.timers.pending
+
+    worker.adopt("#a", pickle.dumps(stale))
+
+    assert worker.games["#a"].game is not stale
+    assert stale not in worker.timers.pending
+    assert worker.games["#a"].game in worker.timers.pending
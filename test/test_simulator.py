@@ -0,0 +1,30 @@
+from codenamesbot import simulator
+from codenamesbot.state import Team
+
+
+def test_games_play_to_the_end():
+    for seed in range(20):
+        for players in (3, 4, 7):
+            winner, turns, guesses = simulator.play(seed, players)
+
+            assert winner in {Team.GREEN, Team.PINK}
+            assert 0 < turns < simulator.MAX_TURNS
+            assert guesses > 0
+
+
+def test_games_replay_from_their_seed():
+    assert simulator.play(42) == simulator.play(42)
+    assert simulator.play(42, strategy="oracle") == simulator.play(42, strategy="oracle")
+
+
+def test_oracle_only_guesses_own_words():
+    # nine green words at two guesses a turn take five turns; pink's eight take four
+    assert simulator.play(1, strategy="oracle") == (Team.PINK, 8, 16)
+
+
+def test_simulate_counts_every_game():
+    results, seconds = simulator.simulate(10, workers=1, chunk=3)
+    assert results["green"] + results["pink"] == 10
+
+    pooled, seconds = simulator.simulate(10, workers=2, chunk=3)
+    assert pooled == results
@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+from codenamesbot.irc import IRCInterface
+from codenamesbot.spectators import CLOSE, PING, PONG, accept_key, frame, read_frame, start_server
+from codenamesbot.state import GamePhase, Team
+
+
+class Reader:
+
+    def __init__(self, data):
+        self.data = data
+
+    async def readexactly(self, n):
+        chunk, self.data = self.data[:n], self.data[n:]
+        return chunk
+
+
+def test_frames_round_trip():
+    for size in (0, 125, 126, 70000):
+        payload = bytes(range(256)) * (size // 256) + bytes(size % 256)
+        for mask in (None, b"\x01\x02\x03\x04"):
+            data = frame(payload, PING, mask)
+            assert asyncio.run(read_frame(Reader(data))) == (PING, payload)
+
+
+def test_accept_key():
+    # the example from RFC 6455
+    assert accept_key("dGhlIHNhbXBsZSBub25jZQ==") == "s3pPLMBiTxaQ9kYGzzhZRbK+xOo="
+
+
+def make_bot():
+    bot = IRCInterface("codenames", [], spectator_port=0)
+    bot.scheduler.send = lambda target, line: None
+    bot.scheduler.rate = bot.scheduler.burst = bot.scheduler.tokens = 1e12
+    return bot
+
+
+async def connect(port, path):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\n"
+                 "Connection: Upgrade\r\nSec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n"
+                 "Sec-WebSocket-Version: 13\r\n\r\n".encode())
+
+    status = await reader.readline()
+    while (await reader.readline()).strip():
+        pass
+
+    return status, reader, writer
+
+
+async def receive(reader):
+    opcode, payload = await asyncio.wait_for(read_frame(reader), 5)
+    return json.loads(payload) if opcode not in (CLOSE, PONG) else (opcode, payload)
+
+
+def test_spectators_get_a_snapshot_then_deltas():
+    bot = make_bot()
+    for nick in ("tris", "claire", "bob", "alice"):
+        bot.on_privmsg(nick, "#a", "-join")
+    game = bot.games["#a"].game
+
+    async def main():
+        server = await start_server(bot.spectators_of, port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            status, _, writer = await connect(port, "/nowhere")
+            assert status.startswith(b"HTTP/1.1 404")
+            writer.close()
+
+            status, reader, writer = await connect(port, "/a")
+            assert status.startswith(b"HTTP/1.1 101")
+            messages = [await receive(reader)]
+
+            bot.on_privmsg("tris", "#a", "-start 1")
+            messages.append(await receive(reader))
+            messages.append(await receive(reader))
+
+            team = game.teams[game.active_team]
+            word = game.remaining_words[game.active_team][0]
+            bot.on_privmsg(team.spymaster.name, "#a", "-c pony 1")
+            bot.on_privmsg(team.guessers[0].name, "#a", f"-g {word}")
+            messages.append(await receive(reader))
+            messages.append(await receive(reader))
+
+            writer.write(frame(b"hi", PING, b"abcd"))
+            assert await receive(reader) == (PONG, b"hi")
+            writer.write(frame(b"\x03\xe8", CLOSE, b"abcd"))
+            assert await receive(reader) == (CLOSE, b"\x03\xe8")
+            writer.close()
+
+            return messages
+
+    lobby, started, turn, hint, reveal = asyncio.run(main())
+
+    assert lobby["type"] == "snapshot" and lobby["phase"] == "pre_game"
+    assert lobby["players"] == dict.fromkeys(["tris", "claire", "bob", "alice"])
+
+    assert started["type"] == "snapshot" and started["phase"] == "hinting"
+    assert [word for word, _ in started["cards"]] == game.board.words()
+    # nothing is revealed, so no owners: the spymasters' view stays with the spymasters
+    assert all(owner is None for _, owner in started["cards"])
+    assert set(started["spymasters"]) == {"green", "pink"}
+
+    assert turn == {"type": "turn", "team": "green", "spymaster": started["spymasters"]["green"]}
+    assert hint == {"type": "hint", "team": "green", "word": "pony", "number": 1}
+    assert reveal["type"] == "reveal" and reveal["owner"] == "green" and reveal["guesses"] == 1
+    assert reveal["word"] in game.words[Team.GREEN]
+
+    # the snapshot for anyone joining now shows the one revealed card's owner, and no others
+    snapshot = json.loads(
+        asyncio.run(read_frame(Reader(bot.games["#a"].spectators.snapshot_frame())))[1])
+    assert game.phase == GamePhase.GUESSING
+    assert [owner for _, owner in snapshot["cards"] if owner is not None] == ["green"]
+    assert snapshot["hint"] == ["pony", 1] and snapshot["guesses"] == 1
@@ -1,8 +1,12 @@
 import logging
+import pickle
+import random
 
 import pytest
+from codenamesbot import state
 from codenamesbot.state import (UNLIMITED, Game, GameMode, GamePhase, InvalidGameState, Player,
                                 Players, PlayingTeam, Team)
+from codenamesbot.words import WordTable
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -45,6 +49,55 @@ def test_players_track_rename():
         ps["tris"]
 
 
+def test_players_case_insensitive():
+    ps = Players()
+
+    tris = ps.add("Tris[away]")
+    assert ps["tris{AWAY}"] is tris
+    assert "TRIS[away]" in ps
+    assert str(ps) == "1 player: Tris[away]"
+
+    with pytest.raises(ValueError):
+        ps.add("tris[away]")
+
+
+def test_players_rename_collision():
+    ps = Players()
+
+    tris = ps.add("tris")
+    ps.add("claire")
+
+    with pytest.raises(ValueError):
+        tris.rename("Claire")
+
+    assert tris.name == "tris"
+    assert ps["tris"] is tris
+
+    tris.rename("TRIS")
+    assert ps["tris"] is tris
+    assert tris.name == "TRIS"
+
+
+def test_players_rejoin_after_remove():
+    ps = Players()
+
+    tris = ps.add("tris")
+    ps.add("claire")
+    ps.remove("TRIS")
+
+    assert "tris" not in ps
+    with pytest.raises(KeyError):
+        ps.remove("tris")
+
+    # a removed player's rename no longer touches the index
+    tris.rename("claire")
+    assert ps["claire"] is not tris
+
+    again = ps.add("tris")
+    assert again is not tris
+    assert str(ps) == "2 players: claire, tris"
+
+
 def test_players_track_length():
     ps = Players()
 
@@ -246,6 +299,91 @@ def test_assign_players_gray_for_gray_preference():
         assert {game.teams[Team.GREEN].spymaster, game.teams[Team.PINK].spymaster} == {tris, claire}
 
 
+def quadratic_assign_teams(game):
+    # assign_teams as it was before it became a single pass, kept to check the two agree
+    players = game.players.shuffled(game.random)
+
+    for player in players[::]:
+        if player.team is not None:
+            players.remove(player)
+            players.insert(0, player)
+
+    for player in players[::]:
+        if player.spymaster_preference:
+            players.remove(player)
+            players.insert(0, player)
+
+    if game.mode == GameMode.GRAY:
+        green = None
+        pink = None
+
+        for player in players[::]:
+            if player.team == Team.GRAY:
+                players.remove(player)
+                players.append(player)
+
+        for player in players[::]:
+            if player.team == Team.GREEN and green is None:
+                green = player
+                players.remove(player)
+            elif player.team == Team.PINK and pink is None:
+                pink = player
+                players.remove(player)
+
+        if green is None:
+            green = players.pop(0)
+        if pink is None:
+            pink = players.pop(0)
+
+        game.teams[Team.GREEN].add(green)
+        game.teams[Team.PINK].add(pink)
+        game.teams[Team.GRAY].players.extend(players)
+
+    else:
+        game._assign_teams_versus(players)
+
+    for player in game.players:
+        for team, playing_team in game.teams.items():
+            if player in playing_team:
+                player.team = team
+
+
+def random_lobby(rng, seed):
+    game = Game(seed=seed)
+    for i in range(rng.randrange(3, 40)):
+        player = game.join(f"player{i}")
+        player.team = rng.choice([None, None, Team.GREEN, Team.PINK, Team.GRAY])
+        player.spymaster_preference = rng.random() < 0.2
+
+    game.mode = rng.choice(list(GameMode))
+    if game.mode == GameMode.VERSUS:
+        for player in game.players:
+            if player.team == Team.GRAY:
+                player.team = None
+
+    return game
+
+
+def test_assign_teams_matches_quadratic_version():
+    # same seed and lobby, same teams: so the two deal every lobby with the same distribution,
+    # and games journaled before the rewrite still replay
+    rng = random.Random(0)
+
+    for seed in range(500):
+        state = rng.getstate()
+        new = random_lobby(rng, seed)
+        rng.setstate(state)
+        old = random_lobby(rng, seed)
+
+        new.assign_teams()
+        quadratic_assign_teams(old)
+
+        for team in Team:
+            assert [p.name for p in new.teams[team]] == [p.name for p in old.teams[team]]
+
+        assert [p.team for p in new.players] == [p.team for p in old.players]
+
+
 def test_assign_players_versus_all_team_preference():
     for _ in range(100):
         game = Game()
@@ -345,6 +483,55 @@ def test_assign_words():
     assert game.assassin is not None
 
 
+def test_board_masks_partition_the_board():
+    game = Game()
+    game.assign_words()
+
+    masks = [game.board.mask(owner) for owner in (Team.GREEN, Team.PINK, Team.GRAY, None)]
+    assert [state.popcount(mask) for mask in masks] == [9, 8, 7, 1]
+    assert sum(masks) == (1 << 25) - 1
+
+    assert len(set(game.all_words)) == 25
+    assert sorted(game.all_words) == sorted(
+        game.words[Team.GREEN] + game.words[Team.PINK] + game.words[Team.GRAY] + [game.assassin])
+
+
+def test_board_finds_words_through_its_index():
+    game = Game()
+    game.assign_words()
+    word = game.all_words[3]
+    position = game.board.find(word)
+
+    assert game.board.words(1 << position) == [word]
+    assert game.board.find(word.upper()) == position
+    assert game.board.find("notaword") is None
+    assert state.Board.restore(game.board.snapshot()).find(word) == position
+    assert pickle.loads(pickle.dumps(game.board)).find(word) == position
+
+
+def test_assign_words_from_large_table():
+    game, tris = setup_4p_game()
+    game.table = WordTable(f"word{i}" for i in range(100000))
+    game.assign_words()
+
+    assert game.board.table is game.table
+    assert len(set(game.all_words)) == 25
+    assert all(word.startswith("word") for word in game.all_words)
+
+
+def test_board_snapshot_restore():
+    game, tris = setup_4p_game()
+
+    before = game.board.snapshot()
+    game.hint(tris, "foo", 4)
+    game.guess(game.players["claire"], game.words[Team.GREEN][0])
+    assert game.board.snapshot() != before
+
+    game.board = state.Board.restore(before)
+    assert game.board.remaining(Team.GREEN) == 9
+    assert len(game.all_words) == 25
+
+
 def test_start_game():
     game = Game()
 
@@ -365,6 +552,31 @@ def test_start_game():
     assert game.assassin is not None
 
 
+def test_seed_replays_game():
+
+    def play(seed):
+        game = Game()
+        for name in ("tris", "claire", "bob", "alice", "eve"):
+            game.join(name)
+
+        game.start_game(seed)
+        game.join("steve")
+
+        teams = {team: [p.name for p in game.teams[team]] for team in Team}
+        return teams, game.all_words, game.words
+
+    assert play(1234) == play(1234)
+    assert play(1234) != play(4321)
+
+
+def test_seed_is_recorded():
+    game = Game()
+    assert game.seed is not None
+
+    replay = Game(seed=game.seed)
+    assert replay.random.random() == game.random.random()
+
+
 def test_start_game_not_enough_players():
     game = Game()
 
@@ -623,6 +835,37 @@ def test_guess_same_team():
     assert game.remaining_guesses == 3
 
 
+def test_guess_is_case_insensitive():
+    game, tris = setup_4p_game()
+    game.hint(tris, "foo", 4)
+
+    word = game.words[Team.GREEN][0]
+    game.guess(game.players["claire"], word.upper())
+
+    assert word in game.guessed_words[Team.GREEN]
+    assert word not in game.all_words
+    assert game.board.remaining(Team.GREEN) == 8
+
+
+def test_guess_keeps_original_spelling(monkeypatch):
+    words = WordTable(["McDonald"] + [f"Word{i}" for i in range(24)])
+    monkeypatch.setattr(state, "WORDS", words)
+    monkeypatch.setattr(state.random.Random, "sample", lambda self, seq, k: list(seq)[:k])
+    monkeypatch.setattr(state.random.Random, "shuffle", lambda self, seq: None)
+
+    game, tris = setup_4p_game()
+    assert game.words[Team.GREEN][0] == "McDonald"
+
+    with pytest.raises(InvalidGameState):
+        game.hint(tris, "mcdonald", 1)
+
+    game.hint(tris, "burger", 1)
+    game.guess(game.players["claire"], "mcdonald")
+
+    assert game.guessed_words[Team.GREEN] == ["McDonald"]
+    assert "McDonald" not in game.remaining_words[Team.GREEN]
+
+
 def test_guess_assassin():
     game, tris = setup_4p_game()
     game.hint(tris, "foo", 4)
@@ -800,3 +1043,25 @@ def test_start_ongoing_game():
 
     with pytest.raises(InvalidGameState):
         game.start_game()
+
+
+def test_every_change_bumps_the_revision():
+    game = Game()
+    revisions = [game.revision]
+
+    for name in ("tris", "claire", "bob", "alice"):
+        game.join(name)
+        revisions.append(game.revision)
+
+    game.start_game(0)
+    revisions.append(game.revision)
+    spymaster = game.teams[Team.GREEN].spymaster
+    game.hint(spymaster, "pony", 1)
+    revisions.append(game.revision)
+    game.guess(game.teams[Team.GREEN].guessers[0], game.words[Team.GRAY][0])
+    revisions.append(game.revision)
+
+    assert revisions == sorted(set(revisions))
+
+    game.touch()
+    assert game.revision == revisions[-1] + 1
@@ -0,0 +1,153 @@
+import random
+
+from codenamesbot import timers
+from codenamesbot.simulator import NullInterface
+from codenamesbot.state import Game, GamePhase, Team
+from codenamesbot.timers import TimingWheel, TurnTimers, players_up
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_wheel():
+    clock = FakeClock()
+    return TimingWheel(clock=clock), clock
+
+
+def test_timers_fire_on_time_not_early():
+    wheel, clock = make_wheel()
+    fired = []
+
+    wheel.schedule(3, fired.append, "three")
+    wheel.schedule(1.5, fired.append, "two")
+
+    clock.now = 1.9
+    assert wheel.advance() == 0
+    clock.now = 2
+    wheel.advance()
+    assert fired == ["two"]
+
+    clock.now = 10
+    wheel.advance()
+    assert fired == ["two", "three"]
+    assert not len(wheel)
+
+
+def test_cancelled_timers_never_fire():
+    wheel, clock = make_wheel()
+    fired = []
+
+    timer = wheel.schedule(5, fired.append, "cancelled")
+    wheel.schedule(5, fired.append, "kept")
+    wheel.cancel(timer)
+    wheel.cancel(timer)
+
+    clock.now = 5
+    wheel.advance()
+    assert fired == ["kept"]
+    assert not timer.pending
+
+
+def test_far_timers_cascade_down_the_levels():
+    wheel, clock = make_wheel()
+    fired = []
+
+    rng = random.Random(0)
+    delays = [rng.randrange(1, timers.SLOTS**3) for _ in range(2000)]
+    delays += [timers.SLOTS**level for level in range(4)]
+    for delay in delays:
+        wheel.schedule(delay, lambda delay: fired.append((clock.now, delay)), delay)
+
+    for step in range(1, max(delays) + 1):
+        clock.now = step
+        wheel.advance()
+
+    assert sorted(delays) == [delay for _, delay in fired]
+    assert all(now == delay for now, delay in fired)
+
+
+def test_idle_wheel_schedules_from_now():
+    wheel, clock = make_wheel()
+    fired = []
+
+    clock.now = 1000
+    wheel.schedule(2, fired.append, "late")
+
+    clock.now = 1001
+    wheel.advance()
+    assert not fired
+
+    clock.now = 1002
+    wheel.advance()
+    assert fired == ["late"]
+
+
+def start_game(time_limits):
+    game = Game(interface=NullInterface(), seed=1)
+    for name in ("tris", "claire", "bob", "alice"):
+        game.join(name)
+
+    game.time_limits = time_limits
+    game.start_game()
+    return game
+
+
+def watch(game):
+    wheel, clock = make_wheel()
+    turn_timers = TurnTimers(wheel, reminder=10)
+    calls = []
+
+    def expire(game, turn):
+        calls.append("expired")
+        if turn_timers.current(game, turn):
+            game.time_out()
+
+    turn_timers.watch(game, expire, lambda game, left: calls.append(left))
+    return turn_timers, clock, calls
+
+
+def test_idle_spymaster_is_skipped():
+    game = start_game({GamePhase.HINTING: 60})
+    turn_timers, clock, calls = watch(game)
+
+    clock.now = 50
+    turn_timers.wheel.advance()
+    assert calls == [10]
+
+    clock.now = 60
+    turn_timers.wheel.advance()
+    assert calls == [10, "expired"]
+    assert game.phase == GamePhase.HINTING
+    assert game.active_team == Team.PINK
+
+    # the next turn has its own timer
+    assert len(turn_timers.wheel) == 2
+
+
+def test_guessing_times_out_and_moves_are_not_timed_out():
+    game = start_game({GamePhase.GUESSING: 30})
+    turn_timers, clock, calls = watch(game)
+    assert not len(turn_timers.wheel)
+
+    game.hint(game.teams[Team.GREEN].spymaster, "pony", 2)
+    guesser = game.teams[Team.GREEN].guessers[0]
+
+    clock.now = 20
+    turn_timers.wheel.advance()
+    game.guess(guesser, game.words[Team.GREEN][0])
+    assert players_up(game) == [guesser]
+
+    clock.now = 30
+    turn_timers.wheel.advance()
+    assert game.phase == GamePhase.HINTING
+    assert game.active_team == Team.PINK
+    assert calls == [10, "expired"]
+
+    # nothing's left running once no turn is timed
+    assert not len(turn_timers.wheel)